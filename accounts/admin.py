@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Perfil
+from .models import Base, Perfil
 
 admin.site.register(Perfil)
 
+
+@admin.register(Base)
+class BaseAdmin(admin.ModelAdmin):
+    list_display = ['codigo', 'nombre']
+
+    # El código es lo que guardan los datos: se fija al crear la base
+    def get_readonly_fields(self, request, obj=None):
+        return ['codigo'] if obj else []
+
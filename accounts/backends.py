@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+# Relaciones que se cargan junto con el usuario autenticado
+RELACIONES_PERFIL = ['perfil', 'perfil__conductor_relacionado', 'perfil__supervisor_relacionado']
+
+
+class BackendConPerfil(ModelBackend):
+    """
+    ModelBackend que al restaurar el usuario de la sesión trae su Perfil y
+    el conductor/supervisor relacionado en la misma consulta (JOIN), en
+    lugar de una consulta más por cada `user.perfil`.
+    """
+
+    def get_user(self, user_id):
+        usuario = UserModel._default_manager.select_related(*RELACIONES_PERFIL).filter(pk=user_id).first()
+        if usuario is None or not self.user_can_authenticate(usuario):
+            return None
+        return usuario
@@ -0,0 +1,90 @@
+"""
+Catálogo de bases en memoria del proceso: código <-> id de la tabla Base
+y etiquetas. Los campos que guardan la base como smallint
+(accounts.campos.CampoBase) lo consultan por cada fila leída o filtrada,
+así que se arma una sola vez y se recarga al guardar una Base en este
+proceso, al expirar o al leer un id o código que no conoce (otro proceso
+agregó la base).
+"""
+import threading
+import time
+
+from django.db import DatabaseError
+
+
+# Red de seguridad para los cambios de etiqueta hechos en otro proceso
+DURACION_CATALOGO = 600
+# Mínimo entre recargas provocadas por ids desconocidos
+INTERVALO_RECARGA = 5
+
+
+class Catalogo:
+    def __init__(self, filas):
+        """`filas`: (id, codigo, nombre) en el orden de las opciones."""
+        self.ids = {codigo: pk for pk, codigo, _ in filas}
+        self.codigos = {pk: codigo for pk, codigo, _ in filas}
+        self.etiquetas = {codigo: nombre for _, codigo, nombre in filas}
+        self.opciones = [(codigo, nombre) for _, codigo, nombre in filas]
+        self.cargado = time.monotonic()
+
+
+_candado = threading.Lock()
+_catalogo = None
+
+
+def catalogo():
+    global _catalogo
+    actual = _catalogo
+    if actual is None or time.monotonic() - actual.cargado > DURACION_CATALOGO:
+        actual = recargar_catalogo()
+    return actual
+
+
+def recargar_catalogo():
+    global _catalogo
+    from .models import Base
+
+    with _candado:
+        try:
+            filas = list(Base.objects.order_by('pk').values_list('pk', 'codigo', 'nombre'))
+        except DatabaseError:
+            # Antes de migrar (chequeos de `migrate`) la tabla todavía no existe
+            return Catalogo([])
+        _catalogo = Catalogo(filas)
+    return _catalogo
+
+
+def invalidar_catalogo():
+    global _catalogo
+    _catalogo = None
+
+
+def codigo_de_id(pk):
+    """Código de la base con ese id; recarga (con límite) si no lo conoce."""
+    actual = catalogo()
+    codigo = actual.codigos.get(pk)
+    if codigo is None and time.monotonic() - actual.cargado > INTERVALO_RECARGA:
+        codigo = recargar_catalogo().codigos.get(pk)
+    return codigo
+
+
+def id_de_codigo(codigo):
+    """Id de la base con ese código; recarga (con límite) si no lo conoce."""
+    actual = catalogo()
+    pk = actual.ids.get(codigo)
+    if pk is None and time.monotonic() - actual.cargado > INTERVALO_RECARGA:
+        pk = recargar_catalogo().ids.get(codigo)
+    return pk
+
+
+def codigos_base():
+    return list(catalogo().ids)
+
+
+def opciones_base():
+    """(código, etiqueta) de todas las bases, para choices."""
+    return list(catalogo().opciones)
+
+
+def etiquetas_base():
+    return catalogo().etiquetas
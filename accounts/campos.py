@@ -0,0 +1,96 @@
+from django.db import models
+from django.utils.functional import cached_property
+
+from .bases import codigo_de_id, etiquetas_base, id_de_codigo
+
+
+class CampoCodificado(models.PositiveSmallIntegerField):
+    """
+    Clave de texto (p. ej. 'pendiente') guardada como smallint. En Python,
+    en los filtros y en .values() sigue siendo el texto; solo la columna y
+    sus índices usan el número. `codigos` fija el número de cada clave:
+    una clave nueva recibe un número nuevo y los existentes no se cambian.
+
+    Una clave desconocida en un filtro se convierte en NULL, que no
+    coincide con ninguna fila y no se puede guardar.
+    """
+
+    def __init__(self, *args, codigos=None, **kwargs):
+        self.codigos = dict(codigos or {})
+        self.claves = {numero: clave for clave, numero in self.codigos.items()}
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['codigos'] = self.codigos
+        return name, path, args, kwargs
+
+    @property
+    def validators(self):
+        # Sin los de rango de enteros: el valor en Python es el texto
+        return [*self.default_validators, *self._validators]
+
+    def a_numero(self, clave):
+        return self.codigos.get(clave)
+
+    def a_clave(self, numero):
+        return self.claves.get(numero, numero)
+
+    @cached_property
+    def etiquetas(self):
+        return dict(self.flatchoices)
+
+    def etiqueta(self, clave):
+        return self.etiquetas.get(clave, clave)
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else self.a_clave(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.a_clave(value)
+
+    def get_prep_value(self, value):
+        value = models.Field.get_prep_value(self, value)
+        # Los números pasan tal cual (migraciones de datos)
+        if value is None or isinstance(value, int):
+            return value
+        return self.a_numero(value)
+
+    def contribute_to_class(self, cls, name, *args, **kwargs):
+        propio = f'get_{name}_display' in cls.__dict__
+        super().contribute_to_class(cls, name, *args, **kwargs)
+        if not propio:
+            # Etiqueta de un dict armado una vez (la de Django lo arma en cada llamada)
+            def mostrar(instancia, campo=self):
+                return campo.etiqueta(getattr(instancia, campo.attname))
+            setattr(cls, f'get_{name}_display', mostrar)
+
+
+class CampoBase(CampoCodificado):
+    """
+    Base guardada como el id (smallint) de su fila en accounts.Base, con
+    el código ('lampa') como valor en Python. Los números y las etiquetas
+    salen del catálogo en memoria (accounts.bases): agregar una base es
+    agregar una fila.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.pop('codigos', None)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs['codigos']
+        return name, path, args, kwargs
+
+    def a_numero(self, clave):
+        return id_de_codigo(clave)
+
+    def a_clave(self, numero):
+        codigo = codigo_de_id(numero)
+        return numero if codigo is None else codigo
+
+    def etiqueta(self, clave):
+        return etiquetas_base().get(clave, clave)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+CACHE_USUARIOS = 'usuarios'
+BACKEND_CON_PERFIL = 'accounts.backends.BackendConPerfil'
+# Sesiones iniciadas antes de BackendConPerfil (mismo modelo, sin el JOIN)
+BACKEND_ANTERIOR = 'django.contrib.auth.backends.ModelBackend'
+
+
+def clave_usuario(user_id):
+    return f'usuario:{user_id}'
+
+
+def invalidar_usuario(user_id):
+    caches[CACHE_USUARIOS].delete(clave_usuario(user_id))
+
+
+def _usuario_de_sesion(request):
+    """
+    auth.get_user en una consulta (usuario con su Perfil, ver
+    BackendConPerfil) que se hace siempre: is_active, la base y el rol nunca
+    salen de una caché. Lo único que se guarda por proceso es la
+    verificación del hash de autenticación de la sesión, válida mientras la
+    sesión y la contraseña del usuario sean las mismas.
+    """
+    sesion = request.session
+    if sesion.get(auth.BACKEND_SESSION_KEY) == BACKEND_ANTERIOR:
+        sesion[auth.BACKEND_SESSION_KEY] = BACKEND_CON_PERFIL
+    user_id = sesion.get(auth.SESSION_KEY)
+    backend = sesion.get(auth.BACKEND_SESSION_KEY)
+    if user_id is None or backend not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    cache = caches[CACHE_USUARIOS]
+    clave = clave_usuario(user_id)
+    verificacion = (sesion.get(auth.HASH_SESSION_KEY), backend)
+    guardado = cache.get(clave)
+    if guardado is not None and guardado[0] == verificacion and verificacion[0]:
+        usuario = auth.load_backend(backend).get_user(auth.get_user_model()._meta.pk.to_python(user_id))
+        # Desactivado o con otra contraseña: se verifica como siempre (y se cierra la sesión)
+        if usuario is not None and constant_time_compare(usuario.password, guardado[1]):
+            usuario.backend = backend
+            return usuario
+
+    usuario = auth.get_user(request)
+    if usuario.is_authenticated:
+        # get_user puede haber rotado el hash (SECRET_KEY_FALLBACKS): se guarda el vigente
+        verificacion = (sesion.get(auth.HASH_SESSION_KEY), sesion.get(auth.BACKEND_SESSION_KEY))
+        cache.set(clave, (verificacion, usuario.password))
+    return usuario
+
+
+def obtener_usuario(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = _usuario_de_sesion(request)
+    return request._cached_user
+
+
+class AutenticacionConPerfilMiddleware(AuthenticationMiddleware):
+    """
+    Reemplaza a AuthenticationMiddleware: request.user y su Perfil salen de
+    una sola consulta por solicitud, y las vistas reciben request.perfil
+    (None si el usuario no tiene) sin más consultas.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: obtener_usuario(request))
+
+    def process_view(self, request, vista, args, kwargs):
+        request.perfil = getattr(request.user, 'perfil', None)
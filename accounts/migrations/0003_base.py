@@ -0,0 +1,93 @@
+import accounts.bases
+import accounts.campos
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+BASES_INICIALES = [
+    (1, 'calle_larga', 'Spot Calle Larga'),
+    (2, 'lampa', 'Spot Lampa'),
+]
+
+
+def crear_bases(apps, schema_editor):
+    Base = apps.get_model('accounts', 'Base')
+    Base.objects.bulk_create([Base(id=pk, codigo=codigo, nombre=nombre) for pk, codigo, nombre in BASES_INICIALES])
+    # Con ids explícitos PostgreSQL no avanza la secuencia: la próxima base chocaría con el id 1
+    conexion = schema_editor.connection
+    with conexion.cursor() as cursor:
+        for sql in conexion.ops.sequence_reset_sql(no_style(), [Base]):
+            cursor.execute(sql)
+
+
+def ids_de_bases(apps, valores):
+    """codigo -> id, agregando como base cualquier valor guardado que no esté en la tabla."""
+    Base = apps.get_model('accounts', 'Base')
+    ids = dict(Base.objects.values_list('codigo', 'pk'))
+    for valor in sorted(set(valores) - set(ids)):
+        ids[valor] = Base.objects.create(codigo=valor, nombre=valor).pk
+    return ids
+
+
+def copiar_bases(apps, schema_editor):
+    Perfil = apps.get_model('accounts', 'Perfil')
+    ids = ids_de_bases(apps, Perfil.objects.values_list('base', flat=True).distinct())
+    for codigo, pk in ids.items():
+        Perfil.objects.filter(base=codigo).update(base_codigo=pk)
+
+
+def restaurar_bases(apps, schema_editor):
+    Base = apps.get_model('accounts', 'Base')
+    Perfil = apps.get_model('accounts', 'Perfil')
+    for pk, codigo in Base.objects.values_list('pk', 'codigo'):
+        Perfil.objects.filter(base_codigo=pk).update(base=codigo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_perfil_conductor_relacionado_and_more'),
+    ]
+
+    # Las bases pasan a ser datos: la columna base de Perfil guarda el id
+    # (smallint) de su fila. Se copia por una columna temporal.
+    operations = [
+        migrations.CreateModel(
+            name='Base',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('codigo', models.SlugField(unique=True)),
+                ('nombre', models.CharField(max_length=100)),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.RunPython(crear_bases, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='perfil',
+            name='base_codigo',
+            field=accounts.campos.CampoBase(null=True),
+        ),
+        # Nula durante la copia para que la migración se pueda revertir
+        migrations.AlterField(
+            model_name='perfil',
+            name='base',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.RunPython(copiar_bases, restaurar_bases),
+        migrations.RemoveField(
+            model_name='perfil',
+            name='base',
+        ),
+        migrations.RenameField(
+            model_name='perfil',
+            old_name='base_codigo',
+            new_name='base',
+        ),
+        migrations.AlterField(
+            model_name='perfil',
+            name='base',
+            field=accounts.campos.CampoBase(choices=accounts.bases.opciones_base),
+        ),
+    ]
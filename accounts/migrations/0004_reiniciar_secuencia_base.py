@@ -0,0 +1,22 @@
+from django.core.management.color import no_style
+from django.db import migrations
+
+
+def reiniciar_secuencia(apps, schema_editor):
+    # Las BD migradas con la 0003 anterior quedaron con la secuencia en 1
+    Base = apps.get_model('accounts', 'Base')
+    conexion = schema_editor.connection
+    with conexion.cursor() as cursor:
+        for sql in conexion.ops.sequence_reset_sql(no_style(), [Base]):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_base'),
+    ]
+
+    operations = [
+        migrations.RunPython(reiniciar_secuencia, migrations.RunPython.noop),
+    ]
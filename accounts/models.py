@@ -1,11 +1,27 @@
 from django.db import models
 from django.contrib.auth.models import User
-class Perfil(models.Model):
-    BASE_CHOICES = [
-        ('calle_larga', 'Spot Calle Larga'),
-        ('lampa', 'Spot Lampa'),
-    ]
 
+from .bases import opciones_base
+from .campos import CampoBase
+
+
+class Base(models.Model):
+    """
+    Bases de operación. El resto de las tablas guarda el id (smallint) y
+    en Python usa el código; ver accounts.campos.CampoBase.
+    """
+    id = models.SmallAutoField(primary_key=True)
+    codigo = models.SlugField(max_length=50, unique=True)
+    nombre = models.CharField(max_length=100)
+
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self):
+        return self.nombre
+
+
+class Perfil(models.Model):
     ROL_CHOICES = [
         ('admin', 'Administrador'),
         ('supervisor', 'Supervisor'),
@@ -14,7 +30,7 @@ class Perfil(models.Model):
     ]
 
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    base = models.CharField(max_length=50, choices=BASE_CHOICES)
+    base = CampoBase(choices=opciones_base)
     rol = models.CharField(max_length=20, choices=ROL_CHOICES)
 
     def __str__(self):
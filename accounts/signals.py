@@ -1,9 +1,21 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Perfil
+from .bases import invalidar_catalogo
+from .middleware import invalidar_usuario
+from .models import Base, Perfil
 
 @receiver(post_save, sender=User)
 def crear_perfil_usuario(sender, instance, created, **kwargs):
     if created:
-        Perfil.objects.create(user=instance, base='calle_larga', rol='externo')
\ No newline at end of file
+        Perfil.objects.create(user=instance, base='calle_larga', rol='externo')
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidar_usuario_en_cache(sender, instance, **kwargs):
+    invalidar_usuario(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Base)
+def invalidar_catalogo_bases(sender, **kwargs):
+    invalidar_catalogo()
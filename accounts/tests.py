@@ -1,3 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import bases
+from .middleware import CACHE_USUARIOS, clave_usuario
+from .models import Base, Perfil
+
+
+class AutenticacionConPerfilTests(TestCase):
+    """
+    Los cambios hechos por otro proceso (aquí, update() sin señales) se ven
+    en la solicitud siguiente aunque la verificación de la sesión esté en caché.
+    """
+
+    def setUp(self):
+        caches[CACHE_USUARIOS].clear()
+        self.usuario = User.objects.create_user('ana', password='clave')
+        Perfil.objects.filter(user=self.usuario).update(base='lampa')
+        self.client.force_login(self.usuario)
+        self.url = reverse('dashboard')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertIsNotNone(caches[CACHE_USUARIOS].get(clave_usuario(self.usuario.pk)))
+
+    def test_una_consulta_de_usuario_con_perfil(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get(self.url)
+        usuarios = [c['sql'] for c in consultas.captured_queries if 'FROM "auth_user"' in c['sql']]
+        self.assertEqual(len(usuarios), 1)
+        self.assertIn('accounts_perfil', usuarios[0])
+
+    def test_desactivar_cierra_el_acceso(self):
+        User.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertRedirects(self.client.get(self.url), f"{reverse('login')}?next={self.url}", fetch_redirect_response=False)
+
+    def test_cambio_de_base_se_ve_de_inmediato(self):
+        Perfil.objects.filter(user=self.usuario).update(base='calle_larga', rol='admin')
+        respuesta = self.client.get(self.url)
+        perfil = respuesta.wsgi_request.perfil
+        self.assertEqual((perfil.base, perfil.rol), ('calle_larga', 'admin'))
+
+    def test_cambio_de_contrasena_cierra_la_sesion(self):
+        usuario = User.objects.get(pk=self.usuario.pk)
+        usuario.set_password('otra')
+        User.objects.filter(pk=usuario.pk).update(password=usuario.password)
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(respuesta.wsgi_request.user.is_authenticated)
+
+
+class CatalogoBasesTests(TestCase):
+
+    def setUp(self):
+        bases.invalidar_catalogo()
+        self.addCleanup(bases.invalidar_catalogo)
+
+    def test_crear_una_base_no_choca_con_las_iniciales(self):
+        # En PostgreSQL la secuencia debe ir por delante de los ids fijos de la 0003
+        base = Base.objects.create(codigo='santiago', nombre='Spot Santiago')
+        self.assertNotIn(base.pk, [1, 2])
+        self.assertEqual(bases.id_de_codigo('santiago'), base.pk)
+
+    def test_codigo_desconocido_recarga_con_limite(self):
+        bases.catalogo()
+        # Agregada por otro proceso: este no recibe la señal
+        nueva, = Base.objects.bulk_create([Base(codigo='santiago', nombre='Spot Santiago')])
+        self.assertIsNone(bases.id_de_codigo('santiago'))
 
-# Create your tests here.
+        ahora = bases.catalogo().cargado + bases.INTERVALO_RECARGA + 1
+        with mock.patch('accounts.bases.time.monotonic', return_value=ahora):
+            self.assertEqual(bases.id_de_codigo('santiago'), nueva.pk)
+            self.assertEqual(bases.codigo_de_id(nueva.pk), 'santiago')
@@ -17,6 +17,8 @@ class ConductorAdmin(admin.ModelAdmin):
     list_display = ['nombre', 'base', 'get_base_display', 'perfil', 'tiene_perfil']
     list_filter = ['base']
     search_fields = ['nombre', 'perfil__user__username']
+    # La columna perfil muestra el usuario: sin esto, una consulta por fila
+    list_select_related = ['perfil__user']
     # ELIMINA readonly_fields ya que Conductor no tiene 'creado_en'
     list_per_page = 20
     
@@ -0,0 +1,238 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .archivo import archivos_de_periodos, ruta_archivo
+from .models import Conductor, Entrega, Periodo, Supervisor
+from .versiones import obtener_version
+
+
+PERIODOS_POR_DEFECTO = 4
+MINIMO_INCUMPLIDAS = 2
+# Filas de conductores en riesgo que se muestran en la vista (el comando exporta todas)
+MAXIMO_FILAS_VISTA = 200
+
+# Resultado de cada entrega para el cumplimiento
+CUMPLIDA = 'cumplida'
+JUSTIFICADA = 'justificada'
+EN_PROCESO = 'en_proceso'
+INCUMPLIDA = 'incumplida'
+RESULTADOS = [CUMPLIDA, JUSTIFICADA, EN_PROCESO, INCUMPLIDA]
+ETIQUETAS_RESULTADO = {
+    CUMPLIDA: 'Cumplida',
+    JUSTIFICADA: 'Justificada',
+    EN_PROCESO: 'En proceso',
+    INCUMPLIDA: 'Incumplida',
+}
+FASES_JUSTIFICADAS = ['desvinculado', 'licencia']
+
+COLUMNAS = ['conductor_id', 'supervisor_id', 'periodo_id', 'estado', 'fase', 'fase_actualizada']
+
+
+def ultimos_periodos(cantidad, hoy=None):
+    """
+    Los `cantidad` últimos trimestres ya terminados que existen, del más
+    antiguo al más reciente. El trimestre en curso no cuenta: sus entregas
+    pendientes todavía no son incumplimientos.
+    """
+    hoy = hoy or timezone.localdate()
+    trimestre_actual = (hoy.month - 1) // 3 + 1
+    terminados = Periodo.objects.filter(
+        Q(año__lt=hoy.year) | Q(año=hoy.year, trimestre__lt=f'Q{trimestre_actual}')
+    ).order_by('-año', '-trimestre', 'pk')
+    # Si hay periodos duplicados (mismo trimestre y año) se toma el primero creado
+    vistos = {}
+    for periodo in terminados:
+        vistos.setdefault((periodo.año, periodo.trimestre), periodo)
+        if len(vistos) == cantidad:
+            break
+    return list(reversed(list(vistos.values())))
+
+
+def leer_archivo(archivo, base):
+    """Entregas de un periodo archivado (core.archivo) con las mismas columnas que cargar_entregas."""
+    df = pd.read_csv(
+        ruta_archivo(archivo),
+        usecols=['base', *COLUMNAS],
+        dtype={'base': str, 'estado': str, 'fase': str},
+        keep_default_na=False,
+        na_values={'supervisor_id': [''], 'fase_actualizada': ['']},
+    )
+    if base:
+        df = df[df['base'] == base]
+    df['fase_actualizada'] = pd.to_datetime(df['fase_actualizada'], utc=True, format='ISO8601')
+    return df[COLUMNAS]
+
+
+def cargar_entregas(base, periodos):
+    """
+    Una sola consulta angosta (values_list) de las entregas de los
+    periodos, como DataFrame, más las de los periodos archivados.
+    """
+    entregas = Entrega.objects.filter(periodo__in=periodos)
+    if base:
+        entregas = entregas.filter(base=base)
+    filas = entregas.order_by().values_list(*COLUMNAS).iterator(chunk_size=10_000)
+    df = pd.DataFrame.from_records(filas, columns=COLUMNAS)
+    archivadas = [leer_archivo(archivo, base) for archivo in archivos_de_periodos(periodos)]
+    if archivadas:
+        df = pd.concat([df, *archivadas], ignore_index=True)
+    df['resultado'] = clasificar(df)
+    return df
+
+
+def clasificar(df):
+    """
+    Resultado de cada entrega según estado y fase, en este orden: entregada
+    (por estado o fase) es cumplida, desvinculado o licencia la justifican,
+    en firma o en curso sigue en proceso y el resto es incumplida.
+    """
+    return np.select(
+        [
+            (df['estado'] == 'entregada') | (df['fase'] == 'entregada'),
+            df['fase'].isin(FASES_JUSTIFICADAS),
+            (df['fase'] == 'en_firma') | (df['estado'] == 'en_curso'),
+        ],
+        [CUMPLIDA, JUSTIFICADA, EN_PROCESO],
+        default=INCUMPLIDA,
+    )
+
+
+def matriz_conductores(df, periodos):
+    """
+    Una fila por conductor y una columna por periodo con el resultado de su
+    entrega (vacío si no tuvo). Agrega cuántas cumplió, cuántas incumplió y
+    la tasa de cumplimiento sobre las evaluables (cumplidas + incumplidas).
+    """
+    ids = [periodo.pk for periodo in periodos]
+    # (conductor, periodo) es único en Entrega, así que pivot no necesita agregar
+    matriz = df.pivot(index='conductor_id', columns='periodo_id', values='resultado').reindex(columns=ids)
+    conteos = pd.DataFrame({
+        resultado: (matriz == resultado).sum(axis=1) for resultado in [CUMPLIDA, INCUMPLIDA]
+    })
+    evaluables = conteos[CUMPLIDA] + conteos[INCUMPLIDA]
+    matriz['cumplidas'] = conteos[CUMPLIDA]
+    matriz['incumplidas'] = conteos[INCUMPLIDA]
+    matriz['tasa'] = (conteos[CUMPLIDA] / evaluables.where(evaluables > 0)).round(3)
+    return matriz.sort_values(['incumplidas', 'tasa'], ascending=[False, True])
+
+
+def resumen_supervisores(df, ahora):
+    """
+    Por supervisor: entregas, tasa de cumplimiento, cuántas tiene en firma
+    ahora y hace cuántos días (promedio y máximo) pasaron a esa fase. Las
+    entregas sin fecha de cambio de fase se cuentan aparte.
+    """
+    df = df[df['supervisor_id'].notna()].copy()
+    en_firma = df['fase'] == 'en_firma'
+    fechas = pd.to_datetime(df['fase_actualizada'], utc=True)
+    df['dias_en_firma'] = ((ahora - fechas).dt.total_seconds() / 86400).where(en_firma)
+    df['en_firma'] = en_firma
+    df['sin_fecha'] = en_firma & fechas.isna()
+    df['cumplida'] = df['resultado'] == CUMPLIDA
+    df['evaluable'] = df['resultado'].isin([CUMPLIDA, INCUMPLIDA])
+
+    grupos = df.groupby('supervisor_id')
+    resumen = grupos.agg(
+        entregas=('resultado', 'size'),
+        cumplidas=('cumplida', 'sum'),
+        evaluables=('evaluable', 'sum'),
+        en_firma=('en_firma', 'sum'),
+        en_firma_sin_fecha=('sin_fecha', 'sum'),
+        dias_en_firma_promedio=('dias_en_firma', 'mean'),
+        dias_en_firma_maximo=('dias_en_firma', 'max'),
+    )
+    resumen['tasa'] = (resumen['cumplidas'] / resumen['evaluables'].where(resumen['evaluables'] > 0)).round(3)
+    resumen['dias_en_firma_promedio'] = resumen['dias_en_firma_promedio'].round(1)
+    resumen['dias_en_firma_maximo'] = resumen['dias_en_firma_maximo'].round(1)
+    resumen.index = resumen.index.astype(int)
+    return resumen.sort_values('dias_en_firma_promedio', ascending=False)
+
+
+def cumplimiento_por_periodo(df, periodos):
+    """Cantidad de entregas por resultado en cada periodo (tendencia)."""
+    tabla = pd.crosstab(df['periodo_id'], df['resultado']).reindex(
+        index=[periodo.pk for periodo in periodos], columns=RESULTADOS, fill_value=0
+    )
+    evaluables = tabla[CUMPLIDA] + tabla[INCUMPLIDA]
+    tabla['tasa'] = (tabla[CUMPLIDA] / evaluables.where(evaluables > 0)).round(3)
+    return tabla
+
+
+def _limpiar(valor):
+    """NaN/tipos numpy a valores nativos para la caché y las plantillas."""
+    if isinstance(valor, float) and np.isnan(valor):
+        return None
+    if isinstance(valor, np.generic):
+        return _limpiar(valor.item())
+    return valor
+
+
+def calcular_cumplimiento(base, cantidad=PERIODOS_POR_DEFECTO, ahora=None):
+    """Periodos analizados y DataFrames de la analítica: (periodos, conductores, supervisores, por_periodo)."""
+    ahora = ahora or timezone.now()
+    periodos = ultimos_periodos(cantidad, hoy=timezone.localdate(ahora))
+    df = cargar_entregas(base, periodos)
+    return periodos, matriz_conductores(df, periodos), resumen_supervisores(df, ahora), cumplimiento_por_periodo(df, periodos)
+
+
+def analitica_cumplimiento(base, cantidad=PERIODOS_POR_DEFECTO, minimo=MINIMO_INCUMPLIDAS, limite=MAXIMO_FILAS_VISTA):
+    """
+    Resultado listo para la vista, en caché por base, versión de datos y
+    día (los días en firma dependen de la fecha). Mientras los datos de la
+    base no cambien, repetir la consulta no toca la BD de entregas.
+    """
+    version = obtener_version(base)
+    clave = f'analitica:{base or "*"}:{version}:{timezone.localdate()}:{cantidad}:{minimo}:{limite}'
+    resultado = cache.get(clave)
+    if resultado is not None:
+        return resultado
+
+    periodos, conductores, supervisores, por_periodo = calcular_cumplimiento(base, cantidad)
+    en_riesgo = conductores[conductores['incumplidas'] >= minimo]
+    nombres_conductores = dict(
+        Conductor.objects.filter(pk__in=en_riesgo.index[:limite].tolist()).values_list('pk', 'nombre')
+    )
+    nombres_supervisores = dict(
+        Supervisor.objects.filter(pk__in=supervisores.index.tolist()).values_list('pk', 'nombre')
+    )
+    ids = [periodo.pk for periodo in periodos]
+
+    def registros(tabla, **extra):
+        """Filas como dicts de tipos nativos (to_dict respeta el tipo de cada columna)."""
+        return [
+            {**{campo: valor(indice) for campo, valor in extra.items()},
+             **{campo: _limpiar(dato) for campo, dato in fila.items()}}
+            for indice, fila in zip(tabla.index, tabla.to_dict('records'))
+        ]
+
+    filas_riesgo = en_riesgo.head(limite)
+    resultado = {
+        'version': version,
+        'generado': timezone.now(),
+        'periodos': [str(periodo) for periodo in periodos],
+        'minimo': minimo,
+        'total_conductores': len(conductores),
+        'total_en_riesgo': len(en_riesgo),
+        'conductores': [
+            {
+                'nombre': fila['nombre'],
+                'celdas': [
+                    (fila[periodo], ETIQUETAS_RESULTADO[fila[periodo]]) if fila[periodo] else None
+                    for periodo in ids
+                ],
+                'cumplidas': fila['cumplidas'],
+                'incumplidas': fila['incumplidas'],
+                'tasa': fila['tasa'],
+            }
+            for fila in registros(filas_riesgo, nombre=lambda pk: nombres_conductores.get(pk, pk))
+        ],
+        'supervisores': registros(supervisores, nombre=lambda pk: nombres_supervisores.get(pk, pk)),
+        'por_periodo': registros(por_periodo, periodo=lambda pk: str(periodos[ids.index(pk)])),
+    }
+    cache.set(clave, resultado, timeout=datetime.timedelta(days=1).total_seconds())
+    return resultado
@@ -0,0 +1,58 @@
+import django_filters
+
+from accounts.bases import opciones_base
+from core.filtros import condicion_conductor, condicion_periodo
+from core.models import Entrega, Conductor, Supervisor, Periodo
+
+
+class EntregaFilter(django_filters.FilterSet):
+    """Mismos filtros que el dashboard (core.filtros.filtrar_entregas) más ids exactos."""
+
+    estado = django_filters.ChoiceFilter(choices=Entrega.ESTADO_CHOICES)
+    fase = django_filters.ChoiceFilter(choices=Entrega.FASE_CHOICES)
+    periodo = django_filters.CharFilter(method='filtrar_periodo', label='Periodo ("2024", "Q3 2024", "Enero")')
+    conductor = django_filters.CharFilter(method='filtrar_conductor', label='Nombre del conductor (contiene)')
+    supervisor = django_filters.CharFilter(field_name='supervisor__nombre', lookup_expr='icontains')
+    base = django_filters.ChoiceFilter(choices=opciones_base)
+    conductor_id = django_filters.NumberFilter()
+    supervisor_id = django_filters.NumberFilter()
+    periodo_id = django_filters.NumberFilter()
+    fecha_desde = django_filters.DateFilter(field_name='fecha_entrega', lookup_expr='gte')
+    fecha_hasta = django_filters.DateFilter(field_name='fecha_entrega', lookup_expr='lte')
+
+    class Meta:
+        model = Entrega
+        fields = []
+
+    def filtrar_periodo(self, queryset, name, value):
+        return queryset.filter(condicion_periodo(value))
+
+    def filtrar_conductor(self, queryset, name, value):
+        return queryset.filter(condicion_conductor(value))
+
+
+class ConductorFilter(django_filters.FilterSet):
+    nombre = django_filters.CharFilter(lookup_expr='icontains')
+    base = django_filters.ChoiceFilter(choices=opciones_base)
+
+    class Meta:
+        model = Conductor
+        fields = []
+
+
+class SupervisorFilter(django_filters.FilterSet):
+    nombre = django_filters.CharFilter(lookup_expr='icontains')
+    base = django_filters.ChoiceFilter(choices=opciones_base)
+
+    class Meta:
+        model = Supervisor
+        fields = []
+
+
+class PeriodoFilter(django_filters.FilterSet):
+    trimestre = django_filters.ChoiceFilter(choices=Periodo.TRIMESTRE_CHOICES)
+    año = django_filters.NumberFilter()
+
+    class Meta:
+        model = Periodo
+        fields = []
@@ -0,0 +1,296 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+
+from core.importacion import normalizar_nombre
+from core.models import Conductor, Entrega, Periodo, Supervisor, ContadorRegistro
+from core.referencias import invalidar_referencias
+from core.resumen import aplicar_deltas, deltas_creadas, deltas_modificadas
+from core.versiones import bases_afectadas, incrementar_version
+from .serializadores import ConductorLoteSerializer, EntregaLoteSerializer
+
+
+TAMANO_LOTE_BD = 1000
+NO_PERMITIDO = 'No existe o no pertenece a tu base.'
+REPETIDO = 'El mismo registro aparece más de una vez en el lote.'
+
+
+class ResultadoLote:
+    """Resultado de cada ítem, en el mismo orden en que llegaron."""
+
+    def __init__(self, total):
+        self.resultados = [None] * total
+
+    def error(self, indice, errores):
+        if isinstance(errores, str):
+            errores = {'non_field_errors': [errores]}
+        self.resultados[indice] = {'indice': indice, 'resultado': 'error', 'id': None, 'errores': errores}
+
+    def ok(self, indice, resultado, pk):
+        self.resultados[indice] = {'indice': indice, 'resultado': resultado, 'id': pk}
+
+    def omitir_pendientes(self):
+        """En modo todo_o_nada, marca como omitidos los ítems válidos que no se escribieron."""
+        for indice, item in enumerate(self.resultados):
+            if item is None:
+                self.resultados[indice] = {'indice': indice, 'resultado': 'omitido', 'id': None}
+
+    @property
+    def hay_errores(self):
+        return any(item and item['resultado'] == 'error' for item in self.resultados)
+
+    def datos(self):
+        resumen = Counter(item['resultado'] for item in self.resultados)
+        return {
+            'resumen': {clave: resumen.get(clave, 0) for clave in ['creado', 'actualizado', 'sin_cambios', 'omitido', 'error']},
+            'resultados': self.resultados,
+        }
+
+
+def _validar(serializador, items, modo, resultado):
+    """Validación de formato ítem a ítem (sin consultas). Devuelve [(indice, datos)]."""
+    validos = []
+    for indice, item in enumerate(items):
+        datos = serializador(data=item, context={'modo': modo})
+        if datos.is_valid():
+            validos.append((indice, datos.validated_data))
+        else:
+            resultado.error(indice, datos.errors)
+    return validos
+
+
+def _aplicar_cambios(objeto, datos, campos):
+    """Asigna los campos presentes en datos. Devuelve los que cambiaron."""
+    cambios = {}
+    for campo in campos:
+        if campo in datos and getattr(objeto, campo) != datos[campo]:
+            setattr(objeto, campo, datos[campo])
+            cambios[campo] = datos[campo]
+    return cambios
+
+
+def _guardar_cambios(modelo, por_actualizar):
+    """
+    Escribe [(indice, objeto, cambios)]. Los objetos con exactamente los
+    mismos cambios (p. ej. muchas entregas pasadas a 'entregada') se
+    actualizan con un UPDATE ... WHERE id IN por grupo; el resto con un
+    bulk_update limitado a los campos que cambiaron, porque el CASE WHEN de
+    bulk_update es caro de construir por cada fila y campo.
+    """
+    grupos = defaultdict(list)
+    for _, objeto, cambios in por_actualizar:
+        if cambios:
+            grupos[tuple(sorted(cambios.items()))].append(objeto.pk)
+
+    sueltos = []
+    campos = set()
+    for cambios, pks in grupos.items():
+        if len(pks) > 1:
+            for inicio in range(0, len(pks), TAMANO_LOTE_BD):
+                modelo.objects.filter(pk__in=pks[inicio:inicio + TAMANO_LOTE_BD]).update(**dict(cambios))
+        else:
+            sueltos.extend(pks)
+            campos.update(campo for campo, _ in cambios)
+
+    if sueltos:
+        sueltos = set(sueltos)
+        modelo.objects.bulk_update(
+            [objeto for _, objeto, _ in por_actualizar if objeto.pk in sueltos],
+            sorted(campos),
+            batch_size=TAMANO_LOTE_BD,
+        )
+
+
+@transaction.atomic
+def lote_conductores(items, modo, base=None, todo_o_nada=False):
+    """
+    Crea/actualiza conductores en bloque. En modo upsert un ítem sin id se
+    asocia al conductor con el mismo nombre (sin distinguir mayúsculas),
+    igual que la carga masiva. Con `base` solo se tocan conductores de esa base.
+    Los existentes se leen bloqueados en la misma transacción que los escribe.
+    """
+    resultado = ResultadoLote(len(items))
+    validos = _validar(ConductorLoteSerializer, items, modo, resultado)
+
+    alcance = Conductor.objects.select_for_update()
+    if base:
+        alcance = alcance.filter(base=base)
+
+    # Una consulta por ids y otra por nombres para todo el lote
+    por_id = alcance.in_bulk({datos['id'] for _, datos in validos if 'id' in datos})
+    por_nombre = {}
+    if modo == 'upsert':
+        claves = {normalizar_nombre(datos['nombre']) for _, datos in validos if 'id' not in datos}
+        existentes = alcance.annotate(clave=Lower(Trim('nombre'))).filter(clave__in=claves).order_by('-pk')
+        for conductor in existentes:
+            por_nombre[normalizar_nombre(conductor.nombre)] = conductor
+
+    vistos = set()
+    por_crear = []
+    por_actualizar = []
+    for indice, datos in validos:
+        if base and datos.get('base', base) != base:
+            resultado.error(indice, {'base': [f'Solo puedes registrar conductores de tu base ({base}).']})
+            continue
+        if 'id' in datos:
+            conductor = por_id.get(datos['id'])
+            if conductor is None:
+                resultado.error(indice, {'id': [NO_PERMITIDO]})
+                continue
+        else:
+            conductor = por_nombre.get(normalizar_nombre(datos['nombre']))
+
+        clave = conductor.pk if conductor else normalizar_nombre(datos['nombre'])
+        if clave in vistos:
+            resultado.error(indice, REPETIDO)
+            continue
+        vistos.add(clave)
+
+        if conductor is None:
+            if not (base or datos.get('base')):
+                resultado.error(indice, {'base': ['Requerido.']})
+                continue
+            por_crear.append((indice, Conductor(nombre=datos['nombre'], base=base or datos['base'])))
+        else:
+            por_actualizar.append((indice, conductor, _aplicar_cambios(conductor, datos, ['nombre', 'base'])))
+
+    if todo_o_nada and resultado.hay_errores:
+        resultado.omitir_pendientes()
+        return resultado
+
+    Conductor.objects.bulk_create([conductor for _, conductor in por_crear], batch_size=TAMANO_LOTE_BD)
+    _guardar_cambios(Conductor, por_actualizar)
+    # Sin señales en escrituras en bloque: se invalida la caché a mano
+    # (también la base anterior de los conductores que cambiaron de base)
+    bases = bases_afectadas(
+        [conductor for _, conductor in por_crear]
+        + [conductor for _, conductor, cambios in por_actualizar if cambios]
+    )
+    incrementar_version(*bases)
+    invalidar_referencias(*bases)
+
+    for indice, conductor in por_crear:
+        resultado.ok(indice, 'creado', conductor.pk)
+    for indice, conductor, cambios in por_actualizar:
+        resultado.ok(indice, 'actualizado' if cambios else 'sin_cambios', conductor.pk)
+    return resultado
+
+
+@transaction.atomic
+def lote_entregas(items, modo, base=None, todo_o_nada=False):
+    """
+    Crea/actualiza entregas en bloque. Cada ítem se identifica por id o por
+    (conductor_id, periodo_id), la misma clave única de la carga masiva. Con
+    `base` solo se tocan entregas de esa base (Entrega.base, como el
+    dashboard) y solo se crean para conductores de esa base. Los campos
+    ausentes no se modifican. Las entregas existentes se leen bloqueadas en
+    la misma transacción que las escribe: los cambios y el resumen parten
+    de lo que hay en la BD.
+    """
+    resultado = ResultadoLote(len(items))
+    validos = _validar(EntregaLoteSerializer, items, modo, resultado)
+
+    conductores = Conductor.objects.all()
+    supervisores = Supervisor.objects.all()
+    entregas = Entrega.objects.select_for_update(of=('self',))
+    if base:
+        conductores = conductores.filter(base=base)
+        supervisores = supervisores.filter(base=base)
+        entregas = entregas.filter(base=base)
+
+    def ids(campo):
+        return {datos[campo] for _, datos in validos if datos.get(campo) is not None}
+
+    # Existencia y alcance de todas las referencias del lote, una consulta por tabla
+    base_conductor = dict(conductores.filter(pk__in=ids('conductor_id')).values_list('pk', 'base'))
+    periodos_validos = set(Periodo.objects.filter(pk__in=ids('periodo_id')).values_list('pk', flat=True))
+    supervisores_validos = set(supervisores.filter(pk__in=ids('supervisor_id')).values_list('pk', flat=True))
+    por_id = entregas.in_bulk(ids('id'))
+    por_clave = {
+        (entrega.conductor_id, entrega.periodo_id): entrega
+        for entrega in entregas.filter(conductor_id__in=base_conductor, periodo_id__in=periodos_validos)
+    }
+
+    vistos = set()
+    por_crear = []
+    por_actualizar = []
+    campos = ['supervisor_id', 'estado', 'fase', 'fecha_entrega', 'notas']
+    ahora = timezone.now()
+    for indice, datos in validos:
+        errores = {}
+        if 'conductor_id' in datos and datos['conductor_id'] not in base_conductor:
+            errores['conductor_id'] = [NO_PERMITIDO]
+        if 'periodo_id' in datos and datos['periodo_id'] not in periodos_validos:
+            errores['periodo_id'] = ['No existe.']
+        if datos.get('supervisor_id') is not None and datos['supervisor_id'] not in supervisores_validos:
+            errores['supervisor_id'] = [NO_PERMITIDO]
+        if errores:
+            resultado.error(indice, errores)
+            continue
+
+        if 'id' in datos:
+            entrega = por_id.get(datos['id'])
+            if entrega is None:
+                resultado.error(indice, {'id': [NO_PERMITIDO]})
+                continue
+            if any(campo in datos and datos[campo] != getattr(entrega, campo) for campo in ['conductor_id', 'periodo_id']):
+                resultado.error(indice, 'No se puede cambiar el conductor ni el periodo de una entrega.')
+                continue
+        else:
+            entrega = por_clave.get((datos['conductor_id'], datos['periodo_id']))
+
+        if modo == 'crear' and entrega is not None:
+            resultado.error(indice, 'Ya existe una entrega para este conductor en este periodo.')
+            continue
+        if modo == 'actualizar' and entrega is None:
+            resultado.error(indice, 'No existe una entrega para este conductor en este periodo.')
+            continue
+
+        clave = entrega.pk if entrega else (datos['conductor_id'], datos['periodo_id'])
+        if clave in vistos:
+            resultado.error(indice, REPETIDO)
+            continue
+        vistos.add(clave)
+
+        if entrega is None:
+            por_crear.append((indice, Entrega(
+                conductor_id=datos['conductor_id'],
+                periodo_id=datos['periodo_id'],
+                base=base_conductor[datos['conductor_id']],
+                supervisor_id=datos.get('supervisor_id'),
+                estado=datos.get('estado', 'pendiente'),
+                fase=datos.get('fase', 'no_entregada'),
+                fecha_entrega=datos.get('fecha_entrega'),
+                notas=datos.get('notas'),
+            )))
+        else:
+            cambios = _aplicar_cambios(entrega, datos, campos)
+            if entrega.sellar_fase(ahora):
+                cambios['fase_actualizada'] = ahora
+            por_actualizar.append((indice, entrega, cambios))
+
+    if todo_o_nada and resultado.hay_errores:
+        resultado.omitir_pendientes()
+        return resultado
+
+    # Un solo bloque de números correlativos para todas las nuevas
+    numeros = ContadorRegistro.reservar(len(por_crear))
+    for (_, entrega), numero in zip(por_crear, numeros):
+        entrega.numero_registro = numero
+    Entrega.objects.bulk_create([entrega for _, entrega in por_crear], batch_size=TAMANO_LOTE_BD)
+    _guardar_cambios(Entrega, por_actualizar)
+    deltas = deltas_creadas([entrega for _, entrega in por_crear])
+    deltas.update(deltas_modificadas([entrega for _, entrega, cambios in por_actualizar if cambios]))
+    aplicar_deltas(deltas)
+    # bulk_create/update no emiten señales: se invalida la caché a mano
+    bases = {entrega.base for _, entrega in por_crear}
+    bases |= {entrega.base for _, entrega, cambios in por_actualizar if cambios}
+    incrementar_version(*bases)
+
+    for indice, entrega in por_crear:
+        resultado.ok(indice, 'creado', entrega.pk)
+    for indice, entrega, cambios in por_actualizar:
+        resultado.ok(indice, 'actualizado' if cambios else 'sin_cambios', entrega.pk)
+    return resultado
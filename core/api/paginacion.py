@@ -0,0 +1,63 @@
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from core.paginacion import PaginadorKeyset
+
+
+class PaginacionCursor(BasePagination):
+    """
+    Paginación por cursor de la API sobre PaginadorKeyset (el mismo del
+    dashboard): sin COUNT ni OFFSET, cada página es WHERE + LIMIT sobre un
+    orden indexado. Cada vista declara su `orden_cursor`.
+    """
+
+    parametro_cursor = 'cursor'
+    parametro_tamano = 'tamano'
+    tamano_pagina = 50
+    tamano_maximo = 500
+
+    def obtener_tamano(self, request):
+        try:
+            tamano = int(request.query_params.get(self.parametro_tamano, self.tamano_pagina))
+        except (TypeError, ValueError):
+            return self.tamano_pagina
+        return max(1, min(tamano, self.tamano_maximo))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginador = PaginadorKeyset(queryset, view.orden_cursor, self.obtener_tamano(request))
+        self.pagina = paginador.get_page(request.query_params.get(self.parametro_cursor))
+        return list(self.pagina)
+
+    def _enlace(self, token):
+        if token is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.parametro_cursor, token)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'siguiente': self._enlace(self.pagina.cursor_siguiente),
+            'anterior': self._enlace(self.pagina.cursor_anterior),
+            'resultados': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['resultados'],
+            'properties': {
+                'siguiente': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'anterior': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'resultados': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.parametro_cursor, 'required': False, 'in': 'query',
+             'description': 'Cursor devuelto en "siguiente" o "anterior".', 'schema': {'type': 'string'}},
+            {'name': self.parametro_tamano, 'required': False, 'in': 'query',
+             'description': f'Resultados por página (máximo {self.tamano_maximo}).', 'schema': {'type': 'integer'}},
+        ]
@@ -0,0 +1,136 @@
+from rest_framework import serializers
+
+from accounts.bases import codigos_base
+from core.models import Entrega, Periodo
+
+
+# Serializadores de solo lectura sobre diccionarios de .values(): no se
+# instancian modelos ni se resuelven relaciones fila por fila.
+
+class PeriodoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    trimestre = serializers.CharField()
+    trimestre_display = serializers.SerializerMethodField()
+    año = serializers.IntegerField()
+
+    ETIQUETAS = dict(Periodo.TRIMESTRE_CHOICES)
+
+    def get_trimestre_display(self, fila):
+        return self.ETIQUETAS.get(fila['trimestre'], fila['trimestre'])
+
+
+class ConductorSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    nombre = serializers.CharField()
+    base = serializers.CharField()
+
+
+class SupervisorSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    nombre = serializers.CharField()
+    base = serializers.CharField()
+
+
+class EntregaSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    numero_registro = serializers.IntegerField()
+    base = serializers.CharField()
+    estado = serializers.CharField()
+    estado_display = serializers.SerializerMethodField()
+    fase = serializers.CharField()
+    fase_display = serializers.SerializerMethodField()
+    fecha_entrega = serializers.DateField(allow_null=True)
+    notas = serializers.CharField(allow_null=True)
+    conductor_id = serializers.IntegerField()
+    conductor_nombre = serializers.CharField(source='conductor__nombre')
+    supervisor_id = serializers.IntegerField(allow_null=True)
+    supervisor_nombre = serializers.CharField(source='supervisor__nombre', allow_null=True)
+    periodo_id = serializers.IntegerField()
+    periodo_trimestre = serializers.CharField(source='periodo__trimestre')
+    periodo_año = serializers.IntegerField(source='periodo__año')
+
+    ESTADOS = dict(Entrega.ESTADO_CHOICES)
+    FASES = dict(Entrega.FASE_CHOICES)
+
+    # Columnas que pide la vista en .values(); deben coincidir con los source
+    CAMPOS = [
+        'id', 'numero_registro', 'base', 'estado', 'fase', 'fecha_entrega', 'notas',
+        'conductor_id', 'conductor__nombre', 'supervisor_id', 'supervisor__nombre',
+        'periodo_id', 'periodo__trimestre', 'periodo__año',
+    ]
+
+    def get_estado_display(self, fila):
+        return self.ESTADOS.get(fila['estado'], fila['estado'])
+
+    def get_fase_display(self, fila):
+        return self.FASES.get(fila['fase'], fila['fase'])
+
+
+# --- Escritura por lotes ---
+# Validan cada ítem sin consultas; la existencia de ids y el alcance por base
+# se comprueban después para todo el lote de una vez (ver core.api.lotes).
+
+MODOS_LOTE = [
+    ('crear', 'Crear'),
+    ('actualizar', 'Actualizar'),
+    ('upsert', 'Crear o actualizar'),
+]
+
+MAXIMO_LOTE = 5000
+
+
+class LoteSerializer(serializers.Serializer):
+    modo = serializers.ChoiceField(choices=MODOS_LOTE)
+    todo_o_nada = serializers.BooleanField(default=False)
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAXIMO_LOTE,
+    )
+
+
+class ConductorLoteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    nombre = serializers.CharField(max_length=150, required=False)
+    # Las bases son datos (accounts.Base): se validan contra el catálogo en memoria
+    base = serializers.CharField(required=False)
+
+    def validate_base(self, valor):
+        if valor not in codigos_base():
+            raise serializers.ValidationError(f'"{valor}" no es una base válida.')
+        return valor
+
+    def validate(self, datos):
+        modo = self.context['modo']
+        if modo == 'crear' and 'id' in datos:
+            raise serializers.ValidationError({'id': 'No se indica al crear.'})
+        if modo == 'actualizar' and 'id' not in datos:
+            raise serializers.ValidationError({'id': 'Requerido para actualizar.'})
+        if 'id' not in datos and not datos.get('nombre', '').strip():
+            raise serializers.ValidationError({'nombre': 'Requerido.'})
+        if 'nombre' in datos:
+            datos['nombre'] = datos['nombre'].strip()
+        return datos
+
+
+class EntregaLoteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    conductor_id = serializers.IntegerField(required=False)
+    periodo_id = serializers.IntegerField(required=False)
+    supervisor_id = serializers.IntegerField(required=False, allow_null=True)
+    estado = serializers.ChoiceField(choices=Entrega.ESTADO_CHOICES, required=False)
+    fase = serializers.ChoiceField(choices=Entrega.FASE_CHOICES, required=False)
+    fecha_entrega = serializers.DateField(required=False, allow_null=True)
+    notas = serializers.CharField(required=False, allow_null=True, allow_blank=True)
+
+    def validate(self, datos):
+        modo = self.context['modo']
+        por_clave = 'conductor_id' in datos and 'periodo_id' in datos
+        if modo == 'crear':
+            if 'id' in datos:
+                raise serializers.ValidationError({'id': 'No se indica al crear.'})
+            if not por_clave:
+                raise serializers.ValidationError('conductor_id y periodo_id son requeridos para crear.')
+        elif 'id' not in datos and not por_clave:
+            raise serializers.ValidationError('Indica id o bien conductor_id y periodo_id.')
+        return datos
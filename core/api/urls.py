@@ -0,0 +1,26 @@
+from django.urls import include, path
+from drf_yasg import openapi
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions, routers
+from rest_framework.authtoken.views import obtain_auth_token
+
+from .vistas import EntregaViewSet, ConductorViewSet, SupervisorViewSet, PeriodoViewSet
+
+
+router = routers.DefaultRouter()
+router.register('entregas', EntregaViewSet, basename='api-entregas')
+router.register('conductores', ConductorViewSet, basename='api-conductores')
+router.register('supervisores', SupervisorViewSet, basename='api-supervisores')
+router.register('periodos', PeriodoViewSet, basename='api-periodos')
+
+esquema = get_schema_view(
+    openapi.Info(title='Entrega de Libretas API', default_version='v1'),
+    public=False,
+    permission_classes=[permissions.IsAuthenticated],
+)
+
+urlpatterns = [
+    path('', include(router.urls)),
+    path('token/', obtain_auth_token, name='api-token'),
+    path('docs/', esquema.with_ui('swagger', cache_timeout=0), name='api-docs'),
+]
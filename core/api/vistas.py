@@ -0,0 +1,117 @@
+from django.db import IntegrityError
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from core.models import Entrega, Conductor, Supervisor, Periodo
+from .filtros import EntregaFilter, ConductorFilter, SupervisorFilter, PeriodoFilter
+from .lotes import lote_conductores, lote_entregas
+from .paginacion import PaginacionCursor
+from .serializadores import (
+    EntregaSerializer, ConductorSerializer, SupervisorSerializer, PeriodoSerializer, LoteSerializer,
+)
+
+
+class LecturaViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Base de los endpoints de lectura: queryset de .values() con solo las
+    columnas del serializador, alcance por la base del Perfil (si el usuario
+    tiene uno) y paginación por cursor sobre `orden_cursor`.
+    """
+
+    modelo = None
+    campos = None
+    filtrar_por_base = True
+    pagination_class = PaginacionCursor
+    filter_backends = [DjangoFilterBackend]
+
+    def get_queryset(self):
+        queryset = self.modelo.objects.all()
+        perfil = getattr(self.request.user, 'perfil', None)
+        if self.filtrar_por_base and perfil:
+            queryset = queryset.filter(base=perfil.base)
+        return queryset.values(*self.campos)
+
+
+class EscrituraLoteMixin:
+    """
+    Acción POST <recurso>/lote/ para integraciones: recibe
+    {"modo": "crear|actualizar|upsert", "todo_o_nada": false, "items": [...]}
+    con hasta MAXIMO_LOTE ítems, escribe en una transacción con
+    bulk_create/bulk_update y responde el resultado de cada ítem. Con
+    todo_o_nada, si algún ítem falla no se escribe nada (HTTP 400).
+    """
+
+    procesar_lote = None
+
+    def get_serializer_class(self):
+        if self.action == 'lote':
+            return LoteSerializer
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=['post'], url_path='lote')
+    def lote(self, request):
+        lote = LoteSerializer(data=request.data)
+        lote.is_valid(raise_exception=True)
+        perfil = getattr(request.user, 'perfil', None)
+        try:
+            resultado = self.procesar_lote(
+                lote.validated_data['items'],
+                lote.validated_data['modo'],
+                base=perfil.base if perfil else None,
+                todo_o_nada=lote.validated_data['todo_o_nada'],
+            )
+        except IntegrityError:
+            # Otra escritura simultánea creó el mismo registro: el lote se revirtió completo
+            return Response(
+                {'detail': 'Conflicto con otra escritura simultánea; no se guardó nada, reintenta el lote.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        codigo = status.HTTP_200_OK
+        if lote.validated_data['todo_o_nada'] and resultado.hay_errores:
+            codigo = status.HTTP_400_BAD_REQUEST
+        return Response(resultado.datos(), status=codigo)
+
+
+class EntregaViewSet(EscrituraLoteMixin, LecturaViewSet):
+    """
+    Entregas en el mismo orden que el dashboard (índice base + fecha + n°
+    registro). Los campos conductor__/supervisor__/periodo__ de values()
+    hacen los JOIN en la misma consulta, como select_related pero sin crear
+    instancias de modelo.
+    """
+
+    modelo = Entrega
+    campos = EntregaSerializer.CAMPOS
+    serializer_class = EntregaSerializer
+    filterset_class = EntregaFilter
+    orden_cursor = ['-fecha_entrega', '-numero_registro']
+    procesar_lote = staticmethod(lote_entregas)
+
+
+class ConductorViewSet(EscrituraLoteMixin, LecturaViewSet):
+    modelo = Conductor
+    campos = ['id', 'nombre', 'base']
+    serializer_class = ConductorSerializer
+    filterset_class = ConductorFilter
+    orden_cursor = ['nombre', 'id']
+    procesar_lote = staticmethod(lote_conductores)
+
+
+class SupervisorViewSet(LecturaViewSet):
+    modelo = Supervisor
+    campos = ['id', 'nombre', 'base']
+    serializer_class = SupervisorSerializer
+    filterset_class = SupervisorFilter
+    orden_cursor = ['nombre', 'id']
+
+
+class PeriodoViewSet(LecturaViewSet):
+    # Los periodos son globales: no se filtran por base
+    modelo = Periodo
+    campos = ['id', 'trimestre', 'año']
+    filtrar_por_base = False
+    serializer_class = PeriodoSerializer
+    filterset_class = PeriodoFilter
+    orden_cursor = ['-año', '-trimestre', 'id']
@@ -0,0 +1,194 @@
+"""
+Archivo frío de entregas: las de periodos cerrados se guardan en un CSV
+comprimido con gzip por periodo, en MEDIA_ROOT/archivo, y se borran de la
+BD (tabla vigente y core_entrega_archivo). Un registro ArchivoEntregas por
+periodo indica dónde quedaron.
+
+Las exportaciones y la analítica siguen viendo esas entregas: cuando el
+filtro de periodo pide un periodo archivado, sus filas se leen del archivo
+y se intercalan con las de la BD. El dashboard y sus contadores (resumen)
+solo muestran las entregas vigentes.
+"""
+import csv
+import datetime
+import gzip
+import heapq
+import os
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+
+from .filtros import ids_periodos
+from .models import ArchivoEntregas, Entrega, EntregaArchivada, Periodo
+from .particiones import descartar_entregas
+
+
+DIRECTORIO_ARCHIVO = 'archivo'
+
+TAMANO_LOTE = 2000
+
+# Columnas del CSV: alcanzan para las exportaciones (con los nombres tal
+# como estaban al archivar) y para la analítica. Las claves de base, estado
+# y fase se guardan como texto, no como los códigos de la BD.
+COLUMNAS_ARCHIVO = [
+    'id', 'numero_registro', 'periodo_id', 'base',
+    'conductor_id', 'conductor__nombre', 'supervisor_id', 'supervisor__nombre',
+    'estado', 'fase', 'fecha_entrega', 'notas', 'fase_actualizada',
+]
+
+
+def ruta_archivo(archivo_entregas):
+    return os.path.join(settings.MEDIA_ROOT, archivo_entregas.archivo)
+
+
+def periodos_archivables(conservar_trimestres, hoy=None):
+    """
+    Periodos con entregas en la BD anteriores a los `conservar_trimestres`
+    últimos trimestres (incluido el actual), del más antiguo al más reciente.
+    """
+    hoy = hoy or datetime.date.today()
+    # Trimestres contados desde el año 0: Q1 2024 -> 2024 * 4
+    limite = hoy.year * 4 + (hoy.month - 1) // 3 - conservar_trimestres + 1
+    con_entregas = set(Entrega.objects.order_by().values_list('periodo_id', flat=True).distinct())
+    con_entregas |= set(EntregaArchivada.objects.order_by().values_list('periodo_id', flat=True).distinct())
+    return [
+        periodo for periodo in Periodo.objects.filter(pk__in=con_entregas).order_by('año', 'trimestre', 'pk')
+        if periodo.año * 4 + int(periodo.trimestre[1:]) - 1 < limite
+    ]
+
+
+def archivar_periodo(periodo):
+    """
+    Escribe las entregas del periodo (vigentes y de core_entrega_archivo,
+    más las de un archivo anterior del mismo periodo) en su CSV comprimido
+    y las borra de la BD. Devuelve la cantidad de entregas del archivo.
+
+    Las filas se leen bloqueadas y solo se borran las que se escribieron:
+    una entrega que llega al periodo mientras tanto queda en la BD para el
+    próximo archivado.
+    """
+    relativa = os.path.join(DIRECTORIO_ARCHIVO, f'entregas-periodo-{periodo.pk}.csv.gz')
+    destino = os.path.join(settings.MEDIA_ROOT, relativa)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    # Se escribe a un temporal y se renombra al confirmar: nunca queda un
+    # archivo a medias ni uno que no coincida con la BD. Si lo deshace una
+    # transacción de afuera, el temporal queda y el próximo archivado lo pisa
+    temporal = f'{destino}.tmp'
+    filas = 0
+    try:
+        with transaction.atomic():
+            # Un archivado por periodo a la vez: el segundo lee el archivo del primero
+            Periodo.objects.select_for_update().get(pk=periodo.pk)
+            anterior = ArchivoEntregas.objects.filter(periodo=periodo).first()
+            ids = []
+            fuentes = [
+                _anotar_ids(
+                    modelo.objects.filter(periodo=periodo).select_for_update(of=('self',))
+                    .order_by('numero_registro').values_list(*COLUMNAS_ARCHIVO).iterator(chunk_size=TAMANO_LOTE),
+                    ids,
+                )
+                for modelo in [Entrega, EntregaArchivada]
+            ]
+            if anterior is not None:
+                fuentes.append([fila[columna] for columna in COLUMNAS_ARCHIVO] for fila in _leer(anterior))
+
+            with gzip.open(temporal, 'wt', newline='', encoding='utf-8') as archivo:
+                writer = csv.writer(archivo)
+                writer.writerow(COLUMNAS_ARCHIVO)
+                for fila in heapq.merge(*fuentes, key=lambda fila: int(fila[1])):
+                    writer.writerow(fila)
+                    filas += 1
+            ArchivoEntregas.objects.update_or_create(
+                periodo=periodo, defaults={'archivo': relativa, 'filas': filas},
+            )
+            descartar_entregas([periodo.pk], ids=ids)
+            transaction.on_commit(lambda: os.replace(temporal, destino))
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    return filas
+
+
+def _anotar_ids(filas, ids):
+    """Las filas tal cual, agregando a `ids` el id de cada una."""
+    for fila in filas:
+        ids.append(fila[0])
+        yield fila
+
+
+def _leer(archivo_entregas):
+    """Filas del archivo como dicts de texto, en orden de número de registro."""
+    with gzip.open(ruta_archivo(archivo_entregas), 'rt', newline='', encoding='utf-8') as archivo:
+        yield from csv.DictReader(archivo)
+
+
+def archivos_de_periodos(periodos):
+    """ArchivoEntregas de esos periodos (ids o instancias), con su periodo."""
+    ids = [getattr(periodo, 'pk', periodo) for periodo in periodos]
+    if not ids:
+        return []
+    return list(ArchivoEntregas.objects.filter(periodo_id__in=ids).select_related('periodo').order_by('periodo_id'))
+
+
+def _contiene(texto, valor):
+    return valor.lower() in texto.lower()
+
+
+def _filas_exportacion(archivo_entregas, base, parametros):
+    """
+    Filas del archivo que pasan los filtros del dashboard, con las columnas
+    de exportación (core.exportaciones.COLUMNAS_ENTREGAS). Los filtros de
+    conductor y supervisor comparan con el nombre guardado al archivar.
+    """
+    periodo = archivo_entregas.periodo
+    estado = parametros.get('estado')
+    fase = parametros.get('fase')
+    conductor = (parametros.get('conductor') or '').strip()
+    supervisor = (parametros.get('supervisor') or '').strip()
+    for fila in _leer(archivo_entregas):
+        if base and fila['base'] != base:
+            continue
+        if estado and fila['estado'] != estado:
+            continue
+        if fase and fila['fase'] != fase:
+            continue
+        if conductor and not _contiene(fila['conductor__nombre'], conductor):
+            continue
+        if supervisor and not _contiene(fila['supervisor__nombre'], supervisor):
+            continue
+        fecha = fila['fecha_entrega']
+        yield (
+            int(fila['numero_registro']),
+            periodo.trimestre,
+            periodo.año,
+            fila['base'],
+            fila['conductor__nombre'],
+            fila['supervisor__nombre'] or None,
+            fila['estado'],
+            fila['fase'],
+            datetime.date.fromisoformat(fecha) if fecha else None,
+            fila['notas'] or None,
+        )
+
+
+def entregas_archivadas(parametros, base=None):
+    """
+    Filas de exportación de las entregas archivadas que pide el filtro de
+    periodo de `parametros` (request.GET o los filtros de un trabajo), en
+    orden de número de registro. Sin filtro de periodo no se lee ningún
+    archivo: como el dashboard, la exportación muestra solo lo vigente.
+    """
+    valor = (parametros.get('periodo') or '').strip()
+    if not valor:
+        return []
+    archivos = archivos_de_periodos(ids_periodos(valor))
+    if not archivos:
+        return []
+    return heapq.merge(
+        *(_filas_exportacion(archivo, base, parametros) for archivo in archivos),
+        key=itemgetter(0),
+    )
+
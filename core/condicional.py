@@ -0,0 +1,61 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .versiones import obtener_version
+
+
+def base_del_usuario(request):
+    """Alcance de las páginas filtradas por la base del perfil (todas si no tiene)."""
+    perfil = request.perfil
+    return perfil.base if perfil else None
+
+
+def todas_las_bases(request):
+    """Alcance de los listados globales (periodos, conductores y supervisores de todas las bases)."""
+    return None
+
+
+def etag_por_version(alcance):
+    """
+    ETag a partir de la versión de datos del alcance, sin consultar las
+    entregas. También depende de lo que cambia el HTML fuera de los datos:
+    el usuario, su perfil y el token CSRF de los formularios.
+    """
+    def etag(request, *args, **kwargs):
+        # Los mensajes pendientes se muestran una sola vez: esa respuesta no se revalida
+        if len(get_messages(request)):
+            return None
+        base = alcance(request)
+        perfil = request.perfil
+        partes = [
+            base or '*',
+            obtener_version(base),
+            request.user.pk,
+            f'{perfil.base}:{perfil.rol}' if perfil else '',
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ]
+        return hashlib.sha256(':'.join(map(str, partes)).encode()).hexdigest()[:32]
+    return etag
+
+
+def condicional_por_version(alcance=base_del_usuario):
+    """
+    GET condicional: si el ETag coincide con If-None-Match se responde 304
+    sin ejecutar la vista. La respuesta se marca private/no-cache para que el
+    navegador la guarde pero siempre la revalide, y ningún proxy la comparta.
+    """
+    def decorador(vista):
+        vista_condicional = condition(etag_func=etag_por_version(alcance))(vista)
+
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            respuesta = vista_condicional(request, *args, **kwargs)
+            patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,132 @@
+import datetime
+import math
+import random
+from collections import Counter
+
+from django.utils import timezone
+
+from accounts.bases import codigos_base
+from .models import Conductor, Supervisor, Periodo, Entrega, ContadorRegistro
+from .particiones import crear_particiones_faltantes
+from .referencias import PERIODOS, invalidar_referencias
+from .resumen import aplicar_deltas, deltas_creadas
+from .versiones import incrementar_todas
+
+
+ESTADOS = [clave for clave, _ in Entrega.ESTADO_CHOICES]
+FASES = [clave for clave, _ in Entrega.FASE_CHOICES]
+
+# Distribución aproximada de un trimestre real: la mayoría ya entregadas
+PESOS_ESTADO = [2, 1, 6, 1]
+PESOS_FASE = [2, 2, 5, 1, 1]
+
+
+def sembrar(conductores_por_base=100, supervisores_por_base=5, periodos=8,
+            entregas=10_000, semilla=42, lote=5_000, progreso=None):
+    """
+    Genera datos sintéticos reproducibles (misma semilla, mismos datos)
+    usando bulk_create. Devuelve un dict con la cantidad creada por modelo.
+
+    Cada conductor tiene a lo sumo una entrega por periodo (restricción
+    única), así que si no alcanzan se agregan periodos hacia atrás. Se
+    puede llamar varias veces sobre la misma BD para crecer por tramos: los
+    nombres continúan la numeración de cada base y se reutilizan los
+    periodos que ya existen. `progreso(creadas)` se llama tras cada lote.
+    """
+    rnd = random.Random(semilla)
+    bases = codigos_base()
+    total_conductores = conductores_por_base * len(bases)
+    periodos = max(periodos, math.ceil(entregas / total_conductores))
+
+    def numeracion(modelo):
+        existentes = Counter(modelo.objects.values_list('base', flat=True))
+        return {base: existentes[base] for base in bases}
+
+    desde = numeracion(Supervisor)
+    supervisores = Supervisor.objects.bulk_create([
+        Supervisor(nombre=f'SUPERVISOR {base.upper()} {i:03d}', base=base)
+        for base in bases
+        for i in range(desde[base], desde[base] + supervisores_por_base)
+    ], batch_size=lote)
+    desde = numeracion(Conductor)
+    conductores = Conductor.objects.bulk_create([
+        Conductor(nombre=f'CONDUCTOR {base.upper()} {i:05d}', base=base)
+        for base in bases
+        for i in range(desde[base], desde[base] + conductores_por_base)
+    ], batch_size=lote)
+
+    anio_actual = datetime.date.today().year
+    trimestres = [
+        (f'Q{(i % 4) + 1}', anio_actual - (periodos - 1 - i) // 4)
+        for i in range(periodos)
+    ]
+    existentes = {}
+    for periodo in Periodo.objects.filter(año__in={anio for _, anio in trimestres}).order_by('pk'):
+        existentes.setdefault((periodo.trimestre, periodo.año), periodo)
+    nuevos = Periodo.objects.bulk_create([
+        Periodo(trimestre=trimestre, año=anio)
+        for trimestre, anio in trimestres
+        if (trimestre, anio) not in existentes
+    ], batch_size=lote)
+    existentes.update({(periodo.trimestre, periodo.año): periodo for periodo in nuevos})
+    # bulk_create no emite señales: las particiones de los periodos nuevos a mano
+    crear_particiones_faltantes()
+    lista_periodos = [existentes[clave] for clave in trimestres]
+
+    supervisores_por_base_map = {}
+    for supervisor in supervisores:
+        supervisores_por_base_map.setdefault(supervisor.base, []).append(supervisor)
+
+    # Un solo bloque de números para todas las entregas sintéticas
+    numeros = ContadorRegistro.reservar(entregas)
+    creadas = 0
+    pendientes = []
+    resumen = Counter()
+    ahora = timezone.now()
+    for i in range(entregas):
+        conductor = conductores[i % len(conductores)]
+        periodo = lista_periodos[(i // len(conductores)) % len(lista_periodos)]
+        inicio = datetime.date(periodo.año, int(periodo.trimestre[1]) * 3 - 2, 1)
+        fecha = None
+        if rnd.random() > 0.1:
+            fecha = inicio + datetime.timedelta(days=rnd.randint(0, 89))
+        # Paso a la fase actual entre el inicio del trimestre y hoy (analítica de tiempos)
+        fase_actualizada = min(
+            ahora,
+            datetime.datetime.combine(inicio, datetime.time(12), tzinfo=datetime.timezone.utc)
+            + datetime.timedelta(days=rnd.randint(0, 120)),
+        )
+        pendientes.append(Entrega(
+            numero_registro=numeros[i],
+            conductor=conductor,
+            supervisor=rnd.choice(supervisores_por_base_map[conductor.base]),
+            estado=rnd.choices(ESTADOS, PESOS_ESTADO)[0],
+            fase=rnd.choices(FASES, PESOS_FASE)[0],
+            fecha_entrega=fecha,
+            fase_actualizada=fase_actualizada,
+            periodo=periodo,
+            base=conductor.base,
+        ))
+        if len(pendientes) >= lote:
+            Entrega.objects.bulk_create(pendientes, batch_size=lote)
+            resumen.update(deltas_creadas(pendientes))
+            creadas += len(pendientes)
+            pendientes = []
+            if progreso:
+                progreso(creadas)
+    if pendientes:
+        Entrega.objects.bulk_create(pendientes, batch_size=lote)
+        resumen.update(deltas_creadas(pendientes))
+        creadas += len(pendientes)
+    # bulk_create no emite señales: resumen y caché de todas las bases a mano
+    aplicar_deltas(resumen)
+    incrementar_todas()
+    invalidar_referencias()
+    PERIODOS.invalidar()
+
+    return {
+        'supervisores': len(supervisores),
+        'conductores': len(conductores),
+        'periodos': len(nuevos),
+        'entregas': creadas,
+    }
@@ -0,0 +1,39 @@
+from django.core.paginator import Paginator
+from django.db.models import Count, Q
+
+from .models import Entrega
+
+
+def calcular_estadisticas(entregas):
+    """
+    Calcula en una sola consulta (agregación condicional) los contadores
+    del dashboard: total, desglose por estado y desglose por fase.
+    """
+    agregados = {'total': Count('id')}
+    for clave, _ in Entrega.ESTADO_CHOICES:
+        agregados[f'estado_{clave}'] = Count('id', filter=Q(estado=clave))
+    for clave, _ in Entrega.FASE_CHOICES:
+        agregados[f'fase_{clave}'] = Count('id', filter=Q(fase=clave))
+
+    # order_by() evita que el ORDER BY del listado llegue a la agregación
+    resultado = entregas.order_by().aggregate(**agregados)
+
+    return {
+        'total': resultado['total'],
+        'por_estado': {
+            clave: resultado[f'estado_{clave}'] for clave, _ in Entrega.ESTADO_CHOICES
+        },
+        'por_fase': {
+            clave: resultado[f'fase_{clave}'] for clave, _ in Entrega.FASE_CHOICES
+        },
+    }
+
+
+class PaginadorConTotal(Paginator):
+    """
+    Paginator que recibe el total ya calculado para no emitir su propio COUNT.
+    """
+
+    def __init__(self, object_list, per_page, total, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = total
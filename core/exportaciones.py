@@ -0,0 +1,127 @@
+import csv
+import heapq
+import tempfile
+from operator import itemgetter
+
+from django.http import FileResponse, StreamingHttpResponse
+from openpyxl import Workbook
+
+from accounts.bases import etiquetas_base
+
+from .models import Entrega, Periodo
+
+
+# Tamaño de lote para los iteradores (cursor de servidor en PostgreSQL)
+TAMANO_LOTE = 2000
+
+ENCABEZADOS_PERIODOS = ['ID', 'Año', 'Trimestre', 'Nombre del Trimestre']
+
+ENCABEZADOS_ENTREGAS = [
+    'Registro', 'Periodo', 'Año', 'Trimestre', 'Base',
+    'Conductor', 'Supervisor', 'Estado', 'Fase', 'Fecha de Entrega', 'Notas'
+]
+
+COLUMNAS_ENTREGAS = [
+    'numero_registro', 'periodo__trimestre', 'periodo__año', 'base',
+    'conductor__nombre', 'supervisor__nombre', 'estado', 'fase',
+    'fecha_entrega', 'notas',
+]
+
+# Etiquetas precalculadas una sola vez (en vez de get_*_display() por fila)
+ETIQUETAS_TRIMESTRE = dict(Periodo.TRIMESTRE_CHOICES)
+ETIQUETAS_ESTADO = dict(Entrega.ESTADO_CHOICES)
+ETIQUETAS_FASE = dict(Entrega.FASE_CHOICES)
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def filas_entregas(entregas, tamano_lote=TAMANO_LOTE, archivadas=()):
+    """
+    Genera las filas de exportación de entregas a partir de un values_list
+    recorrido por lotes: memoria constante sin importar el total de filas.
+    `archivadas` son tuplas con las mismas columnas leídas del archivo frío
+    (core.archivo.entregas_archivadas), que se intercalan por número de registro.
+    """
+    filas = (
+        entregas.order_by('numero_registro')
+        .values_list(*COLUMNAS_ENTREGAS)
+        .iterator(chunk_size=tamano_lote)
+    )
+    if archivadas:
+        filas = heapq.merge(filas, archivadas, key=itemgetter(0))
+    etiquetas_bases = etiquetas_base()
+    for numero, trimestre, anio, base, conductor, supervisor, estado, fase, fecha, notas in filas:
+        yield [
+            numero,
+            f"{ETIQUETAS_TRIMESTRE.get(trimestre, trimestre)} {anio}",  # Formato: Enero-Marzo 2024
+            anio,
+            trimestre,
+            etiquetas_bases.get(base, base),
+            conductor,
+            supervisor if supervisor is not None else 'N/A',
+            ETIQUETAS_ESTADO.get(estado, estado),
+            ETIQUETAS_FASE.get(fase, fase),
+            fecha.strftime('%Y-%m-%d') if fecha else '',
+            notas,
+        ]
+
+
+def filas_periodos(periodos, tamano_lote=TAMANO_LOTE):
+    """Filas de exportación de periodos (ID, año, trimestre y su nombre)."""
+    filas = periodos.values_list('id', 'año', 'trimestre').iterator(chunk_size=tamano_lote)
+    for pk, anio, trimestre in filas:
+        yield [pk, anio, trimestre, ETIQUETAS_TRIMESTRE.get(trimestre, trimestre)]
+
+
+class Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en vez de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def respuesta_csv_streaming(encabezados, filas, nombre_archivo):
+    """StreamingHttpResponse que escribe el CSV fila a fila a medida que se genera."""
+    writer = csv.writer(Eco())
+
+    def contenido():
+        yield writer.writerow(encabezados)
+        for fila in filas:
+            yield writer.writerow(fila)
+
+    response = StreamingHttpResponse(contenido(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+    return response
+
+
+def escribir_xlsx(destino, titulo, encabezados, filas):
+    """
+    Escribe un XLSX con una hoja en modo write-only: cada fila se serializa
+    al añadirse y no se conservan objetos celda en memoria.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titulo)
+    ws.append(encabezados)
+    for fila in filas:
+        ws.append(fila)
+    wb.save(destino)
+
+
+def respuesta_xlsx(titulo, encabezados, filas, nombre_archivo):
+    """
+    Genera el XLSX en un archivo temporal en disco (no en un buffer en
+    memoria) y lo envía por bloques con FileResponse, que lo cierra al terminar.
+    """
+    archivo = tempfile.TemporaryFile()
+    try:
+        escribir_xlsx(archivo, titulo, encabezados, filas)
+        archivo.seek(0)
+    except Exception:
+        archivo.close()
+        raise
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=nombre_archivo,
+        content_type=CONTENT_TYPE_XLSX,
+    )
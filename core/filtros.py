@@ -0,0 +1,117 @@
+import re
+
+from django.db.models import Q
+
+from .models import Conductor, Periodo
+
+
+PARAMETROS_FILTRO = ['estado', 'fase', 'periodo', 'conductor', 'supervisor']
+
+# Hasta cuántos conductores coincidentes conviene filtrar por lista de ids
+MAXIMO_IDS_CONDUCTOR = 50
+
+
+def normalizar_filtros(parametros):
+    """Solo los filtros del dashboard con valor, sin espacios sobrantes."""
+    filtros = {}
+    for clave in PARAMETROS_FILTRO:
+        valor = (parametros.get(clave) or '').strip()
+        if valor:
+            filtros[clave] = valor
+    return filtros
+
+
+def ids_periodos(valor):
+    """
+    Ids de los periodos que coinciden con el texto libre del filtro de
+    periodo ("2024", "2024-1", "Q3 2024", "Enero"), en una consulta sobre
+    la tabla de periodos (pocas filas): un periodo recién creado en otro
+    proceso ya coincide. Lista vacía si no coincide ninguno.
+    """
+    valor = valor.strip()
+    anios = None
+    trimestres = None
+
+    anio = re.search(r'\b(\d{4})\b', valor)
+    if anio:
+        anios = {int(anio.group(1))}
+        resto = valor[:anio.start()] + ' ' + valor[anio.end():]
+    else:
+        resto = valor
+
+    trimestre = re.search(r'\b[qQ]?([1-4])\b', resto)
+    if trimestre:
+        trimestres = {f'Q{trimestre.group(1)}'}
+    else:
+        # Búsqueda por nombre del trimestre ("Enero-Marzo", "julio"...)
+        texto = resto.strip().lower()
+        if texto:
+            trimestres = {
+                codigo for codigo, etiqueta in Periodo.TRIMESTRE_CHOICES
+                if texto in etiqueta.lower()
+            }
+
+    if anios is None and trimestres is None:
+        return []
+    periodos = Periodo.objects.order_by('pk')
+    if anios is not None:
+        periodos = periodos.filter(año__in=anios)
+    if trimestres is not None:
+        periodos = periodos.filter(trimestre__in=trimestres)
+    return list(periodos.values_list('pk', flat=True))
+
+
+def condicion_periodo(valor):
+    """
+    Filtro de periodo por periodo_id (y no por año/trimestre con JOIN):
+    permite a PostgreSQL descartar las particiones de los demás periodos
+    (ver core.particiones).
+    """
+    return Q(periodo_id__in=ids_periodos(valor))
+
+
+def condicion_conductor(valor):
+    """
+    Filtro por nombre de conductor. Si coinciden pocos conductores se filtra
+    por sus ids (índice de conductor_id y pocas filas que ordenar); si son
+    muchos, el JOIN con LIKE recorre el índice de fecha y corta con LIMIT.
+    """
+    ids = list(
+        Conductor.objects.filter(nombre__icontains=valor)
+        .values_list('pk', flat=True)[:MAXIMO_IDS_CONDUCTOR + 1]
+    )
+    if len(ids) <= MAXIMO_IDS_CONDUCTOR:
+        return Q(conductor_id__in=ids)
+    return Q(conductor__nombre__icontains=valor)
+
+
+def filtrar_entregas(entregas, parametros):
+    """
+    Aplica los filtros del dashboard (estado, fase, periodo, conductor,
+    supervisor) a un queryset de Entrega. `parametros` es request.GET o
+    cualquier dict con las mismas claves. Devuelve (queryset, filtros_aplicados).
+    """
+    filtro_estado = parametros.get('estado')
+    filtro_fase = parametros.get('fase')
+    filtro_periodo = parametros.get('periodo')
+    filtro_conductor = parametros.get('conductor')
+    filtro_supervisor = parametros.get('supervisor')
+
+    # Aplicar filtros si existen
+    if filtro_estado:
+        entregas = entregas.filter(estado=filtro_estado)
+
+    if filtro_fase:
+        entregas = entregas.filter(fase=filtro_fase)
+
+    if filtro_periodo:
+        entregas = entregas.filter(condicion_periodo(filtro_periodo))
+
+    if filtro_conductor:
+        entregas = entregas.filter(condicion_conductor(filtro_conductor))
+
+    if filtro_supervisor:
+        entregas = entregas.filter(supervisor__nombre__icontains=filtro_supervisor)
+
+    filtros_aplicados = any([filtro_estado, filtro_fase, filtro_periodo, filtro_conductor, filtro_supervisor])
+    return entregas, filtros_aplicados
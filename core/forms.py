@@ -2,6 +2,10 @@ from django import forms
 from .models import *
 import pandas as pd
 import os
+from accounts.bases import opciones_base
+from .lectores import EXTENSIONES_SOPORTADAS
+from .referencias import CONDUCTORES, PERFILES, PERIODOS, SUPERVISORES, ReferenciaChoiceField
+from .versiones import obtener_version
 
 
 
@@ -22,6 +26,19 @@ class EntregaForm(forms.ModelForm):
             'notas': forms.Textarea(attrs={'rows': 3}),
         }
 
+    def __init__(self, *args, **kwargs):
+        user_profile = kwargs.pop('user_profile', None)
+        super().__init__(*args, **kwargs)
+        # Opciones desde la caché de referencias (con perfil, solo las de su base)
+        base = user_profile.base if user_profile else None
+        # Las tres listas cambian con la versión de datos de la base: una sola consulta
+        version = obtener_version(base)
+        for campo, referencia in [('conductor', CONDUCTORES), ('supervisor', SUPERVISORES), ('periodo', PERIODOS)]:
+            original = self.fields[campo]
+            self.fields[campo] = ReferenciaChoiceField(
+                referencia, base=base, version=version, required=original.required, label=original.label,
+            )
+
 class EntregaEstadoForm(forms.ModelForm):
     class Meta:
         model = Entrega
@@ -37,6 +54,86 @@ class EntregaEstadoForm(forms.ModelForm):
         }
 
 
+class EdicionMasivaEntregasForm(forms.Form):
+    """Un mismo cambio de estado/fase/fecha para varias entregas seleccionadas."""
+    entregas = forms.ModelMultipleChoiceField(
+        queryset=Entrega.objects.none(),
+        error_messages={
+            'required': 'Selecciona al menos una entrega.',
+            'invalid_choice': 'Alguna de las entregas seleccionadas no existe o no pertenece a tu base.',
+        },
+    )
+    estado = forms.ChoiceField(choices=[('', 'Sin cambio')] + Entrega.ESTADO_CHOICES, required=False)
+    fase = forms.ChoiceField(choices=[('', 'Sin cambio')] + Entrega.FASE_CHOICES, required=False)
+    fecha_entrega = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def __init__(self, *args, **kwargs):
+        queryset = kwargs.pop('queryset')
+        super().__init__(*args, **kwargs)
+        # Solo se aceptan ids dentro del queryset permitido (misma regla que eliminar_entrega)
+        self.fields['entregas'].queryset = queryset
+
+    def cambios(self):
+        return {
+            campo: self.cleaned_data[campo]
+            for campo in ['estado', 'fase', 'fecha_entrega']
+            if self.cleaned_data.get(campo)
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not self.errors and not self.cambios():
+            raise forms.ValidationError('Indica al menos un cambio de estado, fase o fecha.')
+        return cleaned_data
+
+
+class IdPrecargadoField(forms.ModelChoiceField):
+    """Resuelve el id contra filas ya cargadas, sin una consulta por formulario."""
+
+    def __init__(self, objetos, *args, **kwargs):
+        self.objetos = objetos
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objetos[int(value)]
+        except (KeyError, ValueError, TypeError):
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value}
+            )
+
+
+class BaseEntregaGrillaFormSet(forms.BaseModelFormSet):
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        # Solo valen los ids del queryset recibido (las entregas permitidas al usuario)
+        if not hasattr(self, '_objetos'):
+            self._objetos = {entrega.pk: entrega for entrega in self.get_queryset()}
+        campo = form.fields['id']
+        form.fields['id'] = IdPrecargadoField(
+            self._objetos,
+            campo.queryset,
+            initial=campo.initial,
+            required=False,
+            widget=campo.widget,
+            error_messages={'invalid_choice': 'La entrega no existe o no pertenece a tu base.'},
+        )
+
+
+EntregaGrillaFormSet = forms.modelformset_factory(
+    Entrega,
+    form=EntregaEstadoForm,
+    formset=BaseEntregaGrillaFormSet,
+    extra=0,
+    widgets={
+        'fecha_entrega': forms.DateInput(attrs={'type': 'date'}),
+        'notas': forms.TextInput(),
+    },
+)
+
+
 class ConductorForm(forms.ModelForm):
     class Meta:
         model = Conductor
@@ -51,9 +148,15 @@ class ConductorForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         
         # FILTRAR EL CAMPO 'PERFIL'
-        if 'perfil' in self.fields and user_profile:
-            base_del_usuario = user_profile.base
-            self.fields['perfil'].queryset = Perfil.objects.filter(base=base_del_usuario)
+        if 'perfil' in self.fields:
+            original = self.fields['perfil']
+            self.fields['perfil'] = ReferenciaChoiceField(
+                PERFILES,
+                base=user_profile.base if user_profile else None,
+                required=False,
+                label=original.label,
+                help_text=original.help_text,
+            )
         
         # Controlar la visibilidad del campo base según permisos
         if user_profile:
@@ -90,11 +193,46 @@ class PeriodoForm(forms.ModelForm):
         }
 
 
+def opciones_base_o_todas():
+    return [('', 'Todas las bases')] + opciones_base()
+
+
+class AbrirPeriodoForm(forms.Form):
+    base = forms.ChoiceField(
+        label='Base',
+        choices=opciones_base_o_todas,
+        required=False,
+    )
+    supervisor_defecto = ReferenciaChoiceField(
+        SUPERVISORES,
+        label='Supervisor por defecto',
+        required=False,
+        help_text='Para conductores sin entregas anteriores; el resto conserva su último supervisor.',
+    )
+
+    def __init__(self, *args, **kwargs):
+        user_profile = kwargs.pop('user_profile', None)
+        super().__init__(*args, **kwargs)
+
+        # Con perfil solo se abre el periodo para la base propia
+        if user_profile:
+            self.fields['base'].choices = [
+                (clave, etiqueta) for clave, etiqueta in opciones_base() if clave == user_profile.base
+            ]
+            self.fields['base'].initial = user_profile.base
+            self.fields['base'].required = True
+            self.fields['supervisor_defecto'].base = user_profile.base
+
+
+# La lectura es por bloques, así que el límite lo pone el disco y no la memoria
+TAMANO_MAXIMO_CARGA_MB = 100
+
+
 class CargaMasivaConductoresForm(forms.Form):
     archivo_excel = forms.FileField(
-        label='Seleccionar archivo Excel',
-        help_text='Formatos soportados: .xlsx, .xls',
-        widget=forms.FileInput(attrs={'accept': '.xlsx,.xls'})
+        label='Seleccionar archivo Excel o CSV',
+        help_text='Formatos soportados: .xlsx, .xls, .csv',
+        widget=forms.FileInput(attrs={'accept': '.xlsx,.xls,.csv'})
     )
     
     def clean_archivo_excel(self):
@@ -102,11 +240,15 @@ class CargaMasivaConductoresForm(forms.Form):
         
         # Validar extensión
         extension = os.path.splitext(archivo.name)[1].lower()
-        if extension not in ['.xlsx', '.xls']:
-            raise forms.ValidationError('Solo se permiten archivos Excel (.xlsx, .xls)')
+        if extension not in EXTENSIONES_SOPORTADAS:
+            raise forms.ValidationError('Solo se permiten archivos Excel o CSV (.xlsx, .xls, .csv)')
         
-        # Validar tamaño (max 5MB)
-        if archivo.size > 5 * 1024 * 1024:
-            raise forms.ValidationError('El archivo no puede ser mayor a 5MB')
+        # Validar tamaño
+        if archivo.size > TAMANO_MAXIMO_CARGA_MB * 1024 * 1024:
+            raise forms.ValidationError(f'El archivo no puede ser mayor a {TAMANO_MAXIMO_CARGA_MB}MB')
         
-        return archivo        
\ No newline at end of file
+        return archivo
+
+
+class CargaMasivaEntregasForm(CargaMasivaConductoresForm):
+    """Mismo archivo y validaciones; cambia solo el tipo de trabajo que se encola."""
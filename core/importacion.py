@@ -0,0 +1,367 @@
+import datetime
+import re
+
+import pandas as pd
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.bases import codigos_base
+from .models import Conductor, Supervisor, Periodo, Entrega, ContadorRegistro
+from .resumen import aplicar_deltas, deltas_creadas, deltas_modificadas
+from .referencias import invalidar_referencias
+from .versiones import bases_afectadas, incrementar_version
+
+
+def normalizar_nombre(nombre):
+    """Clave de comparación equivalente a nombre__iexact."""
+    return nombre.strip().lower()
+
+
+class ImportadorConductores:
+    """
+    Motor de carga masiva de conductores.
+
+    Carga una sola vez el índice nombre normalizado -> conductor existente,
+    clasifica las filas de cada DataFrame con operaciones vectorizadas de
+    pandas y aplica los cambios con bulk_create/bulk_update por lotes dentro
+    de una transacción. Puede recibir el archivo completo o por bloques: el
+    índice se mantiene entre llamadas a `procesar`.
+    """
+
+    COLUMNAS_REQUERIDAS = ['nombre']
+
+    def __init__(self, base_por_defecto, tamano_lote=1000):
+        self.base_por_defecto = base_por_defecto
+        self.tamano_lote = tamano_lote
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []
+
+        # Igual que .filter(nombre__iexact=...).first(): ante duplicados gana el menor id
+        self.indice = {}
+        for conductor in Conductor.objects.only('id', 'nombre', 'base').order_by('-pk').iterator(chunk_size=tamano_lote):
+            self.indice[normalizar_nombre(conductor.nombre)] = conductor
+
+    def procesar(self, df, desplazamiento=2):
+        """
+        Procesa un DataFrame con columna 'nombre' (y opcional 'base'). El
+        número de fila de los errores es índice + `desplazamiento` (2 para un
+        DataFrame de pd.read_excel; 0 si el índice ya es la fila del archivo).
+        """
+        if df.empty:
+            return
+        numeros_fila = pd.Series(df.index + desplazamiento, index=df.index)
+
+        nombres = df['nombre'].fillna('').astype(str).str.strip()
+        claves = nombres.str.lower()
+        vacios = nombres == ''
+        for numero in numeros_fila[vacios]:
+            self.errores.append(f"Fila {numero}: El nombre no puede estar vacío")
+
+        # Base: la del archivo si es válida ("calle larga" == "calle_larga"), si no la del usuario
+        if 'base' in df.columns:
+            bases_originales = df['base'].fillna('').astype(str).str.strip()
+            bases = bases_originales.str.lower().str.replace(r'\s+', '_', regex=True)
+            base_valida = bases.isin(codigos_base())
+            invalidas = ~base_valida & (bases_originales != '') & ~vacios
+            for numero, base in zip(numeros_fila[invalidas], bases_originales[invalidas]):
+                self.errores.append(
+                    f"Fila {numero}: Base '{base}' no válida. Se usó '{self.base_por_defecto}'"
+                )
+        else:
+            bases = pd.Series('', index=df.index)
+            base_valida = pd.Series(False, index=df.index)
+
+        validas = pd.DataFrame({
+            'clave': claves[~vacios],
+            'nombre': nombres[~vacios],
+            'base': bases[~vacios],
+            'base_valida': base_valida[~vacios],
+        })
+        if validas.empty:
+            return
+
+        # Clasificación: existentes (en la BD o repetidos en el archivo) se actualizan
+        existe = validas['clave'].isin(self.indice.keys())
+        repetida = validas['clave'].duplicated(keep='first')
+        nuevas = ~existe & ~repetida
+        self.creados += int(nuevas.sum())
+        self.actualizados += int((~nuevas).sum())
+
+        # Valores finales por conductor: la última fila del archivo manda
+        ultimo_nombre = validas.groupby('clave', sort=False)['nombre'].last()
+        ultima_base = validas[validas['base_valida']].groupby('clave', sort=False)['base'].last()
+
+        por_crear = []
+        por_actualizar = []
+        for clave, nombre in ultimo_nombre.items():
+            base = ultima_base.get(clave)
+            conductor = self.indice.get(clave)
+            if conductor is None:
+                por_crear.append(Conductor(nombre=nombre, base=base or self.base_por_defecto))
+                continue
+            if conductor.nombre != nombre or (base and conductor.base != base):
+                conductor.nombre = nombre
+                if base:
+                    conductor.base = base
+                por_actualizar.append(conductor)
+
+        with transaction.atomic():
+            creados = Conductor.objects.bulk_create(por_crear, batch_size=self.tamano_lote)
+            Conductor.objects.bulk_update(por_actualizar, ['nombre', 'base'], batch_size=self.tamano_lote)
+            # bulk_create/bulk_update no emiten señales: se invalida la caché a mano
+            bases = bases_afectadas(creados + por_actualizar)
+            incrementar_version(*bases)
+            invalidar_referencias(*bases)
+
+        for conductor in creados:
+            self.indice[normalizar_nombre(conductor.nombre)] = conductor
+
+
+def _claves_opciones(choices):
+    """Acepta tanto la clave ("en_curso") como la etiqueta ("En curso") de un choice."""
+    claves = {}
+    for clave, etiqueta in choices:
+        claves[clave] = clave
+        claves[etiqueta.lower()] = clave
+        claves[clave.replace('_', ' ')] = clave
+    return claves
+
+
+ESTADOS_IMPORTACION = _claves_opciones(Entrega.ESTADO_CHOICES)
+FASES_IMPORTACION = _claves_opciones(Entrega.FASE_CHOICES)
+FORMATOS_FECHA = ['%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%Y/%m/%d']
+
+
+def clave_periodo(texto):
+    """
+    (trimestre, año) a partir de "Q1 2025", "2025-Q1", "2025-1" o de la
+    etiqueta del periodo ("Enero-Marzo 2025"). None si no se reconoce.
+    """
+    texto = texto.strip().lower()
+    anio = re.search(r'\b(\d{4})\b', texto)
+    if not anio:
+        return None
+    resto = texto[:anio.start()] + ' ' + texto[anio.end():]
+    trimestre = re.search(r'\bq?([1-4])\b', resto)
+    if trimestre:
+        return f'Q{trimestre.group(1)}', int(anio.group(1))
+    for codigo, etiqueta in Periodo.TRIMESTRE_CHOICES:
+        if etiqueta.lower() in resto:
+            return codigo, int(anio.group(1))
+    return None
+
+
+def convertir_fecha(valor):
+    """date desde una celda de Excel (datetime) o un texto; None si no es válida."""
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    for formato in FORMATOS_FECHA:
+        try:
+            return datetime.datetime.strptime(str(valor).strip()[:10], formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+class ImportadorEntregas:
+    """
+    Motor de carga masiva de entregas con upsert por (conductor, periodo).
+
+    Conductores, supervisores y periodos se resuelven con mapas en memoria
+    cargados una sola vez (nada de consultas por fila). Las entregas ya
+    existentes de cada bloque se leen con una consulta, las nuevas reciben
+    un bloque de numero_registro con una sola reserva y todo se escribe con
+    bulk_create/bulk_update. Volver a cargar el mismo archivo actualiza las
+    entregas en lugar de duplicarlas; las celdas vacías no pisan valores.
+    """
+
+    COLUMNAS_REQUERIDAS = ['conductor', 'periodo']
+    CAMPOS_ACTUALIZABLES = ['supervisor', 'estado', 'fase', 'fecha_entrega', 'notas']
+
+    def __init__(self, base_por_defecto, tamano_lote=1000):
+        self.base_por_defecto = base_por_defecto
+        self.tamano_lote = tamano_lote
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []
+
+        conductores = Conductor.objects.order_by('-pk')
+        supervisores = Supervisor.objects.order_by('-pk')
+        if base_por_defecto:
+            # Solo se pueden registrar entregas de la base del usuario
+            conductores = conductores.filter(base=base_por_defecto)
+            supervisores = supervisores.filter(base=base_por_defecto)
+
+        # Ante nombres repetidos gana el menor id, igual que el importador de conductores
+        self.conductores = {}
+        for pk, nombre, base in conductores.values_list('pk', 'nombre', 'base').iterator(chunk_size=tamano_lote):
+            self.conductores[normalizar_nombre(nombre)] = (pk, base)
+        self.supervisores = {
+            normalizar_nombre(nombre): pk
+            for pk, nombre in supervisores.values_list('pk', 'nombre').iterator(chunk_size=tamano_lote)
+        }
+        self.periodos = {
+            (trimestre, anio): pk
+            for pk, trimestre, anio in Periodo.objects.order_by('-pk').values_list('pk', 'trimestre', 'año')
+        }
+
+    def _columna(self, df, nombre):
+        if nombre not in df.columns:
+            return pd.Series('', index=df.index)
+        return df[nombre].fillna('').astype(str).str.strip()
+
+    def procesar(self, df, desplazamiento=2):
+        """
+        Procesa un DataFrame con columnas 'conductor' y 'periodo' (y opcionales
+        'supervisor', 'estado', 'fase', 'fecha_entrega', 'notas'). El número de
+        fila de los errores es índice + `desplazamiento`, como en conductores.
+        """
+        if df.empty:
+            return
+        numeros_fila = pd.Series(df.index + desplazamiento, index=df.index)
+        errores = pd.Series('', index=df.index)
+
+        def marcar(mascara, mensaje):
+            # Se informa solo el primer problema de cada fila
+            nuevas = mascara & (errores == '')
+            errores[nuevas] = mensaje[nuevas] if isinstance(mensaje, pd.Series) else mensaje
+
+        conductores = self._columna(df, 'conductor')
+        conductor = conductores.str.lower().map(self.conductores)
+        marcar(conductores == '', 'El conductor no puede estar vacío')
+        marcar(conductor.isna(), "Conductor '" + conductores + "' no encontrado en la base")
+
+        periodos = self._columna(df, 'periodo')
+        claves = {texto: clave_periodo(texto) for texto in periodos.unique()}
+        periodo = periodos.map(lambda texto: self.periodos.get(claves[texto]))
+        marcar(periodos == '', 'El periodo no puede estar vacío')
+        marcar(periodo.isna(), "Periodo '" + periodos + "' no existe")
+
+        supervisores = self._columna(df, 'supervisor')
+        supervisor = supervisores.str.lower().map(self.supervisores)
+        marcar((supervisores != '') & supervisor.isna(), "Supervisor '" + supervisores + "' no encontrado en la base")
+
+        estados = self._columna(df, 'estado')
+        estado = estados.str.lower().map(ESTADOS_IMPORTACION)
+        marcar((estados != '') & estado.isna(), "Estado '" + estados + "' no válido")
+
+        fases = self._columna(df, 'fase')
+        fase = fases.str.lower().map(FASES_IMPORTACION)
+        marcar((fases != '') & fase.isna(), "Fase '" + fases + "' no válida")
+
+        if 'fecha_entrega' in df.columns:
+            presentes = df['fecha_entrega'].notna() & (df['fecha_entrega'].astype(str).str.strip() != '')
+            fecha = df['fecha_entrega'].where(presentes).map(convertir_fecha, na_action='ignore')
+            marcar(presentes & fecha.isna(), "Fecha '" + df['fecha_entrega'].astype(str) + "' no válida")
+        else:
+            fecha = pd.Series(None, index=df.index, dtype=object)
+
+        notas = self._columna(df, 'notas')
+
+        for numero, mensaje in zip(numeros_fila[errores != ''], errores[errores != '']):
+            self.errores.append(f"Fila {numero}: {mensaje}")
+
+        validas = errores == ''
+        if not validas.any():
+            return
+        filas = pd.DataFrame({
+            'conductor_id': conductor[validas].str[0].astype(int),
+            'base': conductor[validas].str[1],
+            'periodo': periodo[validas].astype(int),
+            'supervisor': supervisor[validas],
+            'estado': estado[validas],
+            'fase': fase[validas],
+            'fecha_entrega': fecha[validas],
+            'notas': pd.Series([texto or None for texto in notas[validas]], index=notas[validas].index, dtype=object),
+        })
+
+        try:
+            with transaction.atomic():
+                nuevas = self._guardar(filas)
+        except IntegrityError:
+            # Otra carga creó alguna de estas entregas entre la lectura y la escritura:
+            # el bloque se revirtió completo, como el lote de la API (409)
+            self.errores.append(
+                f"Filas {numeros_fila.min()}-{numeros_fila.max()}: otra carga registró al mismo tiempo "
+                "entregas de estas filas; no se guardó ninguna, vuelve a cargar el archivo"
+            )
+            return
+        self.creados += int(nuevas.sum())
+        self.actualizados += int((~nuevas).sum())
+
+    def _guardar(self, filas):
+        """
+        Escribe las filas válidas de un bloque; debe llamarse dentro de una
+        transacción. Devuelve la máscara de las filas que crearon entregas.
+        """
+        # Las entregas ya registradas de este bloque, en una sola consulta y
+        # bloqueadas: los cambios y el resumen parten de lo que hay en la BD
+        existentes = {
+            (entrega.conductor_id, entrega.periodo_id): entrega
+            for entrega in Entrega.objects.filter(
+                conductor_id__in=set(filas['conductor_id']),
+                periodo_id__in=set(filas['periodo']),
+            ).select_for_update().only('id', 'conductor_id', 'periodo_id', 'base', *self.CAMPOS_ACTUALIZABLES)
+        }
+
+        claves_fila = list(zip(filas['conductor_id'], filas['periodo']))
+        existe = pd.Series([clave in existentes for clave in claves_fila], index=filas.index)
+        repetida = pd.Series(claves_fila, index=filas.index).duplicated(keep='first')
+        nuevas = ~existe & ~repetida
+
+        # Filas repetidas en el archivo: por columna manda el último valor no vacío
+        filas = filas.groupby(['conductor_id', 'periodo'], sort=False, as_index=False).last()
+
+        por_crear = []
+        por_actualizar = []
+        for fila in filas.itertuples(index=False):
+            valores = {
+                'supervisor_id': None if pd.isna(fila.supervisor) else int(fila.supervisor),
+                'estado': None if pd.isna(fila.estado) else fila.estado,
+                'fase': None if pd.isna(fila.fase) else fila.fase,
+                'fecha_entrega': None if pd.isna(fila.fecha_entrega) else fila.fecha_entrega,
+                'notas': None if pd.isna(fila.notas) else fila.notas,
+            }
+            entrega = existentes.get((fila.conductor_id, fila.periodo))
+            if entrega is None:
+                por_crear.append(Entrega(
+                    conductor_id=fila.conductor_id,
+                    periodo_id=fila.periodo,
+                    base=fila.base,
+                    supervisor_id=valores['supervisor_id'],
+                    estado=valores['estado'] or 'pendiente',
+                    fase=valores['fase'] or 'no_entregada',
+                    fecha_entrega=valores['fecha_entrega'],
+                    notas=valores['notas'],
+                ))
+                continue
+            cambios = False
+            for campo, valor in valores.items():
+                if valor is not None and getattr(entrega, campo) != valor:
+                    setattr(entrega, campo, valor)
+                    cambios = True
+            if cambios:
+                por_actualizar.append(entrega)
+
+        # Un solo bloque de números correlativos para todas las nuevas
+        for entrega, numero in zip(por_crear, ContadorRegistro.reservar(len(por_crear))):
+            entrega.numero_registro = numero
+        Entrega.objects.bulk_create(por_crear, batch_size=self.tamano_lote)
+        ahora = timezone.now()
+        for entrega in por_actualizar:
+            entrega.sellar_fase(ahora)
+        Entrega.objects.bulk_update(
+            por_actualizar,
+            self.CAMPOS_ACTUALIZABLES + ['fase_actualizada'],
+            batch_size=self.tamano_lote,
+        )
+        deltas = deltas_creadas(por_crear)
+        deltas.update(deltas_modificadas(por_actualizar))
+        aplicar_deltas(deltas)
+        # bulk_create/bulk_update no emiten señales: se invalida la caché a mano
+        if por_crear or por_actualizar:
+            incrementar_version(*{entrega.base for entrega in por_crear + por_actualizar})
+        return nuevas
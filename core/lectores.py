@@ -0,0 +1,127 @@
+import codecs
+import csv
+import itertools
+import os
+
+import pandas as pd
+from openpyxl import load_workbook
+
+
+EXTENSIONES_SOPORTADAS = ['.xlsx', '.xls', '.csv']
+
+# Excel en Windows guarda los CSV en cp1252 si no se elige UTF-8
+CODIFICACION_ALTERNATIVA = 'cp1252'
+
+
+def _normalizar_encabezados(encabezados):
+    return [str(valor).strip().lower() if valor is not None else '' for valor in encabezados]
+
+
+def _filas_xlsx(ruta):
+    # read_only: las filas se leen del XML a medida que se recorren
+    wb = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        for fila in wb.active.iter_rows(values_only=True):
+            yield fila
+    finally:
+        wb.close()
+
+
+def _codificacion_csv(ruta, tamano_bloque=1024 * 1024):
+    """
+    'utf-8-sig' si todo el archivo es UTF-8 válido; si no, cp1252. Se
+    valida antes de leer filas para no fallar a mitad de una importación.
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    with open(ruta, 'rb') as archivo:
+        try:
+            while bloque := archivo.read(tamano_bloque):
+                decodificador.decode(bloque)
+            decodificador.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return CODIFICACION_ALTERNATIVA
+    return 'utf-8-sig'
+
+
+def _filas_csv(ruta):
+    with open(ruta, newline='', encoding=_codificacion_csv(ruta)) as archivo:
+        muestra = archivo.read(4096)
+        archivo.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        for fila in csv.reader(archivo, dialecto):
+            yield fila
+
+
+def _filas_xls(ruta):
+    # El formato .xls antiguo no admite lectura por streaming
+    df = pd.read_excel(ruta, header=None, dtype=object)
+    for fila in df.itertuples(index=False, name=None):
+        yield fila
+
+
+def leer_filas(ruta):
+    """
+    Devuelve (encabezados, iterador de filas) sin cargar el archivo completo
+    en memoria (salvo .xls). Los encabezados se normalizan a minúsculas.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.xlsx':
+        filas = _filas_xlsx(ruta)
+    elif extension == '.csv':
+        filas = _filas_csv(ruta)
+    elif extension == '.xls':
+        filas = _filas_xls(ruta)
+    else:
+        raise ValueError(f'Formato no soportado: {extension}')
+
+    encabezados = next(filas, None)
+    if encabezados is None:
+        return [], iter(())
+    return _normalizar_encabezados(encabezados), filas
+
+
+def contar_filas(ruta):
+    """
+    Estimación barata del número de filas de datos, para mostrar progreso.
+    Devuelve None si no se puede saber sin leer el archivo completo.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.csv':
+        with open(ruta, 'rb') as archivo:
+            return max(sum(1 for _ in archivo) - 1, 0)
+    if extension == '.xlsx':
+        wb = load_workbook(ruta, read_only=True)
+        try:
+            # Dimensión declarada en la hoja; puede faltar en archivos generados por terceros
+            maximo = wb.active.max_row
+        finally:
+            wb.close()
+        return maximo - 1 if maximo else None
+    return None
+
+
+def leer_bloques(ruta, tamano_bloque=5000):
+    """
+    Recorre el archivo en bloques de hasta `tamano_bloque` filas. Cada bloque
+    es un DataFrame cuyo índice es el número de fila en el archivo (la fila 1
+    es la cabecera). Las filas completamente vacías se omiten.
+    """
+    encabezados, filas = leer_filas(ruta)
+    ancho = len(encabezados)
+    columnas = [columna for columna in encabezados if columna]
+    numeradas = (
+        (numero, fila)
+        for numero, fila in enumerate(filas, start=2)
+        if any(valor not in (None, '') for valor in fila)
+    )
+    while True:
+        bloque = list(itertools.islice(numeradas, tamano_bloque))
+        if not bloque:
+            return
+        # Filas cortas (CSV) se completan; columnas sin encabezado se descartan
+        datos = [tuple(fila[:ancho]) + (None,) * (ancho - len(fila)) for _, fila in bloque]
+        df = pd.DataFrame(datos, columns=encabezados, index=[numero for numero, _ in bloque], dtype=object)
+        yield df.loc[:, columnas]
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bases import codigos_base
+from core.models import Periodo, Supervisor
+from core.periodos import abrir_periodo
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera la entrega pendiente del periodo para cada conductor de una base '
+        '(o de todas). Los conductores que ya tienen entrega se omiten, así que '
+        'se puede ejecutar varias veces.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('trimestre', choices=[clave for clave, _ in Periodo.TRIMESTRE_CHOICES])
+        parser.add_argument('año', type=int)
+        parser.add_argument('--base', choices=codigos_base(),
+                            help='Solo esta base (por defecto todas).')
+        parser.add_argument('--supervisor-defecto', type=int, action='append', default=[],
+                            help='Id de supervisor para conductores sin historial; uno por base, repetible.')
+
+    def handle(self, *args, **options):
+        periodo = (
+            Periodo.objects.filter(trimestre=options['trimestre'], año=options['año'])
+            .order_by('pk')
+            .first()
+        )
+        if periodo is None:
+            raise CommandError(f"No existe el periodo {options['trimestre']} {options['año']}")
+
+        supervisores = Supervisor.objects.in_bulk(options['supervisor_defecto'])
+        faltantes = set(options['supervisor_defecto']) - set(supervisores)
+        if faltantes:
+            raise CommandError(f'Supervisores inexistentes: {sorted(faltantes)}')
+
+        inicio = time.perf_counter()
+        creadas, existentes = abrir_periodo(
+            periodo,
+            base=options['base'],
+            supervisores_por_defecto={supervisor.base: supervisor.pk for supervisor in supervisores.values()},
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{periodo}: {creadas} entregas creadas, {existentes} ya existían '
+            f'({time.perf_counter() - inicio:.2f} s)'
+        ))
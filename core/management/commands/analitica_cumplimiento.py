@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bases import codigos_base
+from core.analitica import MINIMO_INCUMPLIDAS, PERIODOS_POR_DEFECTO, calcular_cumplimiento
+from core.models import Conductor, Supervisor
+
+
+class Command(BaseCommand):
+    help = (
+        'Analítica de cumplimiento de los últimos trimestres terminados: '
+        'conductores con entregas incumplidas, cumplimiento por periodo y '
+        'días que cada supervisor mantiene libretas en firma.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', choices=codigos_base(),
+                            help='Solo esta base (por defecto todas).')
+        parser.add_argument('--periodos', type=int, default=PERIODOS_POR_DEFECTO,
+                            help='Cantidad de trimestres terminados a analizar.')
+        parser.add_argument('--minimo', type=int, default=MINIMO_INCUMPLIDAS,
+                            help='Incumplidas mínimas para listar a un conductor.')
+        parser.add_argument('--limite', type=int, default=20,
+                            help='Conductores a mostrar en pantalla.')
+        parser.add_argument('--csv', dest='directorio',
+                            help='Guardar las tablas completas como CSV en este directorio.')
+
+    def handle(self, *args, **options):
+        if options['periodos'] < 1:
+            raise CommandError('--periodos debe ser al menos 1.')
+
+        inicio = time.perf_counter()
+        periodos, conductores, supervisores, por_periodo = calcular_cumplimiento(options['base'], options['periodos'])
+        segundos = time.perf_counter() - inicio
+        if not periodos:
+            raise CommandError('No hay trimestres terminados para analizar.')
+
+        # Nombres en lugar de ids y etiquetas de periodo como columnas
+        etiquetas = {periodo.pk: str(periodo) for periodo in periodos}
+        conductores = conductores.rename(columns=etiquetas)
+        conductores.insert(0, 'conductor', conductores.index.map(
+            dict(Conductor.objects.filter(pk__in=conductores.index.tolist()).values_list('pk', 'nombre'))
+        ))
+        supervisores.insert(0, 'supervisor', supervisores.index.map(
+            dict(Supervisor.objects.filter(pk__in=supervisores.index.tolist()).values_list('pk', 'nombre'))
+        ))
+        por_periodo = por_periodo.rename(index=etiquetas).rename_axis(index='periodo', columns=None)
+        en_riesgo = conductores[conductores['incumplidas'] >= options['minimo']]
+
+        self.stdout.write(self.style.MIGRATE_HEADING('Cumplimiento por periodo'))
+        self.stdout.write(por_periodo.to_string())
+        self.stdout.write(self.style.MIGRATE_HEADING('\nSupervisores'))
+        self.stdout.write(supervisores.to_string(index=False))
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nConductores con {options['minimo']} o más incumplidas: {len(en_riesgo)} de {len(conductores)}"
+        ))
+        self.stdout.write(en_riesgo.head(options['limite']).to_string(index=False))
+
+        if options['directorio']:
+            os.makedirs(options['directorio'], exist_ok=True)
+            tablas = {
+                'cumplimiento_periodos.csv': (por_periodo, True),
+                'cumplimiento_supervisores.csv': (supervisores, False),
+                'cumplimiento_conductores.csv': (conductores, False),
+            }
+            for nombre, (tabla, con_indice) in tablas.items():
+                tabla.to_csv(os.path.join(options['directorio'], nombre), index=con_indice)
+            self.stdout.write(self.style.SUCCESS(f"\nTablas guardadas en {options['directorio']}"))
+
+        self.stdout.write(self.style.SUCCESS(f'\nCalculado en {segundos:.2f} s'))
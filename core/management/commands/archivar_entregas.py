@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archivo import archivar_periodo, periodos_archivables
+
+
+class Command(BaseCommand):
+    help = (
+        'Pasa al archivo frío (CSV comprimido con gzip en MEDIA_ROOT/archivo) '
+        'las entregas de los periodos anteriores a los N últimos trimestres y '
+        'las borra de la BD. Las exportaciones y la analítica las siguen '
+        'leyendo del archivo cuando se pide el periodo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conservar-trimestres', type=int, required=True,
+                            help='Trimestres que se conservan en la BD, incluido el actual.')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo listar los periodos que se archivarían.')
+
+    def handle(self, *args, **options):
+        if options['conservar_trimestres'] < 1:
+            raise CommandError('--conservar-trimestres debe ser al menos 1')
+
+        periodos = periodos_archivables(options['conservar_trimestres'])
+        if not periodos:
+            self.stdout.write('No hay periodos que archivar')
+            return
+
+        for periodo in periodos:
+            if options['simular']:
+                self.stdout.write(f'Archivar: {periodo}')
+                continue
+            inicio = time.perf_counter()
+            filas = archivar_periodo(periodo)
+            self.stdout.write(self.style.SUCCESS(
+                f'{periodo}: {filas} entregas archivadas ({time.perf_counter() - inicio:.2f} s)'
+            ))
@@ -0,0 +1,102 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from accounts.bases import codigos_base
+from core.api.serializadores import MAXIMO_LOTE
+from core.models import Conductor, Periodo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el rendimiento por petición de POST /api/v1/conductores/lote/ y '
+        '/api/v1/entregas/lote/ (crear y upsert) para varios tamaños de lote. '
+        'Todo se ejecuta dentro de una transacción que se revierte al final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='100,1000,5000',
+                            help=f'Ítems por lote, separados por comas (máximo {MAXIMO_LOTE}).')
+        parser.add_argument('--base', default='lampa', choices=codigos_base())
+        parser.add_argument('--json', dest='ruta_json', help='Guardar los resultados en este archivo JSON.')
+
+    def medir(self, cliente, recurso, modo, items):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            respuesta = cliente.post(f'/api/v1/{recurso}/lote/', {'modo': modo, 'items': items}, format='json')
+            segundos = time.perf_counter() - inicio
+        if respuesta.status_code != 200:
+            raise CommandError(f'{recurso} {modo}: HTTP {respuesta.status_code} {respuesta.content[:300]!r}')
+        datos = respuesta.json()
+        if datos['resumen']['error']:
+            raise CommandError(f"{recurso} {modo}: {datos['resumen']['error']} ítems con error, p. ej. {datos['resultados'][0]}")
+
+        medicion = {
+            'recurso': recurso,
+            'modo': modo,
+            'items': len(items),
+            'segundos': round(segundos, 3),
+            'items_por_segundo': round(len(items) / segundos),
+            'consultas': len(consultas),
+            'resumen': datos['resumen'],
+        }
+        self.stdout.write(
+            f"{recurso:<12} {modo:<7} {len(items):>6} ítems  {segundos:>7.3f} s  "
+            f"{medicion['items_por_segundo']:>7} ítems/s  {len(consultas):>4} consultas"
+        )
+        return medicion, datos['resultados']
+
+    def handle(self, *args, **options):
+        tamanos = sorted(int(valor) for valor in options['tamanos'].split(','))
+        if tamanos[-1] > MAXIMO_LOTE:
+            raise CommandError(f'El tamaño máximo de un lote es {MAXIMO_LOTE}.')
+        base = options['base']
+
+        resultados = []
+        with transaction.atomic():
+            # La señal de accounts crea el perfil; se asigna a la base medida
+            usuario = User.objects.create(username='benchmark-api-lotes')
+            usuario.perfil.base = base
+            usuario.perfil.save(update_fields=['base'])
+            cliente = APIClient()
+            cliente.force_authenticate(usuario)
+
+            for tamano in tamanos:
+                prefijo = f'BENCHMARK LOTE {tamano}'
+                conductores = [{'nombre': f'{prefijo} {i:05d}', 'base': base} for i in range(tamano)]
+                medicion, _ = self.medir(cliente, 'conductores', 'crear', conductores)
+                resultados.append(medicion)
+                # Upsert por nombre: mismos conductores, la mitad con otro nombre
+                for i, item in enumerate(conductores):
+                    if i % 2:
+                        item['nombre'] = item['nombre'].lower()
+                medicion, creados = self.medir(cliente, 'conductores', 'upsert', conductores)
+                resultados.append(medicion)
+
+                # Un periodo nuevo por tamaño para que ninguna entrega exista de antes
+                periodo = Periodo.objects.create(trimestre='Q1', año=1900 + tamano % 1000)
+                entregas = [
+                    {'conductor_id': item['id'], 'periodo_id': periodo.pk, 'estado': 'pendiente'}
+                    for item in creados
+                ]
+                medicion, _ = self.medir(cliente, 'entregas', 'crear', entregas)
+                resultados.append(medicion)
+                for i, item in enumerate(entregas):
+                    if i % 2:
+                        item.update(estado='entregada', fase='entregada', fecha_entrega='2000-01-01')
+                medicion, _ = self.medir(cliente, 'entregas', 'upsert', entregas)
+                resultados.append(medicion)
+
+            if Conductor.objects.filter(nombre__startswith='BENCHMARK LOTE').count() != sum(tamanos):
+                raise CommandError('El upsert de conductores creó duplicados.')
+            transaction.set_rollback(True)
+
+        if options['ruta_json']:
+            with open(options['ruta_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['ruta_json']}"))
@@ -0,0 +1,120 @@
+import io
+import json
+import math
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from accounts.bases import codigos_base
+from core.datos_sinteticos import sembrar
+from core.exportaciones import ENCABEZADOS_ENTREGAS, escribir_xlsx, filas_entregas
+from core.medicion import medir_en_subproceso
+from core.models import Conductor, Supervisor, Periodo, Entrega
+
+# Tablas que siembra el comando y que borra al terminar
+MODELOS_SEMBRADOS = [Conductor, Periodo, Supervisor]
+
+
+def xlsx_en_memoria(limite):
+    """Implementación anterior: Workbook normal, instancias completas y buffer en memoria."""
+    from openpyxl import Workbook
+
+    entregas = Entrega.objects.filter(numero_registro__lte=limite)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Entregas"
+    ws.append(ENCABEZADOS_ENTREGAS)
+    for entrega in entregas.select_related('conductor', 'supervisor', 'periodo'):
+        ws.append([
+            entrega.numero_registro,
+            str(entrega.periodo),
+            entrega.periodo.año,
+            entrega.periodo.trimestre,
+            entrega.get_base_display(),
+            entrega.conductor.nombre,
+            entrega.supervisor.nombre if entrega.supervisor else 'N/A',
+            entrega.get_estado_display(),
+            entrega.get_fase_display(),
+            entrega.fecha_entrega.strftime('%Y-%m-%d') if entrega.fecha_entrega else '',
+            entrega.notas
+        ])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.tell()
+
+
+def xlsx_streaming(limite):
+    """Implementación actual: write-only alimentado por lotes y volcado a un archivo temporal."""
+    entregas = Entrega.objects.filter(numero_registro__lte=limite)
+    with tempfile.TemporaryFile() as archivo:
+        escribir_xlsx(archivo, "Entregas", ENCABEZADOS_ENTREGAS, filas_entregas(entregas))
+        return archivo.tell()
+
+
+# Se ejecutan en un proceso nuevo por medición (ver core.medicion)
+IMPLEMENTACIONES = {
+    'xlsx_en_memoria': f'{__name__}.xlsx_en_memoria',
+    'xlsx_streaming': f'{__name__}.xlsx_streaming',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara pico de RSS y tiempo de la exportación XLSX anterior (en memoria) '
+        'con la actual (write-only + archivo temporal). Siembra datos sintéticos: '
+        'ejecútese contra una base de datos de pruebas vacía.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', default='10000,100000,500000',
+                            help='Tamaños a medir, separados por comas.')
+        parser.add_argument('--periodos', type=int, default=8)
+        parser.add_argument('--json', dest='ruta_json', help='Guardar los resultados en este archivo JSON.')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borrar los datos sintéticos al terminar.')
+
+    def handle(self, *args, **options):
+        tamanos = sorted(int(valor) for valor in options['filas'].split(','))
+        periodos = options['periodos']
+        maximo = tamanos[-1]
+
+        ocupadas = [modelo.__name__ for modelo in [Entrega, *MODELOS_SEMBRADOS] if modelo.objects.exists()]
+        if ocupadas:
+            raise CommandError(
+                f"La base de datos ya tiene datos ({', '.join(ocupadas)}): use una base de datos de pruebas vacía."
+            )
+
+        # Una sola siembra para el tamaño mayor; cada medición recorta por numero_registro
+        conductores_por_base = math.ceil(maximo / (len(codigos_base()) * periodos))
+        self.stdout.write(f'Sembrando {maximo} entregas...')
+        sembrar(conductores_por_base=conductores_por_base, periodos=periodos, entregas=maximo)
+        # Rango de pks sembrado por modelo: al terminar se borra solo eso
+        sembrados = {modelo: modelo.objects.aggregate(desde=Min('pk'), hasta=Max('pk')) for modelo in MODELOS_SEMBRADOS}
+        numeros = list(Entrega.objects.order_by('numero_registro').values_list('numero_registro', flat=True))
+
+        resultados = []
+        try:
+            for tamano in tamanos:
+                limite = numeros[tamano - 1]
+                for nombre, ruta in IMPLEMENTACIONES.items():
+                    medicion = medir_en_subproceso(ruta, limite)
+                    if 'error' in medicion:
+                        raise CommandError(f"{nombre}: {medicion['error']}")
+                    medicion.update({'implementacion': nombre, 'filas': tamano, 'bytes': medicion.pop('resultado')})
+                    resultados.append(medicion)
+                    self.stdout.write(
+                        f"{tamano:>8} filas  {nombre:<16} {medicion['segundos']:>8.2f} s  "
+                        f"RSS pico {medicion['rss_pico_mb']:>8.1f} MB  "
+                        f"(+{medicion['rss_incremento_mb']:.1f} MB)"
+                    )
+        finally:
+            if not options['conservar']:
+                # Borrar conductores y periodos elimina en cascada las entregas
+                for modelo, rango in sembrados.items():
+                    modelo.objects.filter(pk__range=(rango['desde'], rango['hasta'])).delete()
+
+        if options['ruta_json']:
+            with open(options['ruta_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['ruta_json']}"))
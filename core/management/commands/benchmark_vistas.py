@@ -0,0 +1,248 @@
+import json
+import math
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.bases import codigos_base
+from core.datos_sinteticos import sembrar
+from core.models import Conductor, Entrega, Periodo, Supervisor, TrabajoImportacion
+from core.trabajos import procesar_trabajo
+
+
+def escenarios(base):
+    """
+    (nombre, url) de las rutas medidas, con filtros tomados de los datos
+    existentes de la base: uno que el resumen responde, uno que no
+    (conductor) y páginas profundas con OFFSET y con cursor.
+    """
+    conductor = Conductor.objects.filter(base=base).order_by('pk').values_list('nombre', flat=True).first() or ''
+    supervisor = Supervisor.objects.filter(base=base).order_by('pk').values_list('nombre', flat=True).first() or ''
+    periodo = Periodo.objects.order_by('-año', '-trimestre').first()
+    texto_periodo = f'{periodo.año}-{periodo.trimestre[1]}' if periodo else ''
+    dashboard = reverse('dashboard')
+    return [
+        ('dashboard', dashboard),
+        ('dashboard_estado_fase_periodo', f'{dashboard}?estado=pendiente&fase=en_firma&periodo={texto_periodo}'),
+        ('dashboard_conductor', f'{dashboard}?conductor={conductor}'),
+        ('dashboard_supervisor_estado', f'{dashboard}?supervisor={supervisor}&estado=entregada'),
+        ('dashboard_pagina_50', f'{dashboard}?page=50'),
+        ('dashboard_cursor', f'{dashboard}?paginacion=cursor'),
+        ('listar_conductores', reverse('listar_conductores')),
+        ('listar_conductores_base', f"{reverse('listar_conductores')}?base={base}"),
+        ('listar_supervisores', reverse('listar_supervisores')),
+        ('listar_periodos', reverse('listar_periodos')),
+        ('crear_entrega', reverse('crear_entrega')),
+        ('analitica', reverse('analitica')),
+        ('api_entregas', reverse('api-entregas-list')),
+        ('exportar_entregas_csv', reverse('exportar_entregas_csv')),
+        ('exportar_entregas_csv_filtrado', f"{reverse('exportar_entregas_csv')}?estado=pendiente&periodo={texto_periodo}"),
+        ('exportar_entregas_xls', reverse('exportar_entregas_xls')),
+        ('exportar_periodos_csv', reverse('exportar_periodos_csv')),
+        ('exportar_periodos_xls', reverse('exportar_periodos_xls')),
+    ]
+
+
+def resumen_tiempos(tiempos):
+    """Primera ejecución (cachés frías) y mediana/mínimo/máximo de las siguientes."""
+    calientes = tiempos[1:] or tiempos
+    return {
+        'primera_ms': round(tiempos[0] * 1000, 1),
+        'mediana_ms': round(statistics.median(calientes) * 1000, 1),
+        'minimo_ms': round(min(calientes) * 1000, 1),
+        'maximo_ms': round(max(calientes) * 1000, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las rutas más usadas (dashboard con filtros, listados, exportaciones y '
+        'carga masiva de conductores) con el cliente de pruebas y guarda los resultados '
+        'en JSON para comparar entre ejecuciones. Con --tamanos siembra datos sintéticos '
+        'por tramos y mide en cada tamaño: ejecútese contra una base de datos de pruebas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos',
+                            help='Entregas totales a medir, separadas por comas (p. ej. 10000,100000,1000000). '
+                                 'Sin esta opción se mide con los datos existentes.')
+        parser.add_argument('--periodos', type=int, default=12,
+                            help='Periodos de los datos sembrados.')
+        bases = codigos_base()
+        parser.add_argument('--base', default=bases[-1] if bases else None, choices=bases,
+                            help='Base del usuario con que se mide.')
+        parser.add_argument('--repeticiones', type=int, default=5,
+                            help='Ejecuciones por ruta; la primera se informa aparte (cachés frías).')
+        parser.add_argument('--filas-carga', type=int, default=1_000,
+                            help='Filas del archivo de la carga masiva de conductores (0 la omite).')
+        parser.add_argument('--solo', help='Medir solo estos escenarios (separados por comas).')
+        parser.add_argument('--omitir', default='', help='Escenarios a omitir (separados por comas).')
+        parser.add_argument('--json', dest='ruta_json', help='Guardar los resultados en este archivo JSON.')
+        parser.add_argument('--comparar', help='JSON de una ejecución anterior para mostrar la diferencia.')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1:
+            raise CommandError('--repeticiones debe ser al menos 1.')
+        tamanos = [None]
+        if options['tamanos']:
+            tamanos = sorted(int(valor) for valor in options['tamanos'].split(','))
+            if Entrega.objects.exists():
+                raise CommandError('Con --tamanos la base de datos debe estar vacía de entregas (use una de pruebas).')
+        anterior = self.cargar_anterior(options['comparar'])
+
+        cliente = Client()
+        cliente.force_login(self.usuario(options['base']))
+
+        resultados = []
+        sembradas = 0
+        for tamano in tamanos:
+            if tamano is not None and tamano > sembradas:
+                self.sembrar_hasta(tamano, sembradas, options['periodos'])
+                sembradas = tamano
+            total = Entrega.objects.count()
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{total} entregas'))
+
+            for nombre, url in self.filtrar(escenarios(options['base']), options):
+                medicion = self.medir(cliente, nombre, url, options['repeticiones'])
+                medicion['entregas'] = total
+                resultados.append(medicion)
+                self.informar(medicion, anterior)
+
+            if options['filas_carga'] and self.incluido('carga_masiva_conductores', options):
+                medicion = self.medir_carga(cliente, options['base'], options['filas_carga'], options['repeticiones'])
+                medicion['entregas'] = total
+                resultados.append(medicion)
+                self.informar(medicion, anterior)
+
+        if options['ruta_json']:
+            informe = {
+                'fecha': timezone.now().isoformat(),
+                'motor': connection.vendor,
+                'base': options['base'],
+                'repeticiones': options['repeticiones'],
+                'resultados': resultados,
+            }
+            with open(options['ruta_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"\nResultados guardados en {options['ruta_json']}"))
+
+    # --- Preparación ---
+    def usuario(self, base):
+        usuario, _ = User.objects.get_or_create(username='benchmark')
+        # La señal de accounts crea el perfil; se asigna a la base medida
+        if usuario.perfil.base != base:
+            usuario.perfil.base = base
+            usuario.perfil.save(update_fields=['base'])
+        return usuario
+
+    def sembrar_hasta(self, tamano, sembradas, periodos):
+        faltan = tamano - sembradas
+        conductores_por_base = math.ceil(faltan / (len(codigos_base()) * periodos))
+        self.stdout.write(f'Sembrando {faltan} entregas ({conductores_por_base} conductores por base)...')
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            sembrar(
+                conductores_por_base=conductores_por_base,
+                supervisores_por_base=max(1, conductores_por_base // 100),
+                periodos=periodos,
+                entregas=faltan,
+                semilla=tamano,
+            )
+        self.stdout.write(f'  {time.perf_counter() - inicio:.1f} s')
+
+    def incluido(self, nombre, options):
+        if options['solo'] and nombre not in options['solo'].split(','):
+            return False
+        return nombre not in options['omitir'].split(',')
+
+    def filtrar(self, lista, options):
+        return [(nombre, url) for nombre, url in lista if self.incluido(nombre, options)]
+
+    # --- Medición ---
+    def medir(self, cliente, nombre, url, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                respuesta = cliente.get(url)
+                # Las exportaciones son streaming: el tiempo incluye generar todo el contenido
+                if respuesta.streaming:
+                    tamano = sum(len(parte) for parte in respuesta.streaming_content)
+                else:
+                    tamano = len(respuesta.content)
+                tiempos.append(time.perf_counter() - inicio)
+            if respuesta.status_code != 200:
+                raise CommandError(f'{nombre} ({url}): HTTP {respuesta.status_code}')
+        return {
+            'escenario': nombre,
+            'url': url,
+            **resumen_tiempos(tiempos),
+            'consultas': len(consultas),
+            'bytes': tamano,
+        }
+
+    def medir_carga(self, cliente, base, filas, repeticiones):
+        """
+        POST del archivo (encolar) y procesamiento del trabajo como lo haría
+        el worker. Mitad conductores nuevos y mitad existentes (actualización).
+        Cada repetición se revierte para no alterar los datos medidos.
+        """
+        existentes = list(Conductor.objects.filter(base=base).order_by('pk').values_list('nombre', flat=True)[:filas // 2])
+        nombres = existentes + [f'CONDUCTOR CARGA {i:06d}' for i in range(filas - len(existentes))]
+        contenido = ('nombre,base\n' + ''.join(f'{nombre},{base}\n' for nombre in nombres)).encode()
+        url = reverse('carga_masiva_conductores')
+
+        tiempos, tiempos_encolar = [], []
+        for _ in range(repeticiones):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as consultas:
+                    inicio = time.perf_counter()
+                    respuesta = cliente.post(url, {
+                        'archivo_excel': SimpleUploadedFile('conductores.csv', contenido, content_type='text/csv'),
+                    })
+                    encolado = time.perf_counter()
+                    trabajo = TrabajoImportacion.objects.order_by('-pk').first()
+                    procesar_trabajo(trabajo)
+                    tiempos.append(time.perf_counter() - inicio)
+                    tiempos_encolar.append(encolado - inicio)
+                if respuesta.status_code != 302 or trabajo.estado != 'terminado':
+                    raise CommandError(f'carga_masiva_conductores: HTTP {respuesta.status_code}, trabajo {trabajo.estado} {trabajo.error}')
+                transaction.set_rollback(True)
+        return {
+            'escenario': 'carga_masiva_conductores',
+            'url': url,
+            'filas': filas,
+            **resumen_tiempos(tiempos),
+            'encolar_mediana_ms': resumen_tiempos(tiempos_encolar)['mediana_ms'],
+            'consultas': len(consultas),
+            'creados': trabajo.creados,
+            'actualizados': trabajo.actualizados,
+        }
+
+    # --- Salida ---
+    def cargar_anterior(self, ruta):
+        if not ruta:
+            return {}
+        with open(ruta, encoding='utf-8') as archivo:
+            informe = json.load(archivo)
+        return {(fila['entregas'], fila['escenario']): fila for fila in informe['resultados']}
+
+    def informar(self, medicion, anterior):
+        linea = (
+            f"{medicion['escenario']:<32} primera {medicion['primera_ms']:>9.1f} ms  "
+            f"mediana {medicion['mediana_ms']:>9.1f} ms  {medicion['consultas']:>4} consultas"
+        )
+        previa = anterior.get((medicion['entregas'], medicion['escenario']))
+        if previa and previa['mediana_ms']:
+            cambio = medicion['mediana_ms'] / previa['mediana_ms']
+            estilo = self.style.SUCCESS if cambio <= 0.9 else self.style.ERROR if cambio >= 1.1 else str
+            linea += estilo(f"  x{cambio:.2f} vs {previa['mediana_ms']:.1f} ms")
+        self.stdout.write(linea)
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.datos_sinteticos import sembrar
+from core.models import Conductor, Supervisor, Entrega
+
+
+class Command(BaseCommand):
+    help = (
+        'Muestra los planes EXPLAIN de las consultas del dashboard, exportaciones '
+        'y admin sin y con los índices compuestos. Todo se ejecuta dentro de una '
+        'transacción que se revierte al final: no deja datos ni cambios de esquema.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entregas', type=int, default=50_000,
+                            help='Entregas sintéticas a sembrar (0 usa los datos existentes).')
+        parser.add_argument('--conductores', type=int, default=500,
+                            help='Conductores sintéticos por base.')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def consultas(self):
+        """Formas de consulta reales de las vistas, con valores tomados de los datos."""
+        muestra = Entrega.objects.order_by('pk').values('base', 'periodo_id').first()
+        if not muestra:
+            return []
+        base, periodo = muestra['base'], muestra['periodo_id']
+        return [
+            ('dashboard sin filtros',
+             Entrega.objects.filter(base=base).order_by(*Entrega.ORDEN_RECIENTES)[:10]),
+            ('dashboard estado=pendiente',
+             Entrega.objects.filter(base=base, estado='pendiente').order_by(*Entrega.ORDEN_RECIENTES)[:10]),
+            ('dashboard estado=entregada',
+             Entrega.objects.filter(base=base, estado='entregada').order_by(*Entrega.ORDEN_RECIENTES)[:10]),
+            ('resumen periodo + fase',
+             Entrega.objects.filter(periodo_id=periodo, base=base, fase='en_firma')),
+            ('exportación por base',
+             Entrega.objects.filter(base=base).values_list('numero_registro', 'estado', 'fase')),
+            ('admin estado + fase + base + periodo',
+             Entrega.objects.filter(estado='pendiente', fase='no_entregada', base=base, periodo_id=periodo)),
+            ('desplegable conductores',
+             Conductor.objects.filter(base=base).order_by('nombre')),
+        ]
+
+    def analizar(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def imprimir_planes(self, titulo):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n===== {titulo} ====='))
+        for nombre, queryset in self.consultas():
+            self.stdout.write(self.style.SUCCESS(f'\n-- {nombre}'))
+            self.stdout.write(queryset.explain())
+
+    def handle(self, *args, **options):
+        modelos = [Entrega, Conductor, Supervisor]
+
+        # SQLite solo permite desactivar las FK fuera de la transacción, y su
+        # schema editor lo exige para operar dentro de un atomic()
+        with connection.constraint_checks_disabled(), transaction.atomic():
+            if options['entregas']:
+                creados = sembrar(
+                    conductores_por_base=options['conductores'],
+                    entregas=options['entregas'],
+                    semilla=options['semilla'],
+                )
+                self.stdout.write(f'Datos sembrados: {creados}')
+
+            # ANTES: se eliminan los índices declarados en Meta.indexes
+            with connection.schema_editor(atomic=False) as editor:
+                for modelo in modelos:
+                    for indice in modelo._meta.indexes:
+                        editor.remove_index(modelo, indice)
+            self.analizar()
+            self.imprimir_planes('ANTES (sin índices compuestos)')
+
+            # DESPUÉS: se vuelven a crear
+            with connection.schema_editor(atomic=False) as editor:
+                for modelo in modelos:
+                    for indice in modelo._meta.indexes:
+                        editor.add_index(modelo, indice)
+            self.analizar()
+            self.imprimir_planes('DESPUÉS (con índices compuestos)')
+
+            transaction.set_rollback(True)
@@ -0,0 +1,58 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.particiones import (
+    TABLA,
+    TABLA_ARCHIVO,
+    archivar_periodos,
+    crear_particiones_faltantes,
+    particionada,
+    particiones,
+    periodos_archivables,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Mantenimiento de las particiones de entregas (PostgreSQL): crea las '
+        'de los periodos que no la tienen y, con --conservar-anios, archiva '
+        'los periodos de años anteriores en core_entrega_archivo. En SQLite '
+        'la tabla es una sola y archivar copia las filas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conservar-anios', type=int,
+                            help='Archivar los periodos anteriores a los N últimos años (incluido el actual).')
+        parser.add_argument('--anio-actual', type=int, default=datetime.date.today().year,
+                            help='Año de referencia para --conservar-anios (por defecto el actual).')
+        parser.add_argument('--simular', action='store_true',
+                            help='Solo listar los periodos que se archivarían.')
+
+    def handle(self, *args, **options):
+        if options['conservar_anios'] is not None and options['conservar_anios'] < 1:
+            raise CommandError('--conservar-anios debe ser al menos 1')
+
+        if particionada():
+            creadas = crear_particiones_faltantes()
+            self.stdout.write(f'{len(creadas)} particiones creadas')
+        else:
+            self.stdout.write(f'{TABLA} no está particionada (motor sin particiones): una sola tabla')
+
+        if options['conservar_anios'] is not None:
+            periodos = periodos_archivables(options['conservar_anios'], options['anio_actual'])
+            for periodo in periodos:
+                self.stdout.write(f'Archivar: {periodo}')
+            if periodos and not options['simular']:
+                inicio = time.perf_counter()
+                total = archivar_periodos(periodos)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{len(periodos)} periodos archivados, {total} entregas '
+                    f'({time.perf_counter() - inicio:.2f} s)'
+                ))
+
+        if particionada():
+            for tabla in [TABLA, TABLA_ARCHIVO]:
+                for nombre, filas in sorted(particiones(tabla).items()):
+                    self.stdout.write(f'{tabla} <- {nombre}: ~{max(filas, 0)} filas')
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import TrabajoExportacion, TrabajoImportacion
+from core.trabajos import procesar_trabajo, purgar_obsoletos, tomar_siguiente_trabajo
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker local: procesa los trabajos de importación (carga masiva) y de '
+        'exportación pendientes, con los archivos en MEDIA_ROOT. Por defecto queda '
+        'escuchando; con --una-vez vacía la cola y termina.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesar lo pendiente y salir.')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos de espera cuando la cola está vacía.')
+
+    def handle(self, *args, **options):
+        while True:
+            # Las importaciones primero: el usuario está mirando su progreso
+            trabajo = tomar_siguiente_trabajo(TrabajoImportacion) or tomar_siguiente_trabajo(TrabajoExportacion)
+            if trabajo is None:
+                borrados = purgar_obsoletos()
+                if borrados:
+                    self.stdout.write(f'{borrados} exportaciones obsoletas eliminadas')
+                if options['una_vez']:
+                    return
+                time.sleep(options['intervalo'])
+                continue
+
+            self.stdout.write(f'Procesando {trabajo}...')
+            inicio = time.perf_counter()
+            procesar_trabajo(trabajo)
+            if trabajo.estado == 'terminado':
+                filas = getattr(trabajo, 'filas', None) or getattr(trabajo, 'filas_procesadas', 0)
+                self.stdout.write(self.style.SUCCESS(
+                    f'  {filas} filas en {time.perf_counter() - inicio:.1f} s'
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f'  Error: {trabajo.error}'))
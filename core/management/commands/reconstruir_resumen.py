@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Entrega, ResumenEntregas
+from core.resumen import CLAVE, grupos, recalcular_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye desde cero la tabla de resumen de entregas por base, '
+        'periodo, estado y fase. Normalmente se mantiene sola; sirve para '
+        'corregir desajustes (p. ej. tras cambios hechos a mano en la BD).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true',
+                            help='Solo comparar con las entregas e informar diferencias, sin escribir.')
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            esperado = grupos(Entrega.objects.all())
+            actual = {
+                tuple(fila[campo] for campo in CLAVE): fila['total']
+                for fila in ResumenEntregas.objects.values(*CLAVE, 'total')
+            }
+            diferencias = [
+                (clave, actual.get(clave, 0), esperado.get(clave, 0))
+                for clave in set(esperado) | set(actual)
+                if actual.get(clave, 0) != esperado.get(clave, 0)
+            ]
+            for clave, en_resumen, en_entregas in sorted(diferencias, key=str):
+                self.stdout.write(f'{clave}: resumen {en_resumen}, entregas {en_entregas}')
+            estilo = self.style.WARNING if diferencias else self.style.SUCCESS
+            self.stdout.write(estilo(f'{len(diferencias)} grupos con diferencias'))
+            return
+
+        inicio = time.perf_counter()
+        grupos_creados = recalcular_resumen()
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen reconstruido: {grupos_creados} grupos ({time.perf_counter() - inicio:.2f} s)'
+        ))
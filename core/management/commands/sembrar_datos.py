@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.datos_sinteticos import sembrar
+from core.models import Entrega
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra datos sintéticos reproducibles (misma semilla, mismos datos) con '
+        'bulk_create: conductores y supervisores por base, periodos y entregas. '
+        'Sirve para reproducir volúmenes de producción en una base de datos de pruebas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conductores', type=int, default=2_000,
+                            help='Conductores por base.')
+        parser.add_argument('--supervisores', type=int, default=20,
+                            help='Supervisores por base.')
+        parser.add_argument('--periodos', type=int, default=12,
+                            help='Periodos mínimos (se agregan más si las entregas no caben).')
+        parser.add_argument('--entregas', type=int, default=1_000_000)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=5_000,
+                            help='Filas por INSERT.')
+        parser.add_argument('--agregar', action='store_true',
+                            help='Permitir sembrar sobre una BD que ya tiene entregas.')
+
+    def handle(self, *args, **options):
+        if options['conductores'] < 1 or options['supervisores'] < 1:
+            raise CommandError('Se necesita al menos un conductor y un supervisor por base.')
+        if Entrega.objects.exists() and not options['agregar']:
+            raise CommandError(
+                'La base de datos ya tiene entregas: use una de pruebas vacía o --agregar para crecer sobre ella.'
+            )
+
+        inicio = time.perf_counter()
+        total = options['entregas']
+
+        def progreso(creadas):
+            if creadas % (options['lote'] * 20) == 0:
+                segundos = time.perf_counter() - inicio
+                self.stdout.write(f'  {creadas}/{total} entregas ({creadas / segundos:.0f}/s)')
+
+        self.stdout.write(f'Sembrando {total} entregas...')
+        with transaction.atomic():
+            creados = sembrar(
+                conductores_por_base=options['conductores'],
+                supervisores_por_base=options['supervisores'],
+                periodos=options['periodos'],
+                entregas=total,
+                semilla=options['semilla'],
+                lote=options['lote'],
+                progreso=progreso,
+            )
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Creados {creados['entregas']} entregas, {creados['conductores']} conductores, "
+            f"{creados['supervisores']} supervisores y {creados['periodos']} periodos en {segundos:.1f} s"
+        ))
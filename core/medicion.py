@@ -0,0 +1,58 @@
+"""
+Utilidades de medición para los benchmarks.
+
+Este módulo no importa modelos a nivel de módulo: los procesos hijos se
+crean con 'spawn' y lo importan antes de django.setup().
+"""
+import multiprocessing
+import resource
+import sys
+import time
+
+
+def rss_maximo_mb():
+    """Pico de memoria residente del proceso actual, en MB."""
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+
+def _ejecutar(ruta_funcion, argumentos, cola):
+    import django
+    django.setup()
+    from django.utils.module_loading import import_string
+
+    funcion = import_string(ruta_funcion)
+    rss_inicial = rss_maximo_mb()
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion(*argumentos)
+    except Exception as e:
+        cola.put({'error': f'{type(e).__name__}: {e}'})
+        return
+    segundos = time.perf_counter() - inicio
+    cola.put({
+        'segundos': round(segundos, 3),
+        'rss_pico_mb': round(rss_maximo_mb(), 1),
+        'rss_incremento_mb': round(rss_maximo_mb() - rss_inicial, 1),
+        'resultado': resultado,
+    })
+
+
+def medir_en_subproceso(ruta_funcion, *argumentos):
+    """
+    Ejecuta `ruta_funcion` (ruta importable, p. ej. 'core.x.funcion') en un
+    proceso nuevo y devuelve tiempo de pared y pico de RSS de esa ejecución,
+    sin la memoria acumulada por el proceso que lanza el benchmark.
+    """
+    from django.db import connections
+
+    # Los datos deben estar confirmados: el hijo abre su propia conexión
+    connections.close_all()
+    contexto = multiprocessing.get_context('spawn')
+    cola = contexto.Queue()
+    proceso = contexto.Process(target=_ejecutar, args=(ruta_funcion, argumentos, cola))
+    proceso.start()
+    medicion = cola.get()
+    proceso.join()
+    return medicion
@@ -0,0 +1,181 @@
+"""
+Métricas por vista: consultas SQL, tiempo de SQL, tiempo de render y
+consultas repetidas (N+1), acumuladas en memoria del proceso y expuestas
+en formato de texto de Prometheus.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+
+# Límites (segundos) del histograma de latencia
+LIMITES_LATENCIA = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+# Largo máximo de la huella de una consulta en las etiquetas y el log
+LARGO_HUELLA = 200
+
+_LISTA_IN = re.compile(r'\bIN\s*\((?:\s*%s\s*,?)+\)', re.IGNORECASE)
+_FILAS_VALUES = re.compile(r'(\bVALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+', re.IGNORECASE)
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def umbral_lento_ms():
+    return getattr(settings, 'METRICAS_UMBRAL_LENTO_MS', 500)
+
+
+def minimo_n_mas_1():
+    return getattr(settings, 'METRICAS_N_MAS_1_MINIMO', 5)
+
+
+def huella(sql):
+    """
+    La consulta sin sus valores: dos ejecuciones de la misma consulta con
+    distintos parámetros (o listas IN / VALUES de distinto largo) tienen
+    la misma huella.
+    """
+    sql = _LISTA_IN.sub('IN (...)', sql)
+    # Un INSERT de varias filas queda igual al de una
+    sql = _FILAS_VALUES.sub(r'\1', sql)
+    sql = _TEXTO.sub('?', sql)
+    sql = _NUMERO.sub('?', sql)
+    return _ESPACIOS.sub(' ', sql).strip()[:LARGO_HUELLA]
+
+
+class Medicion:
+    """Lo medido durante una solicitud."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql_segundos = 0.0
+        self.render_segundos = 0.0
+        self.huellas = Counter()
+
+    def envoltura_sql(self, execute, sql, params, many, context):
+        """execute_wrapper de la conexión: cuenta y cronometra cada consulta."""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            self.huellas[huella(sql)] += 1
+
+    def repetidas(self, minimo=None):
+        """[(huella, veces)] de las consultas ejecutadas al menos `minimo` veces (N+1)."""
+        minimo = minimo or minimo_n_mas_1()
+        return [(sql, veces) for sql, veces in self.huellas.most_common() if veces >= minimo]
+
+
+class EstadisticasVista:
+    def __init__(self):
+        self.por_estado = Counter()
+        self.latencia = [0] * len(LIMITES_LATENCIA)
+        self.segundos = 0.0
+        self.consultas = 0
+        self.maximo_consultas = 0
+        self.sql_segundos = 0.0
+        self.render_segundos = 0.0
+        self.lentas = 0
+
+
+class RegistroMetricas:
+    """Acumulados por vista del proceso actual (cada worker expone los suyos)."""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.vistas = defaultdict(EstadisticasVista)
+        self.n_mas_1 = Counter()
+
+    def registrar(self, vista, estado, medicion, segundos, repetidas=()):
+        with self._candado:
+            estadisticas = self.vistas[vista]
+            estadisticas.por_estado[estado] += 1
+            for indice, limite in enumerate(LIMITES_LATENCIA):
+                if segundos <= limite:
+                    estadisticas.latencia[indice] += 1
+            estadisticas.segundos += segundos
+            estadisticas.consultas += medicion.consultas
+            estadisticas.maximo_consultas = max(estadisticas.maximo_consultas, medicion.consultas)
+            estadisticas.sql_segundos += medicion.sql_segundos
+            estadisticas.render_segundos += medicion.render_segundos
+            if segundos * 1000 >= umbral_lento_ms():
+                estadisticas.lentas += 1
+            for sql, _ in repetidas:
+                self.n_mas_1[(vista, sql)] += 1
+
+    def reiniciar(self):
+        with self._candado:
+            self.vistas.clear()
+            self.n_mas_1.clear()
+
+    def exposicion(self):
+        """Texto en el formato de exposición de Prometheus (0.0.4)."""
+        with self._candado:
+            vistas = sorted(self.vistas.items())
+            n_mas_1 = sorted(self.n_mas_1.items())
+
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, muestras):
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            for sufijo, etiquetas, valor in muestras:
+                lineas.append(f'{nombre}{sufijo}{_etiquetas(etiquetas)} {_numero(valor)}')
+
+        metrica('libretas_solicitudes_total', 'counter', 'Solicitudes atendidas por vista y código de estado.', [
+            ('', {'vista': vista, 'estado': estado}, cantidad)
+            for vista, estadisticas in vistas
+            for estado, cantidad in sorted(estadisticas.por_estado.items())
+        ])
+        muestras = []
+        for vista, estadisticas in vistas:
+            for limite, cantidad in zip(LIMITES_LATENCIA, estadisticas.latencia):
+                muestras.append(('_bucket', {'vista': vista, 'le': limite}, cantidad))
+            total = sum(estadisticas.por_estado.values())
+            muestras.append(('_bucket', {'vista': vista, 'le': '+Inf'}, total))
+            muestras.append(('_sum', {'vista': vista}, estadisticas.segundos))
+            muestras.append(('_count', {'vista': vista}, total))
+        metrica('libretas_solicitud_segundos', 'histogram', 'Duración de la solicitud por vista.', muestras)
+        metrica('libretas_consultas_sql_total', 'counter', 'Consultas SQL ejecutadas por vista.', [
+            ('', {'vista': vista}, estadisticas.consultas) for vista, estadisticas in vistas
+        ])
+        metrica('libretas_consultas_sql_maximo', 'gauge', 'Máximo de consultas SQL en una solicitud de la vista.', [
+            ('', {'vista': vista}, estadisticas.maximo_consultas) for vista, estadisticas in vistas
+        ])
+        metrica('libretas_sql_segundos_total', 'counter', 'Tiempo total en consultas SQL por vista.', [
+            ('', {'vista': vista}, estadisticas.sql_segundos) for vista, estadisticas in vistas
+        ])
+        metrica('libretas_render_segundos_total', 'counter',
+                'Tiempo total renderizando plantillas por vista (incluye el SQL que se ejecuta desde la plantilla).', [
+            ('', {'vista': vista}, estadisticas.render_segundos) for vista, estadisticas in vistas
+        ])
+        metrica('libretas_solicitudes_lentas_total', 'counter', 'Solicitudes sobre METRICAS_UMBRAL_LENTO_MS por vista.', [
+            ('', {'vista': vista}, estadisticas.lentas) for vista, estadisticas in vistas
+        ])
+        metrica('libretas_n_mas_1_total', 'counter',
+                'Solicitudes en que una misma consulta se repitió al menos METRICAS_N_MAS_1_MINIMO veces.', [
+            ('', {'vista': vista, 'consulta': sql}, cantidad) for (vista, sql), cantidad in n_mas_1
+        ])
+        return '\n'.join(lineas) + '\n'
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    pares = []
+    for clave, valor in etiquetas.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{clave}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    return repr(round(valor, 6)) if isinstance(valor, float) else str(valor)
+
+
+registro = RegistroMetricas()
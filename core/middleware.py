@@ -0,0 +1,80 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .metricas import Medicion, registro, umbral_lento_ms
+from .presupuestos import presupuesto
+
+logger = logging.getLogger(__name__)
+
+
+def nombre_vista(request):
+    coincidencia = getattr(request, 'resolver_match', None)
+    return coincidencia.view_name if coincidencia else 'sin_ruta'
+
+
+class MedicionVistasMiddleware:
+    """
+    Mide cada solicitud: consultas y tiempo de SQL (execute_wrapper sobre
+    todas las conexiones), tiempo de render (backend de plantillas
+    core.plantillas) y consultas repetidas. Acumula por vista en
+    core.metricas.registro y deja en el log las que superan
+    METRICAS_UMBRAL_LENTO_MS. Con DEBUG agrega la cabecera X-Consultas-SQL
+    (consultas/presupuesto de core.presupuestos) y avisa en el log cuando
+    la vista se pasa de su presupuesto. Va primero en MIDDLEWARE para incluir
+    sesión y autenticación; el contenido de las respuestas streaming se
+    genera después y no se mide.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion = Medicion()
+        request._medicion = medicion
+        with ExitStack() as envolturas:
+            for conexion in connections.all():
+                envolturas.enter_context(conexion.execute_wrapper(medicion.envoltura_sql))
+            response = self.get_response(request)
+        segundos = time.perf_counter() - medicion.inicio
+
+        vista = nombre_vista(request)
+        repetidas = medicion.repetidas()
+        registro.registrar(vista, response.status_code, medicion, segundos, repetidas)
+        if segundos * 1000 >= umbral_lento_ms():
+            logger.warning(
+                'Solicitud lenta: %s %s vista=%s estado=%s %.0f ms, %d consultas (%.0f ms SQL), render %.0f ms%s',
+                request.method,
+                request.path,
+                vista,
+                response.status_code,
+                segundos * 1000,
+                medicion.consultas,
+                medicion.sql_segundos * 1000,
+                medicion.render_segundos * 1000,
+                ''.join(f'; repetida {veces}x: {sql}' for sql, veces in repetidas[:3]),
+            )
+        if settings.DEBUG:
+            self.informar_presupuesto(request, response, vista, medicion)
+        return response
+
+    def informar_presupuesto(self, request, response, vista, medicion):
+        # Los presupuestos son de un GET: un POST de la misma vista hace otro trabajo
+        limite = presupuesto(vista) if request.method == 'GET' else None
+        if limite is None:
+            response['X-Consultas-SQL'] = str(medicion.consultas)
+            return
+        response['X-Consultas-SQL'] = f'{medicion.consultas}/{limite}'
+        if medicion.consultas > limite:
+            logger.warning(
+                'Presupuesto de consultas excedido: %s %s vista=%s %d consultas (presupuesto %d)%s',
+                request.method,
+                request.path,
+                vista,
+                medicion.consultas,
+                limite,
+                ''.join(f'; repetida {veces}x: {sql}' for sql, veces in medicion.repetidas(2)[:3]),
+            )
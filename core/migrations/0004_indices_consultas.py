@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_perfil_conductor_relacionado_and_more'),
+        ('core', '0003_alter_entrega_numero_registro'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conductor',
+            index=models.Index(fields=['base', 'nombre'], name='conductor_base_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['base', 'estado', '-fecha_entrega'], name='entrega_base_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['base', '-fecha_entrega', '-numero_registro'], name='entrega_base_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['periodo', 'base', 'fase'], name='entrega_periodo_base_fase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['base', '-fecha_entrega'], name='entrega_pendientes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supervisor',
+            index=models.Index(fields=['base', 'nombre'], name='supervisor_base_nombre_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+def inicializar_contador(apps, schema_editor):
+    Entrega = apps.get_model('core', 'Entrega')
+    ContadorRegistro = apps.get_model('core', 'ContadorRegistro')
+    ultimo = Entrega.objects.aggregate(max_num=models.Max('numero_registro'))['max_num'] or 0
+    ContadorRegistro.objects.update_or_create(nombre='entregas', defaults={'valor': ultimo})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorRegistro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('valor', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(inicializar_contador, migrations.RunPython.noop),
+    ]
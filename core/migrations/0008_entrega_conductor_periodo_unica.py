@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:32
+
+from django.db import migrations, models
+
+
+def verificar_duplicados(apps, schema_editor):
+    """
+    No se borra nada automáticamente: si hay entregas repetidas para el mismo
+    conductor y periodo se aborta indicando cuáles resolver a mano.
+    """
+    Entrega = apps.get_model('core', 'Entrega')
+    duplicados = list(
+        Entrega.objects.values('conductor_id', 'periodo_id')
+        .annotate(cantidad=models.Count('id'))
+        .filter(cantidad__gt=1)
+        .order_by('conductor_id', 'periodo_id')[:20]
+    )
+    if duplicados:
+        detalle = ', '.join(
+            f"conductor {d['conductor_id']} / periodo {d['periodo_id']} ({d['cantidad']})" for d in duplicados
+        )
+        raise RuntimeError(
+            'Hay entregas duplicadas por conductor y periodo; elimine o reasigne las '
+            f'sobrantes antes de migrar. Primeros casos: {detalle}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_trabajos_importacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajoimportacion',
+            name='tipo',
+            field=models.CharField(choices=[('conductores', 'Conductores'), ('entregas', 'Entregas')], max_length=20),
+        ),
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='entrega',
+            constraint=models.UniqueConstraint(fields=('conductor', 'periodo'), name='entrega_conductor_periodo_uniq', violation_error_message='Ya existe una entrega para este conductor en este periodo.'),
+        ),
+    ]
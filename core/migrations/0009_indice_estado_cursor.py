@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_entrega_conductor_periodo_unica'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='entrega',
+            name='entrega_base_estado_fecha_idx',
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['base', 'estado', '-fecha_entrega', '-numero_registro'], name='entrega_base_estado_fecha_idx'),
+        ),
+    ]
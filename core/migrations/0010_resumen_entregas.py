@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_resumen(apps, schema_editor):
+    """Carga inicial del resumen; después se mantiene de forma incremental."""
+    Entrega = apps.get_model('core', 'Entrega')
+    ResumenEntregas = apps.get_model('core', 'ResumenEntregas')
+    grupos = (
+        Entrega.objects.order_by()
+        .values('base', 'periodo_id', 'estado', 'fase')
+        .annotate(total=models.Count('id'))
+    )
+    ResumenEntregas.objects.bulk_create([ResumenEntregas(**grupo) for grupo in grupos], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_indice_estado_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEntregas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base', models.CharField(max_length=50)),
+                ('estado', models.CharField(max_length=20)),
+                ('fase', models.CharField(max_length=20)),
+                ('total', models.BigIntegerField(default=0)),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.periodo')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('base', 'periodo', 'estado', 'fase'), name='resumen_entregas_clave_uniq')],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
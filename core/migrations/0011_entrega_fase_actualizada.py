@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_resumen_entregas'),
+    ]
+
+    # Se agrega sin default para que las entregas existentes queden en nulo
+    # (fecha desconocida) y no con la fecha de la migración
+    operations = [
+        migrations.AddField(
+            model_name='entrega',
+            name='fase_actualizada',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='entrega',
+            name='fase_actualizada',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,145 @@
+import accounts.bases
+import accounts.campos
+from django.db import migrations, models
+
+
+# Copia congelada de Entrega.ESTADO_CODIGOS / FASE_CODIGOS
+ESTADO_CODIGOS = {'pendiente': 1, 'en_curso': 2, 'entregada': 3, 'sin_entregar': 4}
+FASE_CODIGOS = {'no_entregada': 1, 'en_firma': 2, 'entregada': 3, 'desvinculado': 4, 'licencia': 5}
+
+# (modelo, campo) que pasan de texto a smallint
+CAMPOS_BASE = [('supervisor', 'base'), ('conductor', 'base'), ('entrega', 'base'), ('resumenentregas', 'base')]
+CAMPOS_CODIFICADOS = [
+    ('entrega', 'estado', ESTADO_CODIGOS),
+    ('entrega', 'fase', FASE_CODIGOS),
+    ('resumenentregas', 'estado', ESTADO_CODIGOS),
+    ('resumenentregas', 'fase', FASE_CODIGOS),
+]
+
+
+def copiar_codigos(apps, schema_editor):
+    Base = apps.get_model('accounts', 'Base')
+    ids = dict(Base.objects.values_list('codigo', 'pk'))
+    for modelo, campo in CAMPOS_BASE:
+        Modelo = apps.get_model('core', modelo)
+        # Valores guardados que no son bases conocidas: se agregan como bases
+        for valor in sorted(set(Modelo.objects.values_list(campo, flat=True).distinct()) - set(ids)):
+            ids[valor] = Base.objects.create(codigo=valor, nombre=valor).pk
+        for codigo, pk in ids.items():
+            Modelo.objects.filter(**{campo: codigo}).update(**{f'{campo}_codigo': pk})
+
+    for modelo, campo, codigos in CAMPOS_CODIFICADOS:
+        Modelo = apps.get_model('core', modelo)
+        desconocidos = set(Modelo.objects.values_list(campo, flat=True).distinct()) - set(codigos)
+        if desconocidos:
+            raise ValueError(f'{modelo}.{campo} tiene valores sin código: {sorted(desconocidos)}')
+        for clave, numero in codigos.items():
+            Modelo.objects.filter(**{campo: clave}).update(**{f'{campo}_codigo': numero})
+
+
+def restaurar_textos(apps, schema_editor):
+    Base = apps.get_model('accounts', 'Base')
+    for modelo, campo in CAMPOS_BASE:
+        Modelo = apps.get_model('core', modelo)
+        for pk, codigo in Base.objects.values_list('pk', 'codigo'):
+            Modelo.objects.filter(**{f'{campo}_codigo': pk}).update(**{campo: codigo})
+    for modelo, campo, codigos in CAMPOS_CODIFICADOS:
+        Modelo = apps.get_model('core', modelo)
+        for clave, numero in codigos.items():
+            Modelo.objects.filter(**{f'{campo}_codigo': numero}).update(**{campo: clave})
+
+
+def reemplazar(modelo, campo, definitivo):
+    """El campo temporal `<campo>_codigo` toma el nombre y la definición del original."""
+    return [
+        migrations.RemoveField(model_name=modelo, name=campo),
+        migrations.RenameField(model_name=modelo, old_name=f'{campo}_codigo', new_name=campo),
+        migrations.AlterField(model_name=modelo, name=campo, field=definitivo),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_base'),
+        ('core', '0011_entrega_fase_actualizada'),
+    ]
+
+    # base, estado y fase pasan de varchar a smallint (id de accounts.Base y
+    # códigos fijos). Los índices que los usan se quitan antes y se vuelven
+    # a crear sobre las columnas nuevas.
+    operations = [
+        migrations.RemoveIndex(model_name='supervisor', name='supervisor_base_nombre_idx'),
+        migrations.RemoveIndex(model_name='conductor', name='conductor_base_nombre_idx'),
+        migrations.RemoveIndex(model_name='entrega', name='entrega_base_estado_fecha_idx'),
+        migrations.RemoveIndex(model_name='entrega', name='entrega_base_fecha_idx'),
+        migrations.RemoveIndex(model_name='entrega', name='entrega_periodo_base_fase_idx'),
+        migrations.RemoveIndex(model_name='entrega', name='entrega_pendientes_idx'),
+        migrations.RemoveConstraint(model_name='resumenentregas', name='resumen_entregas_clave_uniq'),
+
+        *[
+            migrations.AddField(model_name=modelo, name=f'{campo}_codigo', field=accounts.campos.CampoBase(null=True))
+            for modelo, campo in CAMPOS_BASE
+        ],
+        *[
+            migrations.AddField(
+                model_name=modelo, name=f'{campo}_codigo',
+                field=accounts.campos.CampoCodificado(codigos=codigos, null=True),
+            )
+            for modelo, campo, codigos in CAMPOS_CODIFICADOS
+        ],
+        # Nulas durante la copia para que la migración se pueda revertir
+        *[
+            migrations.AlterField(model_name=modelo, name=campo, field=models.CharField(max_length=50, null=True))
+            for modelo, campo in CAMPOS_BASE
+        ],
+        *[
+            migrations.AlterField(model_name=modelo, name=campo, field=models.CharField(max_length=20, null=True))
+            for modelo, campo, _ in CAMPOS_CODIFICADOS
+        ],
+        migrations.RunPython(copiar_codigos, restaurar_textos),
+
+        *reemplazar('supervisor', 'base', accounts.campos.CampoBase(choices=accounts.bases.opciones_base)),
+        *reemplazar('conductor', 'base', accounts.campos.CampoBase(choices=accounts.bases.opciones_base)),
+        *reemplazar('entrega', 'base', accounts.campos.CampoBase(choices=accounts.bases.opciones_base)),
+        *reemplazar('entrega', 'estado', accounts.campos.CampoCodificado(
+            choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('entregada', 'Entregada'), ('sin_entregar', 'Sin entregar')],
+            codigos=ESTADO_CODIGOS,
+        )),
+        *reemplazar('entrega', 'fase', accounts.campos.CampoCodificado(
+            choices=[('no_entregada', 'No entregada por el conductor'), ('en_firma', 'En firma del supervisor'), ('entregada', 'Entregada'), ('desvinculado', 'Desvinculado'), ('licencia', 'Licencia médica')],
+            codigos=FASE_CODIGOS,
+        )),
+        *reemplazar('resumenentregas', 'base', accounts.campos.CampoBase()),
+        *reemplazar('resumenentregas', 'estado', accounts.campos.CampoCodificado(codigos=ESTADO_CODIGOS)),
+        *reemplazar('resumenentregas', 'fase', accounts.campos.CampoCodificado(codigos=FASE_CODIGOS)),
+
+        migrations.AddIndex(
+            model_name='supervisor',
+            index=models.Index(fields=['base', 'nombre'], name='supervisor_base_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conductor',
+            index=models.Index(fields=['base', 'nombre'], name='conductor_base_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['base', 'estado', '-fecha_entrega', '-numero_registro'], name='entrega_base_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['base', '-fecha_entrega', '-numero_registro'], name='entrega_base_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['periodo', 'base', 'fase'], name='entrega_periodo_base_fase_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['base', '-fecha_entrega'], name='entrega_pendientes_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='resumenentregas',
+            constraint=models.UniqueConstraint(fields=('base', 'periodo', 'estado', 'fase'), name='resumen_entregas_clave_uniq'),
+        ),
+    ]
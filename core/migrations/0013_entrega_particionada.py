@@ -0,0 +1,179 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:18
+
+import accounts.bases
+import accounts.campos
+import django.db.models.deletion
+from django.core.management.color import no_style
+from django.db import migrations, models
+from django.db.migrations.exceptions import IrreversibleError
+
+
+TABLA = 'core_entrega'
+TABLA_ARCHIVO = 'core_entrega_archivo'
+
+
+def particionar(apps, schema_editor):
+    """
+    core_entrega pasa a estar particionada por LIST (periodo_id): una
+    partición por periodo y una por defecto. Una tabla no se puede
+    convertir en particionada, así que se crea otra, se copian las filas y
+    se renombra; índices, únicas y FK se vuelven a crear con sus nombres.
+    La clave primaria y las únicas incluyen periodo_id (lo exige
+    PostgreSQL); la 0016 repone la unicidad de numero_registro con un
+    disparador. core_entrega_archivo también queda particionada, para
+    recibir las particiones de los periodos archivados.
+    """
+    conexion = schema_editor.connection
+    if conexion.vendor != 'postgresql':
+        return
+    Periodo = apps.get_model('core', 'Periodo')
+    q = schema_editor.quote_name
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+              AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s))
+            """,
+            [TABLA, TABLA],
+        )
+        indices = [definicion for (definicion,) in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [TABLA],
+        )
+        foraneas = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT c.conname, ARRAY(
+                SELECT a.attname
+                FROM unnest(c.conkey) WITH ORDINALITY AS k(numero, orden)
+                JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.numero
+                ORDER BY k.orden
+            )
+            FROM pg_constraint c
+            WHERE c.conrelid = to_regclass(%s) AND c.contype = 'u'
+            """,
+            [TABLA],
+        )
+        unicas = cursor.fetchall()
+
+        nueva = f'{TABLA}_particionada'
+        cursor.execute(
+            f'CREATE TABLE {q(nueva)} (LIKE {q(TABLA)} INCLUDING CONSTRAINTS) PARTITION BY LIST (periodo_id)'
+        )
+        for periodo_id in Periodo.objects.order_by('pk').values_list('pk', flat=True):
+            cursor.execute(
+                f'CREATE TABLE {q(f"{TABLA}_p{periodo_id}")} PARTITION OF {q(nueva)} FOR VALUES IN ({int(periodo_id)})'
+            )
+        cursor.execute(f'CREATE TABLE {q(f"{TABLA}_defecto")} PARTITION OF {q(nueva)} DEFAULT')
+        cursor.execute(f'INSERT INTO {q(nueva)} SELECT * FROM {q(TABLA)}')
+        cursor.execute(f'DROP TABLE {q(TABLA)}')
+        cursor.execute(f'ALTER TABLE {q(nueva)} RENAME TO {q(TABLA)}')
+
+        # Columnas IDENTITY en tablas particionadas recién desde PostgreSQL 17
+        secuencia = f'{TABLA}_id_seq'
+        cursor.execute(f'CREATE SEQUENCE {q(secuencia)} OWNED BY {q(TABLA)}.id')
+        cursor.execute(f"ALTER TABLE {q(TABLA)} ALTER COLUMN id SET DEFAULT nextval('{secuencia}')")
+        cursor.execute(
+            f'SELECT setval(%s, COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {q(TABLA)}', [secuencia]
+        )
+        cursor.execute(f'ALTER TABLE {q(TABLA)} ADD CONSTRAINT {q(f"{TABLA}_pkey")} PRIMARY KEY (id, periodo_id)')
+        for nombre, columnas in unicas:
+            if 'periodo_id' not in columnas:
+                columnas = [*columnas, 'periodo_id']
+            cursor.execute(
+                f'ALTER TABLE {q(TABLA)} ADD CONSTRAINT {q(nombre)} UNIQUE ({", ".join(map(q, columnas))})'
+            )
+        for nombre, definicion in foraneas:
+            cursor.execute(f'ALTER TABLE {q(TABLA)} ADD CONSTRAINT {q(nombre)} {definicion}')
+        for definicion in indices:
+            cursor.execute(definicion)
+
+        cursor.execute(f'DROP TABLE {q(TABLA_ARCHIVO)}')
+        cursor.execute(
+            f'CREATE TABLE {q(TABLA_ARCHIVO)} (LIKE {q(TABLA)} INCLUDING CONSTRAINTS) PARTITION BY LIST (periodo_id)'
+        )
+        cursor.execute(
+            f'ALTER TABLE {q(TABLA_ARCHIVO)} ADD CONSTRAINT {q(f"{TABLA_ARCHIVO}_pkey")} PRIMARY KEY (id, periodo_id)'
+        )
+
+
+def despartir(apps, schema_editor):
+    """
+    Vuelve a una sola tabla: las entregas vigentes y las archivadas se
+    copian a una tabla auxiliar, se borra la particionada (con sus
+    particiones y su secuencia) y core_entrega se crea como estaba antes de
+    esta migración, con sus índices, únicas y FK. Las archivadas vuelven a
+    ser vigentes. Si alguna archivada apunta a un conductor, supervisor o
+    periodo que ya no existe (el archivo no tiene FK) falla sin tocar nada.
+    """
+    conexion = schema_editor.connection
+    if conexion.vendor != 'postgresql':
+        return
+    Entrega = apps.get_model('core', 'Entrega')
+    q = schema_editor.quote_name
+    columnas = ', '.join(q(campo.column) for campo in Entrega._meta.concrete_fields)
+    auxiliar = f'{TABLA}_despartida'
+    with conexion.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLA])
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            f"""
+            SELECT COUNT(*) FROM {q(TABLA_ARCHIVO)} a
+            WHERE NOT EXISTS (SELECT 1 FROM core_conductor c WHERE c.id = a.conductor_id)
+               OR NOT EXISTS (SELECT 1 FROM core_periodo p WHERE p.id = a.periodo_id)
+               OR (a.supervisor_id IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM core_supervisor s WHERE s.id = a.supervisor_id))
+            """
+        )
+        huerfanas = cursor.fetchone()[0]
+        if huerfanas:
+            raise IrreversibleError(
+                f'{huerfanas} entregas archivadas apuntan a conductores, supervisores o periodos '
+                f'borrados: no caben en core_entrega sin particionar'
+            )
+
+        cursor.execute(
+            f'CREATE TABLE {q(auxiliar)} AS '
+            f'SELECT {columnas} FROM {q(TABLA)} UNION ALL SELECT {columnas} FROM {q(TABLA_ARCHIVO)}'
+        )
+        # CASCADE: las particiones archivadas aún pueden tener la secuencia como default de id
+        cursor.execute(f'DROP TABLE {q(TABLA)} CASCADE')
+        schema_editor.create_model(Entrega)
+        cursor.execute(f'INSERT INTO {q(TABLA)} ({columnas}) SELECT {columnas} FROM {q(auxiliar)}')
+        cursor.execute(f'DROP TABLE {q(auxiliar)}')
+        for sql in conexion.ops.sequence_reset_sql(no_style(), [Entrega]):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_codigos_base_estado_fase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntregaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('numero_registro', models.PositiveIntegerField()),
+                ('estado', accounts.campos.CampoCodificado(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('entregada', 'Entregada'), ('sin_entregar', 'Sin entregar')], codigos={'en_curso': 2, 'entregada': 3, 'pendiente': 1, 'sin_entregar': 4})),
+                ('fase', accounts.campos.CampoCodificado(choices=[('no_entregada', 'No entregada por el conductor'), ('en_firma', 'En firma del supervisor'), ('entregada', 'Entregada'), ('desvinculado', 'Desvinculado'), ('licencia', 'Licencia médica')], codigos={'desvinculado': 4, 'en_firma': 2, 'entregada': 3, 'licencia': 5, 'no_entregada': 1})),
+                ('fecha_entrega', models.DateField(blank=True, null=True)),
+                ('notas', models.TextField(blank=True, null=True)),
+                ('base', accounts.campos.CampoBase(choices=accounts.bases.opciones_base)),
+                ('fase_actualizada', models.DateTimeField(blank=True, null=True)),
+                ('conductor', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.conductor')),
+                ('periodo', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.periodo')),
+                ('supervisor', models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.supervisor')),
+            ],
+            options={
+                'db_table': 'core_entrega_archivo',
+            },
+        ),
+        migrations.RunPython(particionar, despartir),
+    ]
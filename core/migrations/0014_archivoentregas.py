@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_entrega_particionada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoEntregas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.CharField(max_length=255)),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('periodo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archivo_entregas', to='core.periodo')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:37
+
+from django.db import migrations, models
+
+
+def iniciar_en_proceso(apps, schema_editor):
+    # Los que ya estaban en 'procesando' no tienen inicio: se toma su creación
+    for nombre in ['TrabajoExportacion', 'TrabajoImportacion']:
+        modelo = apps.get_model('core', nombre)
+        modelo.objects.filter(estado='procesando').update(iniciado=models.F('creado'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_archivoentregas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoexportacion',
+            name='iniciado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='iniciado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(iniciar_en_proceso, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations
+
+
+FUNCION = 'core_entrega_numero_registro_unico'
+DISPARADORES = ['core_entrega_numero_registro_insert', 'core_entrega_numero_registro_update']
+
+
+def particionada(cursor):
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('core_entrega')")
+    return cursor.fetchone() is not None
+
+
+def crear_disparadores(apps, schema_editor):
+    """
+    Con core_entrega particionada, la única de numero_registro incluye
+    periodo_id (PostgreSQL no admite únicas que no contengan la clave de
+    partición), así que el mismo número podría repetirse en dos periodos.
+    Estos disparadores la reponen para las entregas vigentes: antes de
+    insertar, o de cambiar el número, buscan el número en todas las
+    particiones (con el índice de la única) y fallan con unique_violation.
+    El bloqueo consultivo serializa las escrituras que comprueban, para
+    que dos transacciones no inserten el mismo número a la vez; las
+    inserciones ya se serializan en el contador (ContadorRegistro), así
+    que no agrega esperas. Las particiones archivadas (DETACH) pierden los
+    disparadores: el archivo no recibe escrituras.
+    """
+    conexion = schema_editor.connection
+    if conexion.vendor != 'postgresql':
+        return
+    with conexion.cursor() as cursor:
+        if not particionada(cursor):
+            return
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {FUNCION}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                PERFORM pg_advisory_xact_lock(hashtext('core_entrega.numero_registro'));
+                IF EXISTS (
+                    SELECT 1 FROM core_entrega
+                    WHERE numero_registro = NEW.numero_registro AND id <> NEW.id
+                ) THEN
+                    RAISE EXCEPTION 'Ya existe una entrega con numero_registro %', NEW.numero_registro
+                        USING ERRCODE = 'unique_violation', TABLE = 'core_entrega';
+                END IF;
+                RETURN NEW;
+            END
+            $$
+        """)
+        cursor.execute(
+            f'CREATE TRIGGER {DISPARADORES[0]} BEFORE INSERT ON core_entrega '
+            f'FOR EACH ROW EXECUTE FUNCTION {FUNCION}()'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER {DISPARADORES[1]} BEFORE UPDATE OF numero_registro ON core_entrega '
+            f'FOR EACH ROW WHEN (OLD.numero_registro IS DISTINCT FROM NEW.numero_registro) '
+            f'EXECUTE FUNCTION {FUNCION}()'
+        )
+
+
+def eliminar_disparadores(apps, schema_editor):
+    conexion = schema_editor.connection
+    if conexion.vendor != 'postgresql':
+        return
+    with conexion.cursor() as cursor:
+        for disparador in DISPARADORES:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {disparador} ON core_entrega')
+        cursor.execute(f'DROP FUNCTION IF EXISTS {FUNCION}()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_trabajo_iniciado'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_disparadores, eliminar_disparadores),
+    ]
@@ -1,32 +1,58 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
 # Asegúrate de que esta importación sea correcta según la ubicación real de tu modelo Perfil
 from accounts.models import Perfil 
-# Aunque no está definido aquí, asumimos que BASE_CHOICES existe en Perfil
+from accounts.bases import opciones_base
+from accounts.campos import CampoBase, CampoCodificado
+
+class BaseOriginalMixin:
+    """
+    Recuerda la base con la que se leyó la fila. Si un guardado la cambia,
+    hay que invalidar también la versión de datos de la base anterior.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._base_original = instancia.__dict__.get('base')
+        return instancia
+
+    @property
+    def bases_afectadas(self):
+        return {self.base, getattr(self, '_base_original', None)} - {None}
+
 
 # --- MODELO SUPERVISOR ---
-class Supervisor(models.Model):
+class Supervisor(BaseOriginalMixin, models.Model):
     nombre = models.CharField(max_length=100)
-    # Usa CharField con choices, es correcto según tu estructura
-    base = models.CharField(max_length=50, choices=Perfil.BASE_CHOICES) 
+    base = CampoBase(choices=opciones_base)
+
+    class Meta:
+        indexes = [
+            # Listados y desplegables filtrados por base y ordenados por nombre
+            models.Index(fields=['base', 'nombre'], name='supervisor_base_nombre_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.base})"
 
 # --- MODELO CONDUCTOR ---
-class Conductor(models.Model):
+class Conductor(BaseOriginalMixin, models.Model):
     nombre = models.CharField(max_length=150)
-    # Usa CharField con choices
-    base = models.CharField(max_length=50, choices=Perfil.BASE_CHOICES)
+    base = CampoBase(choices=opciones_base)
     # Relación uno a uno con Perfil (la mantienes)
     perfil = models.OneToOneField(Perfil, on_delete=models.SET_NULL, null=True, blank=True) 
 
+    class Meta:
+        indexes = [
+            # Listados y desplegables filtrados por base y ordenados por nombre
+            models.Index(fields=['base', 'nombre'], name='conductor_base_nombre_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nombre} ({self.base})"
-    
-    def get_base_display(self):
-        """Método para obtener el nombre legible de la base"""
-        return dict(Perfil.BASE_CHOICES).get(self.base, self.base)      
 
 # --- MODELO PERIODO ---
 class Periodo(models.Model):
@@ -40,13 +66,13 @@ class Periodo(models.Model):
     año = models.PositiveIntegerField()
     # Nota: El Periodo típicamente no necesita el campo 'base' si es global.
     # Si quieres filtrarlo por base, deberías añadir:
-    # base = models.CharField(max_length=50, choices=Perfil.BASE_CHOICES, blank=True, null=True) 
+    # base = CampoBase(choices=opciones_base, blank=True, null=True)
 
     def __str__(self):
         return f"{self.get_trimestre_display()} {self.año}"
 
 # --- MODELO ENTREGA ---
-class Entrega(models.Model):
+class Entrega(BaseOriginalMixin, models.Model):
     ESTADO_CHOICES = [
         ('pendiente', 'Pendiente'),
         ('en_curso', 'En curso'),
@@ -62,29 +88,312 @@ class Entrega(models.Model):
         ('licencia', 'Licencia médica'),
     ]
 
-    # Mantienes BASE_CHOICES aquí, pero lo ideal es unificarlo con Perfil.BASE_CHOICES
-    BASE_CHOICES = [ 
-        ('calle_larga', 'Spot Calle Larga'),
-        ('lampa', 'Spot Lampa'),
-    ]
+    # Número guardado en la BD por cada clave: no se cambian ni se reutilizan
+    ESTADO_CODIGOS = {'pendiente': 1, 'en_curso': 2, 'entregada': 3, 'sin_entregar': 4}
+    FASE_CODIGOS = {'no_entregada': 1, 'en_firma': 2, 'entregada': 3, 'desvinculado': 4, 'licencia': 5}
+
+    # Más recientes primero, en el orden exacto de los índices (base, [estado,]
+    # -fecha_entrega, -numero_registro). Un índice DESC deja los nulos primero en
+    # PostgreSQL: se pide NULLS FIRST explícito para que SQLite ordene igual y
+    # nunca NULLS LAST, que no podría recorrer esos índices.
+    ORDEN_RECIENTES = [F('fecha_entrega').desc(nulls_first=True), F('numero_registro').desc()]
 
     numero_registro = models.PositiveIntegerField(unique=True, editable=False, blank=True)
     conductor = models.ForeignKey(Conductor, on_delete=models.CASCADE)
     supervisor = models.ForeignKey(Supervisor, on_delete=models.SET_NULL, null=True)
-    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES)
-    fase = models.CharField(max_length=20, choices=FASE_CHOICES)
+    estado = CampoCodificado(choices=ESTADO_CHOICES, codigos=ESTADO_CODIGOS)
+    fase = CampoCodificado(choices=FASE_CHOICES, codigos=FASE_CODIGOS)
     fecha_entrega = models.DateField(blank=True, null=True)
     notas = models.TextField(blank=True, null=True)
     periodo = models.ForeignKey(Periodo, on_delete=models.CASCADE)
-    # Usas CharField con choices, es correcto para tu lógica de filtrado por base
-    base = models.CharField(max_length=50, choices=BASE_CHOICES) 
+    base = CampoBase(choices=opciones_base)
+    # Cuándo pasó la entrega a su fase actual (nulo en las anteriores a este campo)
+    fase_actualizada = models.DateTimeField(default=timezone.now, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Dashboard/API: base + estado, ordenado por fecha; con numero_registro el
+            # orden es total y la paginación por cursor no necesita ordenar en memoria
+            models.Index(
+                fields=['base', 'estado', '-fecha_entrega', '-numero_registro'],
+                name='entrega_base_estado_fecha_idx',
+            ),
+            # Dashboard sin filtros (ORDEN_RECIENTES) y paginación por cursor
+            models.Index(fields=['base', '-fecha_entrega', '-numero_registro'], name='entrega_base_fecha_idx'),
+            # Resúmenes por periodo y filtros de admin/exportación por fase
+            models.Index(fields=['periodo', 'base', 'fase'], name='entrega_periodo_base_fase_idx'),
+            # Índice parcial para el filtro más frecuente: las pendientes
+            models.Index(
+                fields=['base', '-fecha_entrega'],
+                condition=models.Q(estado='pendiente'),
+                name='entrega_pendientes_idx',
+            ),
+        ]
+        constraints = [
+            # Una entrega por conductor y periodo: clave de la carga masiva (upsert)
+            models.UniqueConstraint(
+                fields=['conductor', 'periodo'],
+                name='entrega_conductor_periodo_uniq',
+                violation_error_message='Ya existe una entrega para este conductor en este periodo.',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.numero_registro} - {self.conductor.nombre} ({self.periodo})"
 
+    # Clave de agrupación de ResumenEntregas
+    CAMPOS_RESUMEN = ('base', 'periodo_id', 'estado', 'fase')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._clave_resumen_original = instancia.clave_resumen
+        return instancia
+
+    def sellar_fase(self, ahora=None):
+        """
+        Marca fase_actualizada si la fase cambió respecto de la leída de la BD.
+        Las instancias nuevas ya la traen del default. Devuelve True si marcó.
+        """
+        original = getattr(self, '_clave_resumen_original', None)
+        fase = self.__dict__.get('fase')  # si está diferida, no se modificó
+        if original is None or fase is None or original[3] == fase:
+            return False
+        self.fase_actualizada = ahora or timezone.now()
+        return True
+
+    @property
+    def clave_resumen(self):
+        """(base, periodo_id, estado, fase); None si algún campo no está cargado."""
+        clave = tuple(self.__dict__.get(campo) for campo in self.CAMPOS_RESUMEN)
+        return None if None in clave else clave
+
     def save(self, *args, **kwargs):
         if not self.numero_registro:
-            # Lógica para auto-incrementar el número de registro
-            ultimo = self.__class__.objects.aggregate(max_num=models.Max('numero_registro'))['max_num'] or 0
-            self.numero_registro = ultimo + 1
-        super().save(*args, **kwargs)
\ No newline at end of file
+            # Número correlativo tomado del contador atómico (sin MAX() por inserción)
+            self.numero_registro = ContadorRegistro.reservar(1)[0]
+        super().save(*args, **kwargs)
+
+
+# --- ENTREGAS ARCHIVADAS ---
+class EntregaArchivada(models.Model):
+    """
+    Entregas de periodos archivados (ver core.particiones), solo lectura.
+    Tiene exactamente las columnas de Entrega: en PostgreSQL las
+    particiones pasan tal cual de una tabla a la otra, así que una columna
+    nueva en Entrega también se agrega aquí. Sin FK en la BD: el archivo no
+    impide borrar conductores, supervisores ni periodos.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    numero_registro = models.PositiveIntegerField()
+    conductor = models.ForeignKey(
+        Conductor, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+',
+    )
+    supervisor = models.ForeignKey(
+        Supervisor, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, related_name='+',
+    )
+    estado = CampoCodificado(choices=Entrega.ESTADO_CHOICES, codigos=Entrega.ESTADO_CODIGOS)
+    fase = CampoCodificado(choices=Entrega.FASE_CHOICES, codigos=Entrega.FASE_CODIGOS)
+    fecha_entrega = models.DateField(blank=True, null=True)
+    notas = models.TextField(blank=True, null=True)
+    periodo = models.ForeignKey(
+        Periodo, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+',
+    )
+    base = CampoBase(choices=opciones_base)
+    fase_actualizada = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'core_entrega_archivo'
+
+    def __str__(self):
+        return f"{self.numero_registro} (archivada, periodo {self.periodo_id})"
+
+
+# --- ARCHIVO FRÍO DE ENTREGAS ---
+class ArchivoEntregas(models.Model):
+    """
+    Entregas de un periodo cerrado guardadas en un CSV comprimido (gzip)
+    en MEDIA_ROOT y borradas de la BD (ver core.archivo). Las exportaciones
+    y la analítica las leen del archivo cuando se pide el periodo.
+    """
+    periodo = models.OneToOneField(Periodo, on_delete=models.CASCADE, related_name='archivo_entregas')
+    # Ruta relativa a MEDIA_ROOT
+    archivo = models.CharField(max_length=255)
+    filas = models.PositiveIntegerField(default=0)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archivo de {self.periodo} ({self.filas} entregas)"
+
+
+# --- CONTADOR DE NÚMEROS DE REGISTRO ---
+class ContadorRegistro(models.Model):
+    """
+    Tabla de secuencias: una fila por contador con el último valor entregado.
+    El UPDATE valor = valor + n bloquea la fila hasta el commit, así que dos
+    inserciones concurrentes nunca reciben el mismo número.
+    """
+    ENTREGAS = 'entregas'
+
+    nombre = models.CharField(max_length=50, unique=True)
+    valor = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.valor}"
+
+    @classmethod
+    def reservar(cls, cantidad, nombre=ENTREGAS):
+        """
+        Reserva atómicamente un bloque contiguo de `cantidad` números y lo
+        devuelve como range. Para cargas masivas basta una reserva por lote.
+        """
+        if cantidad < 1:
+            return range(0)
+        with transaction.atomic():
+            actualizados = cls.objects.filter(nombre=nombre).update(valor=models.F('valor') + cantidad)
+            if not actualizados:
+                cls._crear_contador(nombre)
+                cls.objects.filter(nombre=nombre).update(valor=models.F('valor') + cantidad)
+            valor = cls.objects.filter(nombre=nombre).values_list('valor', flat=True).get()
+        return range(valor - cantidad + 1, valor + 1)
+
+    @classmethod
+    def _crear_contador(cls, nombre):
+        """Crea el contador partiendo del máximo existente (solo la primera vez)."""
+        inicial = 0
+        if nombre == cls.ENTREGAS:
+            inicial = Entrega.objects.aggregate(max_num=models.Max('numero_registro'))['max_num'] or 0
+        try:
+            with transaction.atomic():
+                cls.objects.create(nombre=nombre, valor=inicial)
+        except IntegrityError:
+            pass  # Otro proceso lo creó primero
+
+# --- VERSIÓN DE DATOS POR BASE ---
+class VersionDatos(models.Model):
+    """
+    Contador que se incrementa cada vez que cambian los datos de una base
+    (entregas, conductores, supervisores; los periodos, que son globales,
+    incrementan todas).
+    Sirve como clave de caché: un resultado calculado con la versión N sigue
+    siendo válido mientras la versión de la base no cambie.
+    """
+    base = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.base}: v{self.version}"
+
+
+# --- RESUMEN DE ENTREGAS ---
+class ResumenEntregas(models.Model):
+    """
+    Cantidad de entregas por (base, periodo, estado, fase), mantenida de
+    forma incremental (ver core.resumen). Los contadores del dashboard se
+    leen de aquí en proporción al número de grupos, no de entregas.
+    """
+    base = CampoBase()
+    periodo = models.ForeignKey(Periodo, on_delete=models.CASCADE)
+    estado = CampoCodificado(codigos=Entrega.ESTADO_CODIGOS)
+    fase = CampoCodificado(codigos=Entrega.FASE_CODIGOS)
+    total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['base', 'periodo', 'estado', 'fase'],
+                name='resumen_entregas_clave_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.base} {self.periodo_id} {self.estado}/{self.fase}: {self.total}"
+
+
+# --- TRABAJOS DE EXPORTACIÓN EN SEGUNDO PLANO ---
+class TrabajoExportacion(models.Model):
+    FORMATO_CHOICES = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    ]
+
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Vacío cuando el usuario no tiene perfil y exporta todas las bases
+    base = models.CharField(max_length=50, blank=True)
+    formato = models.CharField(max_length=4, choices=FORMATO_CHOICES)
+    filtros = models.JSONField(default=dict, blank=True)
+    # Hash de (base, formato, filtros): junto con la versión forma la clave de caché
+    parametros = models.CharField(max_length=64, db_index=True)
+    version = models.PositiveBigIntegerField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    archivo = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    filas = models.PositiveIntegerField(null=True, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    # Cuando un worker lo tomó: un trabajo 'procesando' demasiado antiguo se da por caído
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'creado'], name='trabajo_estado_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Exportación {self.pk} ({self.formato}, {self.estado})"
+
+    @property
+    def nombre_descarga(self):
+        return f"entregas.{self.formato}"
+
+
+# --- TRABAJOS DE IMPORTACIÓN (CARGA MASIVA) ---
+class TrabajoImportacion(models.Model):
+    TIPO_CHOICES = [
+        ('conductores', 'Conductores'),
+        ('entregas', 'Entregas'),
+    ]
+
+    ESTADO_CHOICES = TrabajoExportacion.ESTADO_CHOICES
+
+    # Errores por fila que se guardan para mostrar; el total se cuenta aparte
+    MAXIMO_ERRORES = 100
+
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    base = models.CharField(max_length=50)
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    archivo = models.CharField(max_length=255)
+    nombre_original = models.CharField(max_length=255, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    total_filas = models.PositiveIntegerField(null=True, blank=True)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    total_errores = models.PositiveIntegerField(default=0)
+    errores = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    # Cuando un worker lo tomó: un trabajo 'procesando' demasiado antiguo se da por caído
+    iniciado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'creado'], name='importacion_estado_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Importación {self.pk} ({self.tipo}, {self.estado})"
+
+    @property
+    def porcentaje(self):
+        if not self.total_filas:
+            return None
+        return min(100, round(self.filas_procesadas * 100 / self.total_filas))
@@ -0,0 +1,259 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+class PaginaKeyset:
+    """
+    Página obtenida por cursor. Expone la misma interfaz básica que una
+    página de Paginator (iteración, has_next, has_previous) más los tokens
+    de cursor para construir los enlaces.
+    """
+
+    es_keyset = True
+
+    def __init__(self, object_list, cursor_siguiente, cursor_anterior):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class PaginadorKeyset:
+    """
+    Paginación por cursor (keyset) sobre un orden estable.
+
+    `orden` es una lista de campos al estilo de order_by ('-fecha_entrega',
+    'numero_registro', ...). El último campo debe ser único para que el
+    orden sea total. Los nulos cuentan como mayores que cualquier valor,
+    igual que en PostgreSQL y en sus índices: van al principio en un campo
+    descendente y al final en uno ascendente, también en SQLite.
+
+    A diferencia de Paginator no ejecuta COUNT ni OFFSET: cada página es
+    un WHERE sobre el cursor + LIMIT, así que la página N cuesta lo mismo
+    que la primera. Si el primer campo admite nulos, sus filas nulas y no
+    nulas se recorren como dos fases (IS NULL ordenado por el resto de
+    campos, y el rango de valores): una condición `< valor OR IS NULL`
+    impediría recorrer el índice como un rango.
+    """
+
+    def __init__(self, queryset, orden, por_pagina):
+        self.queryset = queryset
+        self.campos = [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+        self.modelos = {nombre: self._campo(queryset.model, nombre) for nombre, _ in self.campos}
+        self.nulos = {nombre for nombre, campo in self.modelos.items() if campo is None or campo.null}
+        self.por_pagina = por_pagina
+
+    @staticmethod
+    def _campo(modelo, nombre):
+        try:
+            return modelo._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            return None
+
+    # --- Tokens ---
+    @staticmethod
+    def codificar_cursor(valores, direccion):
+        datos = json.dumps({'v': valores, 'd': direccion}, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+    def decodificar_cursor(self, token):
+        """Devuelve (valores, direccion) o None si el token no es válido."""
+        if not token:
+            return None
+        try:
+            relleno = '=' * (-len(token) % 4)
+            datos = json.loads(base64.urlsafe_b64decode(token + relleno))
+            valores, direccion = datos['v'], datos['d']
+        except (ValueError, KeyError, TypeError, binascii.Error):
+            return None
+        if direccion not in ('sig', 'ant') or not isinstance(valores, list):
+            return None
+        if len(valores) != len(self.campos):
+            return None
+        try:
+            valores = [self._convertir(nombre, valor) for (nombre, _), valor in zip(self.campos, valores)]
+        except (ValidationError, ValueError, TypeError):
+            return None
+        return valores, direccion
+
+    def _convertir(self, nombre, valor):
+        """Valor del cursor con el tipo del campo: un token armado a mano no llega a la consulta."""
+        if valor is None:
+            if nombre not in self.nulos:
+                raise ValueError(f'{nombre} no admite nulos')
+            return None
+        campo = self.modelos[nombre]
+        if campo is None:
+            # Anotación: sin campo que convierta, solo valores simples
+            if not isinstance(valor, (str, int, float)):
+                raise TypeError(f'{nombre}: valor no válido')
+            return valor
+        return campo.to_python(valor)
+
+    def _valores(self, obj):
+        if isinstance(obj, dict):
+            return [obj[nombre] for nombre, _ in self.campos]
+        return [getattr(obj, nombre) for nombre, _ in self.campos]
+
+    # --- Orden y condiciones ---
+    def _orden(self, campos, nulos, invertido=False):
+        expresiones = []
+        for nombre, descendente in campos:
+            if invertido:
+                descendente = not descendente
+            if nombre not in nulos:
+                # Sin nulos: el mismo orden que los índices por defecto
+                expresion = F(nombre).desc() if descendente else F(nombre).asc()
+            else:
+                expresion = F(nombre).desc(nulls_first=True) if descendente else F(nombre).asc(nulls_last=True)
+            expresiones.append(expresion)
+        return expresiones
+
+    @staticmethod
+    def _igual(nombre, valor):
+        if valor is None:
+            return Q(**{f'{nombre}__isnull': True})
+        return Q(**{nombre: valor})
+
+    @staticmethod
+    def _mayores(nombre, valor, nulo):
+        """Valores mayores que `valor` (los nulos son los mayores)."""
+        if valor is None:
+            return None
+        condicion = Q(**{f'{nombre}__gt': valor})
+        return condicion | Q(**{f'{nombre}__isnull': True}) if nulo else condicion
+
+    @staticmethod
+    def _menores(nombre, valor):
+        """Valores menores que `valor`."""
+        if valor is None:
+            return Q(**{f'{nombre}__isnull': False})
+        return Q(**{f'{nombre}__lt': valor})
+
+    def _estricta(self, nombre, descendente, valor, direccion, nulos):
+        """Registros estrictamente posteriores (sig) o anteriores (ant) a `valor` en un campo."""
+        if descendente == (direccion == 'sig'):
+            return self._menores(nombre, valor)
+        return self._mayores(nombre, valor, nombre in nulos)
+
+    def _condicion(self, campos, valores, direccion, nulos):
+        condicion = Q(pk__in=[])
+        prefijo = Q()
+        for (nombre, descendente), valor in zip(campos, valores):
+            estricta = self._estricta(nombre, descendente, valor, direccion, nulos)
+            if estricta is not None:
+                condicion |= prefijo & estricta
+            prefijo &= self._igual(nombre, valor)
+        return condicion
+
+    # --- Consultas ---
+    def _registros(self, valores, direccion, limite):
+        """Hasta `limite` registros desde el cursor en la dirección pedida."""
+        invertido = direccion == 'ant'
+        primero, descendente = self.campos[0]
+        if primero not in self.nulos or len(self.campos) == 1:
+            queryset = self.queryset
+            if valores is not None:
+                queryset = queryset.filter(self._condicion(self.campos, valores, direccion, self.nulos))
+            return list(queryset.order_by(*self._orden(self.campos, self.nulos, invertido))[:limite])
+
+        # Fases del primer campo en el sentido de avance: los nulos son los mayores
+        fases = [True, False] if descendente else [False, True]
+        if invertido:
+            fases.reverse()
+        if valores is not None:
+            fases = fases[fases.index(valores[0] is None):]
+
+        registros = []
+        for nula in fases:
+            queryset = self.queryset.filter(**{f'{primero}__isnull': nula})
+            # En la fase nula el primer campo es constante: ordena el resto
+            campos = self.campos[1:] if nula else self.campos
+            nulos = self.nulos - {primero}
+            if valores is not None and nula == (valores[0] is None):
+                desde = valores[1:] if nula else valores
+                queryset = queryset.filter(self._condicion(campos, desde, direccion, nulos))
+            registros += queryset.order_by(*self._orden(campos, nulos, invertido))[:limite - len(registros)]
+            if len(registros) >= limite:
+                break
+        return registros
+
+    # --- Página ---
+    def get_page(self, token=None):
+        cursor = self.decodificar_cursor(token)
+        if cursor is None:
+            valores, direccion = None, 'sig'
+        else:
+            valores, direccion = cursor
+
+        # Se pide un registro extra para saber si hay más páginas
+        registros = self._registros(valores, direccion, self.por_pagina + 1)
+        hay_mas = len(registros) > self.por_pagina
+        registros = registros[:self.por_pagina]
+
+        if direccion == 'ant':
+            registros.reverse()
+            hay_siguiente, hay_anterior = True, hay_mas
+        else:
+            hay_siguiente, hay_anterior = hay_mas, valores is not None
+
+        cursor_siguiente = cursor_anterior = None
+        if registros and hay_siguiente:
+            cursor_siguiente = self.codificar_cursor(self._valores(registros[-1]), 'sig')
+        if registros and hay_anterior:
+            cursor_anterior = self.codificar_cursor(self._valores(registros[0]), 'ant')
+
+        return PaginaKeyset(registros, cursor_siguiente, cursor_anterior)
+
+
+def usa_keyset(request):
+    """La paginación por cursor es opcional: se activa con ?paginacion=cursor."""
+    return request.GET.get('paginacion') == 'cursor' or bool(request.GET.get('cursor'))
+
+
+def enlaces_keyset(request, pagina):
+    """
+    Construye las query strings de siguiente/anterior conservando el resto
+    de parámetros GET (filtros) de la petición.
+    """
+    enlaces = {}
+    for clave, token in (('siguiente', pagina.cursor_siguiente), ('anterior', pagina.cursor_anterior)):
+        if token is None:
+            enlaces[clave] = None
+            continue
+        parametros = request.GET.copy()
+        parametros.pop('page', None)
+        parametros['paginacion'] = 'cursor'
+        parametros['cursor'] = token
+        enlaces[clave] = parametros.urlencode()
+
+    enlaces['primera'] = None
+    if pagina.has_previous():
+        parametros = request.GET.copy()
+        parametros.pop('page', None)
+        parametros.pop('cursor', None)
+        parametros['paginacion'] = 'cursor'
+        enlaces['primera'] = parametros.urlencode()
+    return enlaces
@@ -0,0 +1,246 @@
+"""
+Particiones de la tabla de entregas.
+
+En PostgreSQL core_entrega está particionada por LIST (periodo_id): una
+partición por periodo (core_entrega_p<id>) más una por defecto que recibe
+las entregas de periodos que todavía no tienen la suya (periodos creados
+con bulk_create). Los filtros por periodo_id descartan las demás
+particiones al planificar la consulta.
+
+Archivar un año mueve las particiones de sus periodos a
+core_entrega_archivo (modelo EntregaArchivada) con DETACH/ATTACH, sin
+copiar filas. En otros motores (SQLite) la tabla es una sola: crear
+particiones no hace nada y archivar copia las filas y las borra.
+"""
+from django.db import connection, transaction
+
+from .models import Entrega, EntregaArchivada, Periodo
+from .resumen import recalcular_resumen
+from .versiones import incrementar_todas
+
+
+TABLA = Entrega._meta.db_table
+TABLA_ARCHIVO = EntregaArchivada._meta.db_table
+PARTICION_DEFECTO = f'{TABLA}_defecto'
+
+# Ids por DELETE al borrar entregas sueltas (SQLite admite pocos parámetros)
+LOTE_BORRADO = 900
+
+
+def nombre_particion(periodo_id):
+    return f'{TABLA}_p{int(periodo_id)}'
+
+
+def particionada():
+    """True si core_entrega es una tabla particionada (solo PostgreSQL)."""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLA]
+        )
+        return cursor.fetchone() is not None
+
+
+def particiones(tabla=TABLA):
+    """{nombre: filas estimadas} de las particiones de `tabla`."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT hija.relname, hija.reltuples::bigint
+            FROM pg_inherits
+            JOIN pg_class hija ON hija.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [tabla],
+        )
+        return dict(cursor.fetchall())
+
+
+def crear_particion(periodo_id):
+    """
+    Crea la partición del periodo si no existe. Las entregas del periodo
+    que estén en la partición por defecto pasan a la nueva: se crea como
+    tabla suelta, se llena y se adjunta. Devuelve True si la creó.
+    """
+    if not particionada():
+        return False
+    return _crear_particion(periodo_id)
+
+
+def _crear_particion(periodo_id):
+    nombre = nombre_particion(periodo_id)
+    q = connection.ops.quote_name
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [nombre])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(f'CREATE TABLE {q(nombre)} (LIKE {q(TABLA)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH movidas AS (DELETE FROM {q(PARTICION_DEFECTO)} WHERE periodo_id = %s RETURNING *) '
+            f'INSERT INTO {q(nombre)} SELECT * FROM movidas',
+            [periodo_id],
+        )
+        cursor.execute(
+            f'ALTER TABLE {q(TABLA)} ATTACH PARTITION {q(nombre)} FOR VALUES IN ({int(periodo_id)})'
+        )
+    return True
+
+
+def eliminar_particion(periodo_id):
+    """
+    Borra la partición de un periodo eliminado (sus entregas ya se borraron
+    en cascada). Si el periodo estaba archivado, su partición se conserva.
+    """
+    nombre = nombre_particion(periodo_id)
+    if not particionada() or nombre not in particiones():
+        return
+    _comprobar_pendientes()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE {connection.ops.quote_name(nombre)}')
+
+
+def crear_particiones_faltantes():
+    """Particiones de todos los periodos que no la tienen. Devuelve los ids creados."""
+    if not particionada():
+        return []
+    existentes = set(particiones())
+    creadas = []
+    for periodo_id in Periodo.objects.order_by('pk').values_list('pk', flat=True):
+        if nombre_particion(periodo_id) not in existentes and _crear_particion(periodo_id):
+            creadas.append(periodo_id)
+    return creadas
+
+
+def periodos_archivables(conservar_anios, anio_actual):
+    """Periodos con entregas vigentes anteriores a los `conservar_anios` últimos años."""
+    limite = anio_actual - conservar_anios + 1
+    return list(
+        Periodo.objects.filter(año__lt=limite, pk__in=Entrega.objects.values('periodo_id'))
+        .order_by('año', 'trimestre', 'pk')
+    )
+
+
+def archivar_periodos(periodos):
+    """
+    Mueve las entregas de los periodos a core_entrega_archivo. Dejan de
+    verse en el dashboard, las exportaciones y el admin: se recalcula el
+    resumen de esos periodos y se invalidan las cachés de todas las bases.
+    """
+    ids = [periodo.pk for periodo in periodos]
+    if not ids:
+        return 0
+    total = Entrega.objects.filter(periodo_id__in=ids).count()
+    with transaction.atomic():
+        if particionada():
+            _comprobar_pendientes()
+            crear_particiones_faltantes()
+            for periodo_id in ids:
+                _mover_particion(periodo_id)
+        else:
+            _copiar_filas(ids)
+        recalcular_resumen(periodos=ids)
+        incrementar_todas()
+    return total
+
+
+def descartar_entregas(periodos, ids=None):
+    """
+    Borra las entregas de los periodos, vigentes y archivadas (ya copiadas
+    al archivo frío, ver core.archivo). Con `ids` solo se borran esas
+    entregas: las que se agregaron al periodo después de leerlas se
+    conservan. En PostgreSQL la partición de un periodo se borra entera,
+    sin filas muertas ni índices que limpiar (con `ids`, solo si quedó
+    vacía); las que estén en la partición por defecto (o en SQLite) se
+    borran con DELETE.
+    """
+    periodos = list(periodos)
+    if not periodos:
+        return
+    with transaction.atomic():
+        if ids is not None:
+            _borrar_ids(TABLA, periodos, ids)
+            _borrar_ids(TABLA_ARCHIVO, periodos, ids)
+        if particionada():
+            _comprobar_pendientes()
+            for periodo_id in periodos:
+                _borrar_particion(periodo_id, solo_vacia=ids is not None)
+        if ids is None:
+            _borrar_filas(TABLA, periodos)
+            _borrar_filas(TABLA_ARCHIVO, periodos)
+        recalcular_resumen(periodos=periodos)
+        incrementar_todas()
+
+
+def _borrar_particion(periodo_id, solo_vacia=False):
+    nombre = nombre_particion(periodo_id)
+    q = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s)', [nombre])
+        if cursor.fetchone()[0] is None:
+            return
+        if solo_vacia:
+            # Con el bloqueo nadie más inserta en ella: si ahora está vacía, lo sigue
+            cursor.execute(f'LOCK TABLE {q(nombre)} IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {q(nombre)})')
+            if cursor.fetchone()[0]:
+                return
+        cursor.execute(f'DROP TABLE {q(nombre)}')
+
+
+def _comprobar_pendientes():
+    # Las FK de Django son diferidas: PostgreSQL no admite DETACH ni DROP de
+    # una partición con comprobaciones pendientes de esta transacción
+    connection.check_constraints()
+
+
+def _mover_particion(periodo_id):
+    nombre = nombre_particion(periodo_id)
+    q = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {q(TABLA)} DETACH PARTITION {q(nombre)}')
+        # Las FK heredadas impedirían borrar conductores o periodos con entregas archivadas
+        cursor.execute(
+            "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'f'", [nombre]
+        )
+        for (restriccion,) in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE {q(nombre)} DROP CONSTRAINT {q(restriccion)}')
+        # El archivo no inserta filas: sin depender de la secuencia de core_entrega
+        cursor.execute(f'ALTER TABLE {q(nombre)} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(
+            f'ALTER TABLE {q(TABLA_ARCHIVO)} ATTACH PARTITION {q(nombre)} FOR VALUES IN ({int(periodo_id)})'
+        )
+
+
+def _copiar_filas(ids):
+    q = connection.ops.quote_name
+    columnas = ', '.join(q(campo.column) for campo in Entrega._meta.concrete_fields)
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {q(TABLA_ARCHIVO)} ({columnas}) '
+            f'SELECT {columnas} FROM {q(TABLA)} WHERE periodo_id IN ({marcadores})',
+            ids,
+        )
+    _borrar_filas(TABLA, ids)
+
+
+def _borrar_filas(tabla, ids):
+    # Sin el ORM: Entrega.delete() emite señales (resumen, versiones) por cada fila
+    marcadores = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {connection.ops.quote_name(tabla)} WHERE periodo_id IN ({marcadores})', ids)
+
+
+def _borrar_ids(tabla, periodos, ids):
+    # periodo_id acota las particiones que recorre cada DELETE
+    q = connection.ops.quote_name
+    marcadores_periodos = ', '.join(['%s'] * len(periodos))
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), LOTE_BORRADO):
+            lote = ids[inicio:inicio + LOTE_BORRADO]
+            cursor.execute(
+                f'DELETE FROM {q(tabla)} WHERE periodo_id IN ({marcadores_periodos}) '
+                f'AND id IN ({", ".join(["%s"] * len(lote))})',
+                [*periodos, *lote],
+            )
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .models import Conductor, Entrega, ContadorRegistro
+from .resumen import recalcular_resumen
+from .versiones import incrementar_version
+
+
+def supervisores_habituales(conductores):
+    """
+    Mapa conductor_id -> (base, supervisor_id) con el supervisor de la
+    entrega más reciente de cada conductor (None si nunca tuvo uno). Se
+    resuelve en una sola consulta con una subconsulta correlacionada.
+    """
+    ultima = (
+        Entrega.objects.filter(conductor=OuterRef('pk'), supervisor__isnull=False)
+        .order_by('-periodo__año', '-periodo__trimestre', '-numero_registro')
+        .values('supervisor')[:1]
+    )
+    filas = conductores.annotate(supervisor_habitual=Subquery(ultima)).values_list('pk', 'base', 'supervisor_habitual')
+    return {pk: (base, supervisor) for pk, base, supervisor in filas.iterator(chunk_size=2000)}
+
+
+def abrir_periodo(periodo, base=None, supervisores_por_defecto=None, tamano_lote=1000):
+    """
+    Crea en una sola transacción la entrega pendiente del periodo para cada
+    conductor de la base (o de todas las bases si base es None).
+
+    El supervisor de cada entrega es el de la última entrega del conductor;
+    si no tiene, el de `supervisores_por_defecto` ({base: supervisor_id}).
+    Los conductores que ya tienen entrega en el periodo se omiten, así que
+    se puede volver a ejecutar sin duplicar. Devuelve (creadas, existentes).
+    """
+    supervisores_por_defecto = supervisores_por_defecto or {}
+    conductores = Conductor.objects.all()
+    if base:
+        conductores = conductores.filter(base=base)
+
+    with transaction.atomic():
+        mapa = supervisores_habituales(conductores)
+        existentes = set(
+            Entrega.objects.filter(periodo=periodo, conductor_id__in=conductores.values('pk'))
+            .values_list('conductor_id', flat=True)
+        )
+        faltantes = [pk for pk in mapa if pk not in existentes]
+
+        nuevas = []
+        for conductor_id, numero in zip(faltantes, ContadorRegistro.reservar(len(faltantes))):
+            base_conductor, supervisor_id = mapa[conductor_id]
+            nuevas.append(Entrega(
+                numero_registro=numero,
+                conductor_id=conductor_id,
+                supervisor_id=supervisor_id or supervisores_por_defecto.get(base_conductor),
+                estado='pendiente',
+                fase='no_entregada',
+                periodo=periodo,
+                base=base_conductor,
+            ))
+        # ignore_conflicts: si otra apertura simultánea ya creó alguna, se omite
+        Entrega.objects.bulk_create(nuevas, batch_size=tamano_lote, ignore_conflicts=True)
+
+        # bulk_create no emite señales: se invalida la caché a mano. Con
+        # ignore_conflicts no se sabe cuáles se insertaron: el resumen del
+        # periodo se recalcula (del orden de las filas recién creadas)
+        if nuevas:
+            bases = {entrega.base for entrega in nuevas}
+            recalcular_resumen(periodos=[periodo.pk], bases=bases)
+            incrementar_version(*bases)
+
+    return len(nuevas), len(existentes)
@@ -0,0 +1,31 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+class PlantillaMedida(Template):
+    """Suma el tiempo de render a la medición de la solicitud (ver MedicionVistasMiddleware)."""
+
+    def render(self, context=None, request=None):
+        medicion = getattr(request, '_medicion', None)
+        if medicion is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion.render_segundos += time.perf_counter() - inicio
+
+
+class DjangoTemplatesMedidas(DjangoTemplates):
+    """Backend DjangoTemplates cuyas plantillas miden su tiempo de render."""
+
+    def from_string(self, template_code):
+        return PlantillaMedida(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return PlantillaMedida(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
@@ -0,0 +1,66 @@
+"""
+Presupuesto de consultas SQL por nombre de URL: cuántas consultas puede
+ejecutar como máximo un GET a la vista, con las cachés frías (sesión,
+usuario, listas de referencia, analítica). core.tests recorre todas las
+vistas con datos sembrados y falla si alguna se pasa; con DEBUG, el
+middleware de medición lo informa en cada respuesta.
+
+Al agregar una vista hay que declarar su presupuesto aquí (el test
+comprueba que ninguna ruta quede sin él).
+"""
+
+PRESUPUESTOS_CONSULTAS = {
+    'abrir_periodo': 4,
+    'analitica': 8,
+    'api-conductores-detail': 3,
+    'api-conductores-list': 3,
+    'api-docs': 2,
+    'api-entregas-detail': 3,
+    'api-entregas-list': 4,
+    'api-periodos-detail': 3,
+    'api-periodos-list': 3,
+    'api-supervisores-detail': 3,
+    'api-supervisores-list': 3,
+    'carga_masiva_conductores': 2,
+    'carga_masiva_entregas': 2,
+    'crear_conductor': 3,
+    'crear_entrega': 6,
+    'crear_periodo': 2,
+    'crear_supervisor': 2,
+    'dashboard': 8,
+    'descargar_exportacion': 3,
+    'descargar_plantilla_conductores': 2,
+    'descargar_plantilla_entregas': 4,
+    'edicion_masiva_entregas': 2,
+    'editar_conductor': 4,
+    'editar_entrega': 5,
+    'editar_entregas_grilla': 5,
+    'editar_periodo': 3,
+    'editar_supervisor': 3,
+    'eliminar_conductor': 3,
+    'eliminar_entrega': 6,
+    'eliminar_periodo': 3,
+    'eliminar_supervisor': 3,
+    'estado_exportacion': 3,
+    'estado_importacion': 3,
+    'exportar_entregas_csv': 4,
+    'exportar_entregas_xls': 4,
+    'exportar_periodos_csv': 4,
+    'exportar_periodos_xls': 4,
+    'inicio': 2,
+    'listar_conductores': 5,
+    'listar_periodos': 4,
+    'listar_supervisores': 5,
+    'login': 2,
+    'metricas': 2,
+    'signup': 2,
+    'solicitar_exportacion': 2,
+    'admin:core_conductor_changelist': 5,
+    'admin:core_supervisor_changelist': 5,
+    'admin:core_periodo_changelist': 6,
+    'admin:core_entrega_changelist': 6,
+}
+
+
+def presupuesto(vista):
+    return PRESUPUESTOS_CONSULTAS.get(vista)
@@ -0,0 +1,171 @@
+from django import forms
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from accounts.bases import codigos_base
+from accounts.models import Perfil
+from .models import Conductor, Periodo, Supervisor
+from .versiones import obtener_version
+
+
+# Las listas versionadas cambian de clave con VersionDatos, así que ningún
+# proceso sirve una lista vieja; las demás (perfiles) se invalidan solo en
+# el proceso que guardó y el resto se entera al expirar
+DURACION_REFERENCIAS = 600
+
+
+class Referencia:
+    """
+    Lista de opciones de un modelo que cambia poco (conductores,
+    supervisores, periodos, perfiles), guardada en caché por base como
+    tuplas (valores, etiqueta). `valores` son las columnas de `campos` (la
+    primera es el id) y alcanzan para reconstruir la instancia sin
+    consultar; `etiqueta` es la misma que mostraría un ModelChoiceField.
+    Con `versionada` la clave incluye la versión de datos de la base
+    (core.versiones), que sube en toda escritura del modelo.
+    """
+
+    def __init__(self, nombre, modelo, campos, orden, por_base=True, relacionados=(), etiqueta=None,
+                 versionada=True):
+        self.nombre = nombre
+        self.modelo = modelo
+        self.campos = list(campos)
+        self.orden = list(orden)
+        self.por_base = por_base
+        # Columnas de otras tablas que solo se usan para la etiqueta
+        self.relacionados = list(relacionados)
+        self.etiqueta = etiqueta or (lambda instancia, extra: str(instancia))
+        self.versionada = versionada
+
+    def clave(self, base=None):
+        return f'referencias:{self.nombre}:{base if self.por_base and base else "*"}'
+
+    def consulta(self, base=None):
+        consulta = self.modelo.objects.order_by(*self.orden)
+        if self.por_base and base:
+            consulta = consulta.filter(base=base)
+        return consulta
+
+    def filas(self, base=None, version=None):
+        """
+        Filas de la lista. `version` es la de datos de `base` (o la suma de
+        todas, sin base) si quien llama ya la tiene; si no, se consulta.
+        """
+        clave = self.clave(base)
+        if self.versionada:
+            if version is None:
+                version = obtener_version(base)
+            # Toda escritura de estos modelos sube la versión de sus bases (los
+            # periodos, la de todas), así que basta la de la base que pregunta
+            clave = f'{clave}:{base or "*"}:v{version}'
+        filas = cache.get(clave)
+        if filas is None:
+            filas = []
+            for valores in self.consulta(base).values_list(*self.campos, *self.relacionados):
+                propios, extra = valores[:len(self.campos)], valores[len(self.campos):]
+                filas.append((propios, self.etiqueta(self.instancia(propios), extra)))
+            cache.set(clave, filas, DURACION_REFERENCIAS)
+        return filas
+
+    def opciones(self, base=None, version=None):
+        return [(valores[0], etiqueta) for valores, etiqueta in self.filas(base, version)]
+
+    def instancia(self, valores):
+        """Instancia como leída de la BD (solo con `campos`; el resto queda diferido)."""
+        return self.modelo.from_db(DEFAULT_DB_ALIAS, self.campos, valores)
+
+    def buscar(self, pk, base=None):
+        """Instancia con ese id leída de la BD (para ids aún no vistos en la caché), o None."""
+        valores = self.consulta(base).filter(pk=pk).values_list(*self.campos).first()
+        return None if valores is None else self.instancia(valores)
+
+    def invalidar(self, *bases):
+        if self.versionada:
+            # La próxima lectura usa otra clave; las viejas expiran solas
+            return
+        claves = {self.clave()}
+        if self.por_base:
+            claves |= {self.clave(base) for base in bases or codigos_base()}
+        cache.delete_many(list(claves))
+
+
+CONDUCTORES = Referencia('conductores', Conductor, ['id', 'nombre', 'base'], ['nombre', 'pk'])
+SUPERVISORES = Referencia('supervisores', Supervisor, ['id', 'nombre', 'base'], ['nombre', 'pk'])
+PERIODOS = Referencia('periodos', Periodo, ['id', 'trimestre', 'año'], ['-año', 'trimestre', 'pk'], por_base=False)
+PERFILES = Referencia(
+    'perfiles', Perfil, ['id', 'base', 'rol'], ['user__username', 'pk'],
+    relacionados=['user__username'],
+    etiqueta=lambda perfil, extra: f'{extra[0]} ({perfil.rol})',
+    versionada=False,
+)
+
+
+def invalidar_referencias(*bases):
+    """Para escrituras en bloque de conductores/supervisores, que no emiten señales."""
+    CONDUCTORES.invalidar(*bases)
+    SUPERVISORES.invalidar(*bases)
+
+
+class ReferenciaChoiceField(forms.ChoiceField):
+    """
+    Reemplazo de ModelChoiceField sobre una Referencia: las opciones y la
+    validación salen de la caché y el valor limpio es una instancia del
+    modelo reconstruida de la fila. Solo un id que no está en la lista se
+    busca en la BD.
+    """
+
+    def __init__(self, referencia, base=None, empty_label='---------', version=None, **kwargs):
+        self.referencia = referencia
+        self.base = base
+        self.empty_label = empty_label
+        self.version = version
+        super().__init__(choices=self._opciones, **kwargs)
+
+    def filas(self):
+        # Una sola lectura (y consulta de versión) por formulario: los campos se copian en cada instancia
+        if getattr(self, '_filas', None) is None:
+            self._filas = self.referencia.filas(self.base, self.version)
+        return self._filas
+
+    def __deepcopy__(self, memo):
+        copia = super().__deepcopy__(memo)
+        copia._filas = None
+        return copia
+
+    def _opciones(self):
+        # Callable: se resuelve al mostrar/validar, no al crear el formulario
+        return [('', self.empty_label)] + [(valores[0], etiqueta) for valores, etiqueta in self.filas()]
+
+    def prepare_value(self, value):
+        if isinstance(value, self.referencia.modelo):
+            return value.pk
+        return value
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            pk = int(value.pk if isinstance(value, self.referencia.modelo) else value)
+        except (TypeError, ValueError):
+            pk = None
+        for valores, _ in self.filas():
+            if valores[0] == pk:
+                return self.referencia.instancia(valores)
+        # Puede ser más nuevo que la lista en caché: se confirma en la BD
+        instancia = self.referencia.buscar(pk, self.base) if pk is not None else None
+        if instancia is not None:
+            return instancia
+        raise forms.ValidationError(
+            self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value}
+        )
+
+    def validate(self, value):
+        # to_python ya comprobó que es una de las opciones
+        if value is None and self.required:
+            raise forms.ValidationError(self.error_messages['required'], code='required')
+
+    def has_changed(self, initial, data):
+        if self.disabled:
+            return False
+        inicial = '' if initial is None else str(self.prepare_value(initial))
+        return inicial != ('' if data is None else str(data))
@@ -0,0 +1,145 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .filtros import condicion_periodo
+from .models import Entrega, ResumenEntregas
+
+
+CLAVE = list(Entrega.CAMPOS_RESUMEN)
+
+# Filtros del dashboard que se pueden responder desde el resumen
+FILTROS_RESUMIBLES = {'estado', 'fase', 'periodo'}
+
+
+def aplicar_deltas(deltas):
+    """
+    Suma a cada grupo {(base, periodo_id, estado, fase): n} su delta con un
+    UPDATE total = total + n; si el grupo aún no existe se crea. Debe
+    llamarse en la misma transacción que la escritura de las entregas.
+    """
+    for clave, delta in deltas.items():
+        if not delta:
+            continue
+        grupo = dict(zip(CLAVE, clave))
+        if ResumenEntregas.objects.filter(**grupo).update(total=F('total') + delta):
+            continue
+        if delta < 0:
+            # El grupo ya no existe (p. ej. se borró el periodo en cascada)
+            continue
+        try:
+            with transaction.atomic():
+                ResumenEntregas.objects.create(total=delta, **grupo)
+        except IntegrityError:
+            # Otro proceso creó el grupo entre el UPDATE y el INSERT
+            ResumenEntregas.objects.filter(**grupo).update(total=F('total') + delta)
+
+
+def deltas_creadas(entregas):
+    return Counter(entrega.clave_resumen for entrega in entregas)
+
+
+def deltas_modificadas(entregas):
+    """
+    Deltas de instancias leídas de la BD (clave original guardada en
+    from_db) y modificadas en memoria, antes de un bulk_update. Deja la
+    clave actual como nueva original.
+    """
+    deltas = Counter()
+    for entrega in entregas:
+        original, actual = entrega._clave_resumen_original, entrega.clave_resumen
+        if original != actual:
+            deltas[original] -= 1
+            deltas[actual] += 1
+        entrega._clave_resumen_original = actual
+    return deltas
+
+
+def grupos(entregas):
+    """Cantidad por grupo de un queryset de entregas, en una consulta agregada."""
+    filas = entregas.order_by().values(*CLAVE).annotate(cantidad=Count('pk'))
+    return Counter({tuple(fila[campo] for campo in CLAVE): fila['cantidad'] for fila in filas})
+
+
+def actualizar_entregas(entregas, **cambios):
+    """
+    queryset.update(**cambios) manteniendo el resumen: se bloquean las filas,
+    se cuentan por grupo antes de actualizar y se mueven al grupo nuevo.
+    Devuelve la cantidad de filas actualizadas.
+    """
+    if not set(cambios) & set(CLAVE):
+        return entregas.update(**cambios)
+    if 'fase' in cambios:
+        # Solo las que realmente cambian de fase (el CASE ve los valores previos)
+        cambios['fase_actualizada'] = Case(
+            When(~Q(fase=cambios['fase']), then=Value(timezone.now())),
+            default=F('fase_actualizada'),
+        )
+    with transaction.atomic():
+        ids = list(entregas.select_for_update().values_list('pk', flat=True))
+        seleccion = Entrega.objects.filter(pk__in=ids)
+        antes = grupos(seleccion)
+        actualizadas = seleccion.update(**cambios)
+        deltas = Counter()
+        for clave, cantidad in antes.items():
+            nueva = tuple(cambios.get(campo, valor) for campo, valor in zip(CLAVE, clave))
+            deltas[clave] -= cantidad
+            deltas[nueva] += cantidad
+        aplicar_deltas(deltas)
+    return actualizadas
+
+
+def recalcular_resumen(periodos=None, bases=None):
+    """
+    Vuelve a calcular desde las entregas los grupos de los periodos (ids) y
+    bases indicados; sin argumentos reconstruye la tabla completa. Sirve
+    para escrituras cuyo efecto exacto no se conoce (ignore_conflicts) y
+    para corregir cualquier desajuste.
+    """
+    alcance = Q()
+    if periodos is not None:
+        alcance &= Q(periodo_id__in=list(periodos))
+    if bases is not None:
+        alcance &= Q(base__in=list(bases))
+    with transaction.atomic():
+        ResumenEntregas.objects.filter(alcance).delete()
+        nuevos = [
+            ResumenEntregas(total=cantidad, **dict(zip(CLAVE, clave)))
+            for clave, cantidad in grupos(Entrega.objects.filter(alcance)).items()
+        ]
+        ResumenEntregas.objects.bulk_create(nuevos, batch_size=1000)
+    return len(nuevos)
+
+
+def estadisticas_desde_resumen(base, parametros):
+    """
+    Mismo resultado que calcular_estadisticas para el dashboard, leído del
+    resumen. Devuelve None si hay filtros que el resumen no distingue
+    (conductor, supervisor) y hay que contar sobre las entregas.
+    """
+    filtros = {clave for clave in ['estado', 'fase', 'periodo', 'conductor', 'supervisor'] if parametros.get(clave)}
+    if filtros - FILTROS_RESUMIBLES:
+        return None
+
+    resumen = ResumenEntregas.objects.all()
+    if base:
+        resumen = resumen.filter(base=base)
+    if parametros.get('estado'):
+        resumen = resumen.filter(estado=parametros['estado'])
+    if parametros.get('fase'):
+        resumen = resumen.filter(fase=parametros['fase'])
+    if parametros.get('periodo'):
+        resumen = resumen.filter(condicion_periodo(parametros['periodo']))
+
+    por_estado = dict.fromkeys((clave for clave, _ in Entrega.ESTADO_CHOICES), 0)
+    por_fase = dict.fromkeys((clave for clave, _ in Entrega.FASE_CHOICES), 0)
+    total = 0
+    for fila in resumen.values('estado', 'fase').annotate(cantidad=Sum('total')):
+        total += fila['cantidad']
+        if fila['estado'] in por_estado:
+            por_estado[fila['estado']] += fila['cantidad']
+        if fila['fase'] in por_fase:
+            por_fase[fila['fase']] += fila['cantidad']
+    return {'total': total, 'por_estado': por_estado, 'por_fase': por_fase}
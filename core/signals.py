@@ -0,0 +1,109 @@
+import os
+from collections import Counter
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from accounts.models import Perfil
+from .archivo import ruta_archivo
+from .models import ArchivoEntregas, Conductor, Entrega, Periodo, Supervisor
+from .particiones import crear_particion, eliminar_particion
+from .referencias import CONDUCTORES, PERFILES, PERIODOS, SUPERVISORES
+from .resumen import CLAVE, aplicar_deltas
+from .versiones import incrementar_todas, incrementar_version
+
+
+# Antes de datos_de_base_modificados, que deja la base actual como original
+@receiver(post_save, sender=Conductor)
+@receiver(post_delete, sender=Conductor)
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+def referencias_de_base_modificadas(sender, instance, **kwargs):
+    referencia = CONDUCTORES if sender is Conductor else SUPERVISORES
+    referencia.invalidar(*instance.bases_afectadas)
+
+
+@receiver(post_save, sender=Periodo)
+@receiver(post_delete, sender=Periodo)
+def referencias_de_periodos_modificadas(sender, instance, **kwargs):
+    PERIODOS.invalidar()
+
+
+@receiver(post_save, sender=Perfil)
+@receiver(post_delete, sender=Perfil)
+def referencias_de_perfiles_modificadas(sender, instance, **kwargs):
+    # Sin base original a mano: se invalidan las listas de todas las bases
+    PERFILES.invalidar()
+
+
+@receiver(post_save, sender=Entrega)
+@receiver(post_delete, sender=Entrega)
+@receiver(post_save, sender=Conductor)
+@receiver(post_delete, sender=Conductor)
+@receiver(post_save, sender=Supervisor)
+@receiver(post_delete, sender=Supervisor)
+def datos_de_base_modificados(sender, instance, **kwargs):
+    # Invalida los resultados cacheados (exportaciones, ETags) de la base, y
+    # de la anterior si el guardado la cambió
+    incrementar_version(*instance.bases_afectadas)
+    instance._base_original = instance.base
+
+
+@receiver(post_save, sender=Periodo)
+@receiver(post_delete, sender=Periodo)
+def periodo_modificado(sender, instance, **kwargs):
+    # Los periodos son globales: aparecen en las páginas de todas las bases
+    incrementar_todas()
+
+
+@receiver(post_save, sender=Periodo)
+def particion_de_periodo_creado(sender, instance, created, **kwargs):
+    # Las entregas del periodo nuevo van a su propia partición, no a la por defecto
+    if created:
+        crear_particion(instance.pk)
+
+
+@receiver(post_delete, sender=Periodo)
+def particion_de_periodo_eliminado(sender, instance, **kwargs):
+    eliminar_particion(instance.pk)
+
+
+@receiver(post_delete, sender=ArchivoEntregas)
+def borrar_archivo_de_entregas(sender, instance, **kwargs):
+    # También al borrar el periodo (cascada)
+    ruta = ruta_archivo(instance)
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+
+@receiver(pre_save, sender=Entrega)
+def recordar_clave_resumen(sender, instance, **kwargs):
+    # Instancias que no vienen de from_db (o con campos diferidos): se lee la clave guardada
+    if instance.pk and getattr(instance, '_clave_resumen_original', None) is None:
+        instance._clave_resumen_original = (
+            Entrega.objects.filter(pk=instance.pk).values_list(*CLAVE).first()
+        )
+    instance.sellar_fase()
+
+
+@receiver(post_save, sender=Entrega)
+def actualizar_resumen(sender, instance, **kwargs):
+    original = getattr(instance, '_clave_resumen_original', None)
+    if original is None:
+        actual = instance.clave_resumen
+    else:
+        # Los campos diferidos no se guardaron: conservan el valor original
+        actual = tuple(instance.__dict__.get(campo, valor) for campo, valor in zip(CLAVE, original))
+    if original == actual or actual is None:
+        return
+    deltas = Counter({actual: 1})
+    if original is not None:
+        deltas[original] -= 1
+    aplicar_deltas(deltas)
+    instance._clave_resumen_original = actual
+
+
+@receiver(post_delete, sender=Entrega)
+def descontar_resumen(sender, instance, **kwargs):
+    clave = getattr(instance, '_clave_resumen_original', None) or instance.clave_resumen
+    aplicar_deltas({clave: -1})
@@ -1,3 +1,1646 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+from openpyxl import load_workbook
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from accounts.bases import etiquetas_base
+from accounts.models import Perfil
+
+from . import archivo
+from .analitica import (
+    CUMPLIDA, EN_PROCESO, INCUMPLIDA, JUSTIFICADA, clasificar, cumplimiento_por_periodo, matriz_conductores,
+    resumen_supervisores,
+)
+from .api.lotes import NO_PERMITIDO, REPETIDO, lote_entregas
+from .api.serializadores import MAXIMO_LOTE
+from .datos_sinteticos import sembrar
+from .estadisticas import PaginadorConTotal, calcular_estadisticas
+from .exportaciones import ENCABEZADOS_ENTREGAS
+from .filtros import filtrar_entregas, ids_periodos
+from .forms import EntregaForm
+from .importacion import ImportadorConductores, ImportadorEntregas
+from .lectores import leer_bloques, leer_filas
+from .metricas import Medicion, RegistroMetricas, huella
+from .models import (
+    ArchivoEntregas, Conductor, ContadorRegistro, Entrega, EntregaArchivada, Periodo, ResumenEntregas, Supervisor,
+    TrabajoExportacion, TrabajoImportacion,
+)
+from .paginacion import PaginadorKeyset
+from .particiones import (
+    PARTICION_DEFECTO, TABLA, TABLA_ARCHIVO, archivar_periodos, crear_particion, descartar_entregas,
+    nombre_particion, particionada, particiones,
+)
+from .presupuestos import PRESUPUESTOS_CONSULTAS
+from .referencias import CONDUCTORES
+from .resumen import actualizar_entregas, estadisticas_desde_resumen, grupos
+from .trabajos import (
+    TIEMPO_MAXIMO_PROCESANDO, generar_exportacion, solicitar_exportacion, tomar_siguiente_trabajo,
+)
+from .versiones import incrementar_version, obtener_version
+
+
+def nombres_de_rutas(patrones=None, prefijo=''):
+    """Nombres (con namespace) de todas las rutas del proyecto."""
+    nombres = set()
+    for patron in get_resolver().url_patterns if patrones is None else patrones:
+        if isinstance(patron, URLResolver):
+            espacio = f'{prefijo}{patron.namespace}:' if patron.namespace else prefijo
+            nombres |= nombres_de_rutas(patron.url_patterns, espacio)
+        elif isinstance(patron, URLPattern) and patron.name:
+            nombres.add(f'{prefijo}{patron.name}')
+    return nombres
+
+
+# Rutas que no se miden: las que solo aceptan POST, la raíz navegable de
+# la API, el admin (de él solo se declaran los listados de core) y
+# contacto, cuya plantilla está en contacto/Templates y no se encuentra
+EXCLUIDAS_PREFIJOS = ('admin:',)
+EXCLUIDAS = {
+    'logout', 'api-token', 'api-root', 'api-entregas-lote', 'api-conductores-lote', 'contacto:contacto',
+}
+
+
+def medible(nombre):
+    if nombre in PRESUPUESTOS_CONSULTAS:
+        return True
+    return not (nombre.startswith(EXCLUIDAS_PREFIJOS) or nombre in EXCLUIDAS)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Cada vista con datos sembrados, cachés frías, contra core.presupuestos."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media = tempfile.mkdtemp()
+        cls.ajustes = override_settings(MEDIA_ROOT=cls.media)
+        cls.ajustes.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.ajustes.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar(conductores_por_base=30, supervisores_por_base=3, periodos=4, entregas=240, lote=100)
+        cls.usuario = User.objects.create_user('presupuesto', password='clave', is_staff=True, is_superuser=True)
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+        # Todos los conductores con perfil: los listados muestran el usuario de cada fila
+        conductores = list(Conductor.objects.order_by('pk'))
+        usuarios = User.objects.bulk_create([User(username=f'conductor{i}') for i in range(len(conductores))])
+        perfiles = Perfil.objects.bulk_create([
+            Perfil(user=usuario, base=conductor.base, rol='conductor')
+            for usuario, conductor in zip(usuarios, conductores)
+        ])
+        for conductor, perfil in zip(conductores, perfiles):
+            conductor.perfil = perfil
+            conductor.save(update_fields=['perfil'])
+        cls.entrega = Entrega.objects.filter(base='lampa').order_by('pk').first()
+        cls.conductor = Conductor.objects.filter(base='lampa').order_by('pk').first()
+        cls.supervisor = Supervisor.objects.filter(base='lampa').order_by('pk').first()
+        cls.periodo = Periodo.objects.order_by('pk').first()
+        cls.exportacion = solicitar_exportacion(cls.usuario, 'lampa', 'csv', {})
+        generar_exportacion(cls.exportacion)
+        cls.importacion = TrabajoImportacion.objects.create(
+            usuario=cls.usuario, base='lampa', tipo='conductores', archivo='importaciones/x.csv',
+        )
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def rutas(self):
+        """Nombre de URL -> ruta a pedir con GET."""
+        pk = {
+            'editar_entrega': self.entrega.pk,
+            'eliminar_entrega': self.entrega.pk,
+            'editar_conductor': self.conductor.pk,
+            'eliminar_conductor': self.conductor.pk,
+            'editar_supervisor': self.supervisor.pk,
+            'eliminar_supervisor': self.supervisor.pk,
+            'editar_periodo': self.periodo.pk,
+            'eliminar_periodo': self.periodo.pk,
+            'abrir_periodo': self.periodo.pk,
+            'estado_exportacion': self.exportacion.pk,
+            'descargar_exportacion': self.exportacion.pk,
+            'estado_importacion': self.importacion.pk,
+            'api-entregas-detail': self.entrega.pk,
+            'api-conductores-detail': self.conductor.pk,
+            'api-supervisores-detail': self.supervisor.pk,
+            'api-periodos-detail': self.periodo.pk,
+        }
+        rutas = {}
+        for nombre in PRESUPUESTOS_CONSULTAS:
+            rutas[nombre] = reverse(nombre, kwargs={'pk': pk[nombre]} if nombre in pk else None)
+        return rutas
+
+    def consultas(self, url):
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 400, f'{url}: HTTP {respuesta.status_code}')
+        return consultas
+
+    def test_cada_vista_respeta_su_presupuesto(self):
+        for nombre, url in self.rutas().items():
+            with self.subTest(vista=nombre):
+                consultas = self.consultas(url)
+                limite = PRESUPUESTOS_CONSULTAS[nombre]
+                self.assertLessEqual(
+                    len(consultas), limite,
+                    f'{nombre} ejecutó {len(consultas)} consultas (presupuesto {limite}):\n'
+                    + '\n'.join(consulta['sql'] for consulta in consultas.captured_queries),
+                )
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        sin_presupuesto = {nombre for nombre in nombres_de_rutas() if medible(nombre)} - set(PRESUPUESTOS_CONSULTAS)
+        self.assertFalse(sin_presupuesto, f'Declarar en core.presupuestos: {sorted(sin_presupuesto)}')
+
+    @override_settings(DEBUG=True)
+    def test_debug_informa_presupuesto_excedido(self):
+        with mock.patch.dict(PRESUPUESTOS_CONSULTAS, {'dashboard': 0}), \
+                self.assertLogs('core.middleware', logging.WARNING) as registro:
+            respuesta = self.client.get(reverse('dashboard'))
+        consultas, limite = respuesta['X-Consultas-SQL'].split('/')
+        self.assertEqual(limite, '0')
+        self.assertGreater(int(consultas), 0)
+        self.assertTrue(any('Presupuesto de consultas excedido' in linea for linea in registro.output))
+
+
+class PaginadorKeysetTests(TestCase):
+    """Recorrido completo por cursor, hacia adelante y hacia atrás, con fechas nulas y repetidas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        conductor = Conductor.objects.create(nombre='Keyset', base='lampa')
+        fechas = [None, datetime.date(2024, 1, 5), datetime.date(2024, 1, 5), None, datetime.date(2024, 2, 1)] * 5
+        for fecha in fechas:
+            # Una entrega por conductor y periodo: un periodo para cada una
+            Entrega.objects.create(
+                conductor=conductor, periodo=Periodo.objects.create(trimestre='Q2', año=2024),
+                estado='pendiente', fase='no_entregada', base='lampa', fecha_entrega=fecha,
+            )
+        cls.entregas = list(Entrega.objects.all())
+
+    def esperado(self, descendente):
+        clave = lambda entrega: (entrega.fecha_entrega is None, entrega.fecha_entrega or datetime.date.min, entrega.numero_registro)
+        return [entrega.pk for entrega in sorted(self.entregas, key=clave, reverse=descendente)]
+
+    def recorrer(self, orden):
+        paginador = PaginadorKeyset(Entrega.objects.all(), orden, 4)
+        paginas = [paginador.get_page()]
+        while paginas[-1].has_next():
+            paginas.append(paginador.get_page(paginas[-1].cursor_siguiente))
+        # Y de vuelta desde la última página con los cursores "anterior"
+        atras = [paginas[-1]]
+        while atras[-1].has_previous():
+            atras.append(paginador.get_page(atras[-1].cursor_anterior))
+        return paginas, atras
+
+    def test_recorre_todo_en_orden_con_nulos(self):
+        for orden, descendente in [(['-fecha_entrega', '-numero_registro'], True), (['fecha_entrega', 'numero_registro'], False)]:
+            with self.subTest(orden=orden):
+                paginas, atras = self.recorrer(orden)
+                adelante = [[entrega.pk for entrega in pagina] for pagina in paginas]
+                self.assertEqual(sum(adelante, []), self.esperado(descendente))
+                self.assertEqual([[entrega.pk for entrega in pagina] for pagina in reversed(atras)], adelante)
+
+    def test_fases_sin_or_is_null(self):
+        paginador = PaginadorKeyset(Entrega.objects.all(), ['-fecha_entrega', '-numero_registro'], 4)
+        # La primera fase (nulos, los mayores) ocupa las dos primeras páginas y parte de la tercera
+        token = paginador.get_page(paginador.get_page().cursor_siguiente).cursor_siguiente
+        with CaptureQueriesContext(connection) as consultas:
+            paginador.get_page(paginador.get_page(token).cursor_siguiente)
+        for consulta in consultas.captured_queries:
+            self.assertNotIn(' OR "core_entrega"."fecha_entrega" IS NULL', consulta['sql'])
+
+
+    def test_cursor_falsificado_vuelve_a_la_primera_pagina(self):
+        paginador = PaginadorKeyset(Entrega.objects.all(), ['-fecha_entrega', '-numero_registro'], 4)
+        primera = [entrega.pk for entrega in paginador.get_page()]
+        falsos = [
+            PaginadorKeyset.codificar_cursor(['abc', 1], 'sig'),
+            PaginadorKeyset.codificar_cursor([None, 'x'], 'sig'),
+            PaginadorKeyset.codificar_cursor(['2024-01-05', None], 'ant'),
+            PaginadorKeyset.codificar_cursor([{'a': 1}, [2]], 'sig'),
+        ]
+        for token in falsos:
+            with self.subTest(token=token):
+                self.assertIsNone(paginador.decodificar_cursor(token))
+                self.assertEqual([entrega.pk for entrega in paginador.get_page(token)], primera)
+
+        usuario = User.objects.create_user('keyset', is_staff=True)
+        self.client.force_login(usuario)
+        urls = [reverse('dashboard'), reverse('api-entregas-list'), reverse('api-conductores-list'), reverse('api-periodos-list')]
+        for url in urls:
+            for token in falsos:
+                with self.subTest(url=url, token=token):
+                    self.assertEqual(self.client.get(url, {'cursor': token}).status_code, 200)
+
+
+def crear_entrega(**campos):
+    """Entrega con un conductor y un periodo nuevos (una por conductor y periodo)."""
+    base = campos.setdefault('base', 'lampa')
+    if 'conductor' not in campos:
+        campos['conductor'] = Conductor.objects.create(nombre='Conductor', base=base)
+    if 'periodo' not in campos:
+        campos['periodo'] = Periodo.objects.create(trimestre='Q1', año=2024)
+    campos.setdefault('estado', 'pendiente')
+    campos.setdefault('fase', 'no_entregada')
+    return Entrega.objects.create(**campos)
+
+
+def resumen_por_grupo():
+    """Grupos no vacíos del resumen, con la misma clave que resumen.grupos()."""
+    return {
+        tuple(fila[campo] for campo in ['base', 'periodo_id', 'estado', 'fase']): fila['total']
+        for fila in ResumenEntregas.objects.filter(total__gt=0).values()
+    }
+
+
+class ContadorRegistroTests(TestCase):
+
+    def setUp(self):
+        # La migración 0005 deja creado el contador; cada prueba parte sin él
+        ContadorRegistro.objects.all().delete()
+
+    def test_reserva_bloques_contiguos_y_consecutivos(self):
+        primero = ContadorRegistro.reservar(5)
+        segundo = ContadorRegistro.reservar(3)
+        self.assertEqual(list(primero), [1, 2, 3, 4, 5])
+        self.assertEqual(list(segundo), [6, 7, 8])
+        self.assertEqual(list(ContadorRegistro.reservar(0)), [])
+
+    def test_el_contador_nuevo_parte_del_maximo_existente(self):
+        crear_entrega(numero_registro=41)
+        self.assertFalse(ContadorRegistro.objects.exists())
+        self.assertEqual(list(ContadorRegistro.reservar(2)), [42, 43])
+
+    def test_save_no_lee_max_en_cada_insercion(self):
+        crear_entrega()
+        with CaptureQueriesContext(connection) as consultas:
+            segunda = crear_entrega()
+        self.assertEqual(segunda.numero_registro, 2)
+        self.assertFalse([c['sql'] for c in consultas.captured_queries if 'MAX(' in c['sql'].upper()])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Concurrencia real: SQLite serializa las conexiones de prueba')
+class ContadorRegistroConcurrenciaTests(TransactionTestCase):
+
+    def test_reservas_simultaneas_no_se_solapan(self):
+        ContadorRegistro.objects.update_or_create(nombre=ContadorRegistro.ENTREGAS, defaults={'valor': 1})
+        numeros, errores = [], []
+
+        def reservar():
+            try:
+                for _ in range(20):
+                    numeros.extend(ContadorRegistro.reservar(3))
+            except Exception as error:  # pragma: no cover - se informa abajo
+                errores.append(error)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=reservar) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(errores, [])
+        self.assertEqual(sorted(numeros), list(range(2, 2 + 4 * 20 * 3)))
+
+
+class TrabajosAbandonadosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('worker')
+
+    def abandonar(self, trabajo):
+        """Simula un worker que tomó el trabajo y murió hace más del máximo."""
+        trabajo.estado = 'procesando'
+        trabajo.iniciado = timezone.now() - TIEMPO_MAXIMO_PROCESANDO - datetime.timedelta(minutes=1)
+        trabajo.save(update_fields=['estado', 'iniciado'])
+
+    def test_tomar_registra_el_inicio(self):
+        trabajo = solicitar_exportacion(self.usuario, 'lampa', 'csv', {})
+        tomado = tomar_siguiente_trabajo(TrabajoExportacion)
+        self.assertEqual(tomado.pk, trabajo.pk)
+        self.assertEqual(tomado.estado, 'procesando')
+        self.assertIsNotNone(tomado.iniciado)
+
+    def test_la_exportacion_abandonada_no_se_comparte_y_se_marca_error(self):
+        abandonado = solicitar_exportacion(self.usuario, 'lampa', 'csv', {})
+        self.abandonar(abandonado)
+
+        nuevo = solicitar_exportacion(self.usuario, 'lampa', 'csv', {})
+        self.assertNotEqual(nuevo.pk, abandonado.pk)
+        self.assertEqual(tomar_siguiente_trabajo(TrabajoExportacion).pk, nuevo.pk)
+        abandonado.refresh_from_db()
+        self.assertEqual(abandonado.estado, 'error')
+        self.assertIsNotNone(abandonado.terminado)
+
+    def test_la_exportacion_en_curso_se_sigue_compartiendo(self):
+        trabajo = solicitar_exportacion(self.usuario, 'lampa', 'csv', {})
+        tomar_siguiente_trabajo(TrabajoExportacion)
+        self.assertEqual(solicitar_exportacion(self.usuario, 'lampa', 'csv', {}).pk, trabajo.pk)
+
+    def test_la_importacion_abandonada_se_marca_error(self):
+        importacion = TrabajoImportacion.objects.create(
+            usuario=self.usuario, base='lampa', tipo='conductores', archivo='importaciones/x.csv',
+        )
+        self.abandonar(importacion)
+        self.assertIsNone(tomar_siguiente_trabajo(TrabajoImportacion))
+        importacion.refresh_from_db()
+        self.assertEqual(importacion.estado, 'error')
+
+
+class LectoresCsvTests(TestCase):
+
+    def leer(self, contenido):
+        with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as archivo:
+            archivo.write(contenido)
+        self.addCleanup(os.remove, archivo.name)
+        encabezados, filas = leer_filas(archivo.name)
+        return encabezados, list(filas)
+
+    def test_utf8_con_bom(self):
+        encabezados, filas = self.leer('\ufeffnombre;base\nMUÑOZ;lampa\n'.encode('utf-8'))
+        self.assertEqual(encabezados, ['nombre', 'base'])
+        self.assertEqual(filas, [['MUÑOZ', 'lampa']])
+
+    def test_cp1252_de_excel(self):
+        # El byte no UTF-8 aparece lejos del inicio: se detecta antes de leer filas
+        contenido = 'nombre,base\n' + 'PEREZ,lampa\n' * 2000 + 'MUÑOZ,lampa\n'
+        encabezados, filas = self.leer(contenido.encode('cp1252'))
+        self.assertEqual(encabezados, ['nombre', 'base'])
+        self.assertEqual(filas[-1], ['MUÑOZ', 'lampa'])
+
+
+class ImportadorConductoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Conductor.objects.create(nombre='Ana Soto', base='lampa')
+
+    def importar(self, filas, base='lampa'):
+        importador = ImportadorConductores(base)
+        importador.procesar(pd.DataFrame(filas, dtype=object))
+        return importador
+
+    def test_crea_y_actualiza(self):
+        importador = self.importar([
+            {'nombre': 'ANA SOTO', 'base': 'calle larga'},
+            {'nombre': 'Luis Rojas', 'base': ''},
+        ])
+        self.assertEqual((importador.creados, importador.actualizados, importador.errores), (1, 1, []))
+        self.ana.refresh_from_db()
+        self.assertEqual((self.ana.nombre, self.ana.base), ('ANA SOTO', 'calle_larga'))
+        self.assertEqual(Conductor.objects.get(nombre='Luis Rojas').base, 'lampa')
+
+    def test_nombres_repetidos_en_el_archivo(self):
+        importador = self.importar([
+            {'nombre': 'Luis Rojas', 'base': 'lampa'},
+            {'nombre': ' LUIS ROJAS ', 'base': 'calle_larga'},
+            {'nombre': 'luis rojas', 'base': ''},
+        ])
+        self.assertEqual((importador.creados, importador.actualizados), (1, 2))
+        # Manda la última fila: el último nombre y la última base válida
+        luis = Conductor.objects.get(nombre__iexact='luis rojas')
+        self.assertEqual((luis.nombre, luis.base), ('luis rojas', 'calle_larga'))
+
+        # Un segundo bloque del mismo archivo ya encuentra los creados en el primero
+        importador.procesar(pd.DataFrame([{'nombre': 'LUIS ROJAS'}], dtype=object))
+        self.assertEqual((importador.creados, importador.actualizados), (1, 3))
+        self.assertEqual(Conductor.objects.filter(nombre__iexact='luis rojas').count(), 1)
+
+    def test_errores_con_numero_de_fila(self):
+        importador = self.importar([
+            {'nombre': 'Luis Rojas', 'base': 'Norte'},
+            {'nombre': '', 'base': 'lampa'},
+        ])
+        self.assertEqual(importador.errores, [
+            'Fila 3: El nombre no puede estar vacío',
+            "Fila 2: Base 'Norte' no válida. Se usó 'lampa'",
+        ])
+        self.assertEqual(Conductor.objects.get(nombre='Luis Rojas').base, 'lampa')
+
+    def test_incrementa_la_version_de_las_bases_afectadas(self):
+        lampa, calle_larga = obtener_version('lampa'), obtener_version('calle_larga')
+        self.importar([{'nombre': 'Ana Soto', 'base': 'calle_larga'}])
+        # La base anterior del conductor también cambia
+        self.assertGreater(obtener_version('lampa'), lampa)
+        self.assertGreater(obtener_version('calle_larga'), calle_larga)
+
+        lampa, calle_larga = obtener_version('lampa'), obtener_version('calle_larga')
+        importador = self.importar([{'nombre': 'Ana Soto'}])
+        self.assertEqual((importador.creados, importador.actualizados), (0, 1))
+        self.assertEqual((obtener_version('lampa'), obtener_version('calle_larga')), (lampa, calle_larga))
+
+
+class ImportadorEntregasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        cls.luis = Conductor.objects.create(nombre='LUIS ROJAS', base='lampa')
+        cls.periodo = Periodo.objects.create(trimestre='Q1', año=2025)
+
+    def importar(self, filas):
+        importador = ImportadorEntregas('lampa')
+        df = pd.DataFrame(filas, dtype=object)
+        importador.procesar(df)
+        return importador
+
+    def test_volver_a_cargar_actualiza_sin_duplicar(self):
+        primera = self.importar([
+            {'conductor': 'ANA SOTO', 'periodo': 'Q1 2025', 'estado': 'pendiente'},
+            {'conductor': 'luis rojas', 'periodo': 'Q1 2025', 'estado': 'pendiente'},
+        ])
+        self.assertEqual((primera.creados, primera.actualizados, primera.errores), (2, 0, []))
+        numero = Entrega.objects.get(conductor=self.ana).numero_registro
+
+        segunda = self.importar([{'conductor': 'ANA SOTO', 'periodo': 'Q1 2025', 'estado': 'entregada'}])
+        self.assertEqual((segunda.creados, segunda.actualizados), (0, 1))
+        self.assertEqual(Entrega.objects.count(), 2)
+        entrega = Entrega.objects.get(conductor=self.ana)
+        self.assertEqual((entrega.estado, entrega.numero_registro), ('entregada', numero))
+
+    def test_celdas_vacias_no_pisan_valores(self):
+        self.importar([{'conductor': 'ANA SOTO', 'periodo': 'Q1 2025', 'fase': 'en_firma', 'notas': 'firmó tarde'}])
+        self.importar([{'conductor': 'ANA SOTO', 'periodo': 'Q1 2025', 'fase': '', 'notas': ''}])
+        entrega = Entrega.objects.get(conductor=self.ana)
+        self.assertEqual((entrega.fase, entrega.notas), ('en_firma', 'firmó tarde'))
+
+    def test_filas_repetidas_se_combinan(self):
+        importador = self.importar([
+            {'conductor': 'ANA SOTO', 'periodo': 'Q1 2025', 'estado': 'en_curso', 'notas': 'primera'},
+            {'conductor': 'ANA SOTO', 'periodo': 'Q1 2025', 'estado': 'entregada', 'notas': ''},
+        ])
+        self.assertEqual((importador.creados, importador.actualizados), (1, 1))
+        entrega = Entrega.objects.get(conductor=self.ana)
+        self.assertEqual((entrega.estado, entrega.notas), ('entregada', 'primera'))
+
+    def test_errores_por_fila(self):
+        importador = self.importar([
+            {'conductor': 'NADIE', 'periodo': 'Q1 2025'},
+            {'conductor': 'ANA SOTO', 'periodo': 'Q3 1999'},
+        ])
+        self.assertEqual(importador.errores, [
+            "Fila 2: Conductor 'NADIE' no encontrado en la base",
+            "Fila 3: Periodo 'Q3 1999' no existe",
+        ])
+        self.assertFalse(Entrega.objects.exists())
+
+    def test_entrega_creada_por_otra_carga_no_se_pisa(self):
+        existente = crear_entrega(conductor=self.ana, periodo=self.periodo, estado='entregada', fase='entregada')
+        filtrar = Entrega.objects.filter
+
+        def sin_ver_la_existente(*args, **kwargs):
+            # Otra carga la insertó después de que este bloque buscó las existentes
+            if 'conductor_id__in' in kwargs:
+                return Entrega.objects.none()
+            return filtrar(*args, **kwargs)
+
+        with mock.patch.object(Entrega.objects, 'filter', sin_ver_la_existente):
+            importador = self.importar([
+                {'conductor': 'ANA SOTO', 'periodo': 'Q1 2025'},
+                {'conductor': 'LUIS ROJAS', 'periodo': 'Q1 2025'},
+            ])
+        self.assertEqual((importador.creados, importador.actualizados), (0, 0))
+        self.assertEqual(len(importador.errores), 1)
+        self.assertTrue(importador.errores[0].startswith('Filas 2-3: otra carga'))
+        existente.refresh_from_db()
+        self.assertEqual((existente.estado, existente.fase), ('entregada', 'entregada'))
+        self.assertEqual(Entrega.objects.count(), 1)
+        self.assertEqual(
+            dict(ResumenEntregas.objects.filter(total__gt=0).values_list('estado', 'total')), {'entregada': 1},
+        )
+
+    def test_la_plantilla_se_carga_tal_cual(self):
+        usuario = User.objects.create_user('plantilla')
+        usuario.perfil.base = 'lampa'
+        usuario.perfil.save()
+        self.client.force_login(usuario)
+        respuesta = self.client.get(reverse('descargar_plantilla_entregas'))
+
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as archivo:
+            archivo.write(respuesta.content)
+        self.addCleanup(os.remove, archivo.name)
+        importador = ImportadorEntregas('lampa')
+        for bloque in leer_bloques(archivo.name):
+            importador.procesar(bloque, desplazamiento=0)
+        self.assertEqual(importador.errores, [])
+        self.assertEqual(importador.creados, 2)
+
+
+class DatosSinteticosTests(TestCase):
+    parametros = dict(conductores_por_base=4, supervisores_por_base=2, periodos=3, entregas=30, lote=7)
+
+    def entregas(self, antes):
+        # fase_actualizada se acota a la hora de la siembra: las que caen en el futuro difieren entre corridas
+        return [
+            (
+                entrega.numero_registro, entrega.conductor.nombre, entrega.supervisor.nombre, entrega.base,
+                entrega.periodo.trimestre, entrega.periodo.año, entrega.estado, entrega.fase,
+                entrega.fecha_entrega, min(entrega.fase_actualizada, antes),
+            )
+            for entrega in Entrega.objects.select_related('conductor', 'supervisor', 'periodo').order_by('numero_registro')
+        ]
+
+    def test_misma_semilla_mismos_datos(self):
+        antes = timezone.now()
+        corridas = []
+        for semilla in [42, 42, 7]:
+            with transaction.atomic():
+                creados = sembrar(semilla=semilla, **self.parametros)
+                corridas.append(self.entregas(antes))
+                transaction.set_rollback(True)
+        self.assertEqual(creados, {'supervisores': 4, 'conductores': 8, 'periodos': 4, 'entregas': 30})
+        self.assertEqual(len(corridas[0]), 30)
+        self.assertEqual(corridas[0], corridas[1])
+        self.assertNotEqual(corridas[0], corridas[2])
+
+    def test_resumen_y_versiones_al_dia(self):
+        versiones = {base: obtener_version(base) for base in ['lampa', 'calle_larga']}
+        sembrar(**self.parametros)
+        self.assertEqual(resumen_por_grupo(), grupos(Entrega.objects.all()))
+        for base, version in versiones.items():
+            self.assertGreater(obtener_version(base), version)
+
+        # Una segunda siembra crece por tramos: numeración y periodos continúan
+        versiones = {base: obtener_version(base) for base in versiones}
+        creados = sembrar(semilla=1, **self.parametros)
+        self.assertEqual(creados['periodos'], 0)
+        self.assertEqual(Entrega.objects.count(), 60)
+        self.assertTrue(Conductor.objects.filter(nombre='CONDUCTOR LAMPA 00007').exists())
+        self.assertEqual(resumen_por_grupo(), grupos(Entrega.objects.all()))
+        for base, version in versiones.items():
+            self.assertGreater(obtener_version(base), version)
+
+
+class AbrirPeriodoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = Periodo.objects.create(trimestre='Q2', año=2025)
+        Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        Conductor.objects.create(nombre='LUIS ROJAS', base='calle_larga')
+        cls.usuario = User.objects.create_user('lampa')
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('abrir_periodo', kwargs={'pk': self.periodo.pk})
+
+    def test_con_perfil_no_se_ofrecen_todas_las_bases(self):
+        form = self.client.get(self.url).context['form']
+        self.assertTrue(form.fields['base'].required)
+        self.assertEqual([clave for clave, _ in form.fields['base'].choices], ['lampa'])
+
+    def test_con_perfil_base_vacia_no_abre_todas_las_bases(self):
+        self.client.post(self.url, {'base': ''})
+        self.assertFalse(Entrega.objects.exists())
+
+        self.client.post(self.url, {'base': 'lampa'})
+        self.assertEqual(list(Entrega.objects.values_list('base', flat=True)), ['lampa'])
+
+
+class RespuestaCondicionalTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = Periodo.objects.create(trimestre='Q1', año=2025)
+        cls.ana = Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        cls.luis = Conductor.objects.create(nombre='LUIS ROJAS', base='calle_larga')
+        cls.usuario = User.objects.create_user('lampa')
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        self.url = reverse('dashboard')
+
+    def etag(self):
+        # La primera respuesta fija la cookie CSRF, que forma parte del ETag
+        self.client.get(self.url)
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('private', respuesta['Cache-Control'])
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+        return respuesta['ETag']
+
+    def test_304_sin_leer_entregas(self):
+        etag = self.etag()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertFalse([c['sql'] for c in consultas.captured_queries if 'core_entrega' in c['sql']])
+
+    def test_un_cambio_en_la_base_cambia_el_etag(self):
+        etag = self.etag()
+        crear_entrega(conductor=self.ana, periodo=self.periodo)
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_un_cambio_en_otra_base_no_invalida(self):
+        etag = self.etag()
+        crear_entrega(conductor=self.luis, periodo=self.periodo, base='calle_larga')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_otro_usuario_no_recibe_304(self):
+        etag = self.etag()
+        self.client.force_login(User.objects.create_user('otro'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class EstadisticasTests(TestCase):
+    """La agregación condicional da lo mismo que un .count() por estado y por fase."""
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar(conductores_por_base=5, supervisores_por_base=2, periodos=4, entregas=40, lote=50)
+        cls.anio = Periodo.objects.order_by('-año').values_list('año', flat=True).first()
+
+    def contar_por_separado(self, entregas):
+        return {
+            'total': entregas.count(),
+            'por_estado': {clave: entregas.filter(estado=clave).count() for clave, _ in Entrega.ESTADO_CHOICES},
+            'por_fase': {clave: entregas.filter(fase=clave).count() for clave, _ in Entrega.FASE_CHOICES},
+        }
+
+    def test_coincide_con_contar_por_separado(self):
+        for base in [None, 'lampa', 'calle_larga']:
+            for parametros in [
+                {}, {'estado': 'entregada'}, {'fase': 'en_firma'}, {'periodo': str(self.anio)},
+                {'conductor': '00001'}, {'supervisor': 'LAMPA'}, {'estado': 'pendiente', 'periodo': f'Q1 {self.anio}'},
+            ]:
+                with self.subTest(base=base, parametros=parametros):
+                    entregas = Entrega.objects.filter(base=base) if base else Entrega.objects.all()
+                    entregas = filtrar_entregas(entregas.order_by(*Entrega.ORDEN_RECIENTES), parametros)[0]
+                    esperado = self.contar_por_separado(entregas)
+                    with self.assertNumQueries(1):
+                        obtenido = calcular_estadisticas(entregas)
+                    self.assertEqual(obtenido, esperado)
+
+    def test_sin_entregas(self):
+        obtenido = calcular_estadisticas(Entrega.objects.none())
+        self.assertEqual(obtenido, self.contar_por_separado(Entrega.objects.none()))
+
+    def test_paginador_con_total_no_cuenta(self):
+        entregas = Entrega.objects.order_by(*Entrega.ORDEN_RECIENTES)
+        total = calcular_estadisticas(entregas)['total']
+        paginador = PaginadorConTotal(entregas, 15, total)
+        with self.assertNumQueries(1):
+            pagina = paginador.get_page(2)
+            self.assertEqual(len(pagina), 15)
+        self.assertEqual(paginador.num_pages, 3)
+
+
+class AnaliticaTests(TestCase):
+    """Clasificación y tasas de cumplimiento sobre DataFrames fijos, sin BD."""
+
+    ahora = datetime.datetime(2025, 4, 10, 12, tzinfo=datetime.timezone.utc)
+    periodos = [Periodo(pk=pk, trimestre=f'Q{pk}', año=2024) for pk in [1, 2, 3, 4]]
+
+    def entregas(self, filas):
+        """filas: (conductor_id, supervisor_id, periodo_id, estado, fase, días desde el cambio de fase o None)."""
+        df = pd.DataFrame(
+            [
+                (conductor, supervisor, periodo, estado, fase,
+                 None if dias is None else self.ahora - datetime.timedelta(days=dias))
+                for conductor, supervisor, periodo, estado, fase, dias in filas
+            ],
+            columns=['conductor_id', 'supervisor_id', 'periodo_id', 'estado', 'fase', 'fase_actualizada'],
+        )
+        df['fase_actualizada'] = pd.to_datetime(df['fase_actualizada'], utc=True)
+        df['resultado'] = clasificar(df)
+        return df
+
+    def test_clasificar(self):
+        casos = [
+            ('entregada', 'no_entregada', CUMPLIDA),
+            ('pendiente', 'entregada', CUMPLIDA),
+            ('entregada', 'licencia', CUMPLIDA),
+            ('sin_entregar', 'licencia', JUSTIFICADA),
+            ('en_curso', 'desvinculado', JUSTIFICADA),
+            ('en_curso', 'no_entregada', EN_PROCESO),
+            ('pendiente', 'en_firma', EN_PROCESO),
+            ('sin_entregar', 'no_entregada', INCUMPLIDA),
+            ('pendiente', 'no_entregada', INCUMPLIDA),
+        ]
+        df = pd.DataFrame([(estado, fase) for estado, fase, _ in casos], columns=['estado', 'fase'])
+        self.assertEqual(list(clasificar(df)), [resultado for _, _, resultado in casos])
+
+    def test_matriz_conductores(self):
+        df = self.entregas([
+            (1, None, 1, 'entregada', 'entregada', None),
+            (1, None, 2, 'pendiente', 'no_entregada', None),
+            (1, None, 3, 'sin_entregar', 'licencia', None),
+            (2, None, 1, 'pendiente', 'no_entregada', None),
+            (2, None, 2, 'sin_entregar', 'no_entregada', None),
+            (3, None, 1, 'en_curso', 'no_entregada', None),
+            (3, None, 2, 'pendiente', 'desvinculado', None),
+            (4, None, 1, 'entregada', 'entregada', None),
+            (4, None, 2, 'entregada', 'entregada', None),
+            (5, None, 1, 'entregada', 'entregada', None),
+            (5, None, 2, 'pendiente', 'entregada', None),
+            (5, None, 3, 'pendiente', 'no_entregada', None),
+        ])
+        matriz = matriz_conductores(df, self.periodos)
+        # Más incumplidas primero; a igual cantidad, menor tasa primero (sin tasa al final)
+        self.assertEqual(list(matriz.index), [2, 1, 5, 4, 3])
+        self.assertEqual(list(matriz['incumplidas']), [2, 1, 1, 0, 0])
+        self.assertEqual(list(matriz['cumplidas']), [0, 1, 2, 2, 0])
+        self.assertEqual(list(matriz['tasa'][:4]), [0.0, 0.5, 0.667, 1.0])
+        # Sin evaluables (en proceso y justificada) no hay tasa
+        self.assertTrue(pd.isna(matriz.loc[3, 'tasa']))
+        self.assertEqual(list(matriz.loc[1, [1, 2, 3]]), [CUMPLIDA, INCUMPLIDA, JUSTIFICADA])
+        # Sin entrega en el periodo: celda vacía, también en un periodo sin ninguna
+        self.assertTrue(pd.isna(matriz.loc[2, 3]))
+        self.assertTrue(matriz[4].isna().all())
+
+    def test_resumen_supervisores(self):
+        df = self.entregas([
+            (1, 10, 1, 'pendiente', 'en_firma', 2),
+            (2, 10, 1, 'pendiente', 'en_firma', 4),
+            (3, 10, 1, 'entregada', 'entregada', 30),
+            (4, 10, 1, 'pendiente', 'no_entregada', 30),
+            (5, 20, 1, 'pendiente', 'en_firma', None),
+            (6, 20, 1, 'pendiente', 'licencia', 1),
+            (7, None, 1, 'pendiente', 'no_entregada', 1),
+        ])
+        resumen = resumen_supervisores(df, self.ahora)
+        self.assertEqual(list(resumen.index), [10, 20])
+        diez, veinte = resumen.loc[10], resumen.loc[20]
+        self.assertEqual(
+            [diez[campo] for campo in ['entregas', 'cumplidas', 'evaluables', 'en_firma', 'en_firma_sin_fecha']],
+            [4, 1, 2, 2, 0],
+        )
+        self.assertEqual((diez['tasa'], diez['dias_en_firma_promedio'], diez['dias_en_firma_maximo']), (0.5, 3.0, 4.0))
+        # En firma sin fecha de cambio: se cuenta aparte y no entra en los días
+        self.assertEqual((veinte['entregas'], veinte['en_firma'], veinte['en_firma_sin_fecha']), (2, 1, 1))
+        self.assertTrue(pd.isna(veinte['tasa']))
+        self.assertTrue(pd.isna(veinte['dias_en_firma_promedio']))
+
+    def test_cumplimiento_por_periodo(self):
+        df = self.entregas([
+            (1, None, 1, 'entregada', 'entregada', None),
+            (2, None, 1, 'entregada', 'entregada', None),
+            (3, None, 1, 'pendiente', 'no_entregada', None),
+            (4, None, 1, 'pendiente', 'licencia', None),
+            (1, None, 2, 'pendiente', 'en_firma', None),
+        ])
+        tabla = cumplimiento_por_periodo(df, self.periodos)
+        self.assertEqual(list(tabla.index), [1, 2, 3, 4])
+        self.assertEqual(
+            list(tabla.loc[1, [CUMPLIDA, JUSTIFICADA, EN_PROCESO, INCUMPLIDA, 'tasa']]), [2, 1, 0, 1, 0.667],
+        )
+        self.assertEqual(list(tabla.loc[2, [EN_PROCESO, 'tasa']].isna()), [False, True])
+        self.assertEqual(tabla.loc[3, CUMPLIDA], 0)
+
+
+class ResumenEntregasTests(TestCase):
+    """El resumen mantenido por deltas coincide con contar las entregas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.q1 = Periodo.objects.create(trimestre='Q1', año=2025)
+        cls.q2 = Periodo.objects.create(trimestre='Q2', año=2025)
+        # Sin entregas al empezar: la carga masiva crea aquí
+        Periodo.objects.create(trimestre='Q3', año=2025)
+        cls.conductores = [
+            Conductor.objects.create(nombre=f'CONDUCTOR {i}', base=base)
+            for i, base in enumerate(['lampa', 'lampa', 'lampa', 'calle_larga'])
+        ]
+
+    def setUp(self):
+        self.entregas = [
+            crear_entrega(conductor=conductor, periodo=periodo, base=conductor.base)
+            for conductor in self.conductores
+            for periodo in [self.q1, self.q2]
+        ]
+
+    def assertResumenCoincide(self):
+        resumen = {
+            tuple(fila[campo] for campo in ['base', 'periodo_id', 'estado', 'fase']): fila['total']
+            for fila in ResumenEntregas.objects.filter(total__gt=0).values()
+        }
+        self.assertEqual(resumen, dict(grupos(Entrega.objects.all())))
+        for base in [None, 'lampa', 'calle_larga']:
+            entregas = Entrega.objects.filter(base=base) if base else Entrega.objects.all()
+            for parametros in [{}, {'periodo': 'Q1 2025'}, {'estado': 'entregada'}]:
+                esperado = calcular_estadisticas(filtrar_entregas(entregas, parametros)[0])
+                obtenido = estadisticas_desde_resumen(base, parametros)
+                self.assertEqual(obtenido['total'], esperado['total'], (base, parametros))
+                self.assertEqual(obtenido['por_estado'], esperado['por_estado'], (base, parametros))
+                self.assertEqual(obtenido['por_fase'], esperado['por_fase'], (base, parametros))
+
+    def test_crear(self):
+        self.assertResumenCoincide()
+
+    def test_guardar_cambia_de_grupo(self):
+        entrega = self.entregas[0]
+        entrega.estado = 'entregada'
+        entrega.fase = 'entregada'
+        entrega.save()
+        self.assertResumenCoincide()
+
+    def test_cambio_de_base_del_conductor_de_la_entrega(self):
+        entrega = Entrega.objects.get(pk=self.entregas[0].pk)
+        entrega.base = 'calle_larga'
+        entrega.save()
+        self.assertResumenCoincide()
+
+    def test_eliminar(self):
+        self.entregas[1].delete()
+        self.assertResumenCoincide()
+
+    def test_actualizacion_masiva(self):
+        actualizar_entregas(Entrega.objects.filter(base='lampa', periodo=self.q1), estado='entregada')
+        self.assertResumenCoincide()
+
+    def test_borrar_periodo_en_cascada(self):
+        self.q2.delete()
+        self.assertResumenCoincide()
+
+    def test_carga_masiva(self):
+        importador = ImportadorEntregas('lampa')
+        importador.procesar(pd.DataFrame([
+            {'conductor': 'CONDUCTOR 0', 'periodo': 'Q1 2025', 'estado': 'entregada'},
+            {'conductor': 'CONDUCTOR 1', 'periodo': 'Q3 2025', 'fase': 'en_firma'},
+        ], dtype=object))
+        self.assertEqual((importador.creados, importador.actualizados), (1, 1))
+        self.assertResumenCoincide()
+
+
+    def test_escrituras_en_bloque_leen_bloqueado(self):
+        usuario = User.objects.create_user('grilla')
+        usuario.perfil.base = 'lampa'
+        usuario.perfil.save()
+        self.client.force_login(usuario)
+        entrega = self.entregas[0]
+        with CaptureQueriesContext(connection) as grilla:
+            self.client.post(reverse('editar_entregas_grilla'), {
+                'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+                'form-0-id': entrega.pk, 'form-0-estado': 'pendiente', 'form-0-fase': 'en_firma',
+                'form-0-fecha_entrega': '', 'form-0-notas': '',
+            })
+        self.assertEqual(Entrega.objects.get(pk=entrega.pk).fase, 'en_firma')
+        with CaptureQueriesContext(connection) as lote:
+            lote_entregas([{'id': self.entregas[2].pk, 'estado': 'entregada'}], 'actualizar', base='lampa')
+        with CaptureQueriesContext(connection) as carga:
+            ImportadorEntregas('lampa').procesar(pd.DataFrame(
+                [{'conductor': 'CONDUCTOR 1', 'periodo': 'Q2 2025', 'fase': 'entregada'}], dtype=object,
+            ))
+        self.assertResumenCoincide()
+        if connection.features.has_select_for_update:
+            for consultas in [grilla, lote, carga]:
+                self.assertTrue(any(
+                    'FOR UPDATE' in consulta['sql'] and 'core_entrega' in consulta['sql']
+                    for consulta in consultas.captured_queries
+                ))
+
+
+class EdicionEntregasTests(TestCase):
+    """Edición masiva y grilla: alcance por la base de la entrega, resumen y versión."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = Periodo.objects.create(trimestre='Q1', año=2025)
+        cls.ana = crear_entrega(periodo=cls.periodo)
+        cls.luis = crear_entrega(periodo=cls.periodo)
+        cls.ajena = crear_entrega(periodo=cls.periodo, base='calle_larga')
+        cls.usuario = User.objects.create_user('edicion')
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def estados(self):
+        return dict(Entrega.objects.values_list('pk', 'estado'))
+
+    def assertResumenCoincide(self):
+        self.assertEqual(resumen_por_grupo(), dict(grupos(Entrega.objects.all())))
+
+    def masiva(self, entregas, **cambios):
+        return self.client.post(
+            reverse('edicion_masiva_entregas'), {'entregas': [entrega.pk for entrega in entregas], **cambios},
+        )
+
+    def grilla(self, *filas):
+        datos = {'form-TOTAL_FORMS': len(filas), 'form-INITIAL_FORMS': len(filas)}
+        for i, (entrega, cambios) in enumerate(filas):
+            valores = {'estado': entrega.estado, 'fase': entrega.fase, 'fecha_entrega': '', 'notas': '', **cambios}
+            datos[f'form-{i}-id'] = entrega.pk
+            datos.update({f'form-{i}-{campo}': valor for campo, valor in valores.items()})
+        return self.client.post(reverse('editar_entregas_grilla'), datos)
+
+    def test_masiva_rechaza_entregas_de_otra_base(self):
+        antes = self.estados()
+        respuesta = self.masiva([self.ana, self.ajena], estado='entregada')
+        self.assertRedirects(respuesta, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.estados(), antes)
+
+    def test_masiva_actualiza_filas_resumen_y_version(self):
+        version = obtener_version('lampa')
+        self.masiva([self.ana, self.luis], estado='entregada', fase='en_firma')
+        for entrega in [self.ana, self.luis]:
+            entrega.refresh_from_db()
+            self.assertEqual((entrega.estado, entrega.fase), ('entregada', 'en_firma'))
+        self.assertEqual(Entrega.objects.get(pk=self.ajena.pk).estado, 'pendiente')
+        self.assertResumenCoincide()
+        self.assertGreater(obtener_version('lampa'), version)
+
+    def test_grilla_rechaza_entregas_de_otra_base(self):
+        antes = self.estados()
+        respuesta = self.grilla((self.ajena, {'estado': 'entregada'}))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.estados(), antes)
+
+    def test_grilla_marca_fase_actualizada_solo_si_cambia_la_fase(self):
+        antes = {entrega.pk: entrega.fase_actualizada for entrega in [self.ana, self.luis]}
+        respuesta = self.grilla((self.ana, {'fase': 'en_firma'}), (self.luis, {'notas': 'sin cambio de fase'}))
+        self.assertEqual(respuesta.status_code, 302)
+        ana = Entrega.objects.get(pk=self.ana.pk)
+        luis = Entrega.objects.get(pk=self.luis.pk)
+        self.assertEqual(ana.fase, 'en_firma')
+        self.assertGreater(ana.fase_actualizada, antes[ana.pk])
+        self.assertEqual((luis.notas, luis.fase_actualizada), ('sin cambio de fase', antes[luis.pk]))
+        self.assertResumenCoincide()
+
+    def test_conductor_que_cambio_de_base(self):
+        # El dashboard lista la entrega por su base: también se puede editar
+        self.ana.conductor.base = 'calle_larga'
+        self.ana.conductor.save()
+        self.masiva([self.ana], estado='entregada')
+        self.assertEqual(Entrega.objects.get(pk=self.ana.pk).estado, 'entregada')
+        self.grilla((self.ana, {'fase': 'en_firma'}))
+        self.assertEqual(Entrega.objects.get(pk=self.ana.pk).fase, 'en_firma')
+
+
+class LotesApiTests(TestCase):
+    """POST <recurso>/lote/: modos, claves repetidas, todo_o_nada, alcance por base y resumen."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.q1 = Periodo.objects.create(trimestre='Q1', año=2025)
+        cls.q2 = Periodo.objects.create(trimestre='Q2', año=2025)
+        cls.ana = Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        cls.luis = Conductor.objects.create(nombre='LUIS ROJAS', base='lampa')
+        cls.pedro = Conductor.objects.create(nombre='PEDRO DIAZ', base='calle_larga')
+        cls.ajena = crear_entrega(conductor=cls.pedro, periodo=cls.q1, base='calle_larga')
+        cls.usuario = User.objects.create_user('integracion')
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def lote(self, recurso, modo, items, todo_o_nada=False, codigo=200):
+        respuesta = self.client.post(
+            reverse(f'api-{recurso}-lote'),
+            {'modo': modo, 'todo_o_nada': todo_o_nada, 'items': items},
+            content_type='application/json',
+        )
+        self.assertEqual(respuesta.status_code, codigo, respuesta.content)
+        return respuesta.json()
+
+    def resultados(self, datos):
+        return [item['resultado'] for item in datos['resultados']]
+
+    def test_crear_actualizar_y_upsert_de_entregas(self):
+        datos = self.lote('entregas', 'crear', [
+            {'conductor_id': self.ana.pk, 'periodo_id': self.q1.pk},
+            {'conductor_id': self.luis.pk, 'periodo_id': self.q1.pk, 'estado': 'en_curso'},
+        ])
+        self.assertEqual(self.resultados(datos), ['creado', 'creado'])
+        ana, luis = (Entrega.objects.get(pk=item['id']) for item in datos['resultados'])
+        self.assertEqual((ana.base, ana.estado, luis.estado), ('lampa', 'pendiente', 'en_curso'))
+        self.assertEqual(luis.numero_registro, ana.numero_registro + 1)
+
+        # Dos con el mismo cambio (un UPDATE por grupo) y una con un cambio propio (bulk_update)
+        tercera = crear_entrega(conductor=self.ana, periodo=self.q2)
+        datos = self.lote('entregas', 'actualizar', [
+            {'id': ana.pk, 'estado': 'entregada'},
+            {'id': luis.pk, 'estado': 'entregada'},
+            {'id': tercera.pk, 'notas': 'firmó tarde', 'fase': 'en_firma'},
+        ])
+        self.assertEqual(self.resultados(datos), ['actualizado'] * 3)
+        self.assertEqual(set(Entrega.objects.filter(pk__in=[ana.pk, luis.pk]).values_list('estado', flat=True)), {'entregada'})
+        tercera.refresh_from_db()
+        self.assertEqual((tercera.notas, tercera.fase, tercera.estado), ('firmó tarde', 'en_firma', 'pendiente'))
+
+        datos = self.lote('entregas', 'upsert', [
+            {'conductor_id': self.ana.pk, 'periodo_id': self.q1.pk, 'estado': 'entregada'},
+            {'conductor_id': self.luis.pk, 'periodo_id': self.q2.pk, 'fase': 'entregada'},
+            {'conductor_id': self.ana.pk, 'periodo_id': self.q2.pk, 'fase': 'entregada'},
+        ])
+        self.assertEqual(self.resultados(datos), ['sin_cambios', 'creado', 'actualizado'])
+        self.assertEqual(Entrega.objects.filter(base='lampa').count(), 4)
+        self.assertEqual(resumen_por_grupo(), dict(grupos(Entrega.objects.all())))
+
+    def test_crear_o_actualizar_lo_que_no_corresponde(self):
+        existente = crear_entrega(conductor=self.ana, periodo=self.q1)
+        datos = self.lote('entregas', 'crear', [{'conductor_id': self.ana.pk, 'periodo_id': self.q1.pk}])
+        self.assertEqual(self.resultados(datos), ['error'])
+        datos = self.lote('entregas', 'actualizar', [
+            {'conductor_id': self.luis.pk, 'periodo_id': self.q1.pk, 'estado': 'entregada'},
+            {'id': existente.pk, 'periodo_id': self.q2.pk},
+        ])
+        self.assertEqual(self.resultados(datos), ['error', 'error'])
+        self.assertEqual(Entrega.objects.filter(base='lampa').count(), 1)
+
+    def test_claves_repetidas_en_el_lote(self):
+        existente = crear_entrega(conductor=self.ana, periodo=self.q1)
+        datos = self.lote('entregas', 'upsert', [
+            {'conductor_id': self.luis.pk, 'periodo_id': self.q1.pk},
+            {'conductor_id': self.luis.pk, 'periodo_id': self.q1.pk, 'estado': 'entregada'},
+            {'id': existente.pk, 'estado': 'en_curso'},
+            {'conductor_id': self.ana.pk, 'periodo_id': self.q1.pk, 'estado': 'entregada'},
+        ])
+        self.assertEqual(self.resultados(datos), ['creado', 'error', 'actualizado', 'error'])
+        self.assertEqual(datos['resultados'][1]['errores']['non_field_errors'], [REPETIDO])
+        self.assertEqual(Entrega.objects.get(pk=existente.pk).estado, 'en_curso')
+        self.assertEqual(Entrega.objects.get(conductor=self.luis).estado, 'pendiente')
+
+        datos = self.lote('conductores', 'upsert', [{'nombre': 'Marta Paz'}, {'nombre': ' MARTA PAZ '}])
+        self.assertEqual(self.resultados(datos), ['creado', 'error'])
+        self.assertEqual(Conductor.objects.filter(nombre__iexact='marta paz').count(), 1)
+
+    def test_todo_o_nada(self):
+        datos = self.lote('entregas', 'crear', [
+            {'conductor_id': self.ana.pk, 'periodo_id': self.q1.pk},
+            {'conductor_id': self.luis.pk, 'periodo_id': self.q1.pk, 'estado': 'perdida'},
+        ], todo_o_nada=True, codigo=400)
+        self.assertEqual(self.resultados(datos), ['omitido', 'error'])
+        self.assertEqual(datos['resumen']['omitido'], 1)
+        self.assertFalse(Entrega.objects.filter(base='lampa').exists())
+
+        datos = self.lote('conductores', 'crear', [{'nombre': 'NUEVO'}, {}], todo_o_nada=True, codigo=400)
+        self.assertEqual(self.resultados(datos), ['omitido', 'error'])
+        self.assertFalse(Conductor.objects.filter(nombre='NUEVO').exists())
+
+    def test_registros_de_otra_base(self):
+        datos = self.lote('entregas', 'upsert', [
+            {'id': self.ajena.pk, 'estado': 'entregada'},
+            {'conductor_id': self.pedro.pk, 'periodo_id': self.q2.pk},
+        ])
+        self.assertEqual(self.resultados(datos), ['error', 'error'])
+        self.assertEqual(datos['resultados'][0]['errores'], {'id': [NO_PERMITIDO]})
+        self.assertEqual(datos['resultados'][1]['errores'], {'conductor_id': [NO_PERMITIDO]})
+        self.assertEqual(Entrega.objects.get(pk=self.ajena.pk).estado, 'pendiente')
+
+        datos = self.lote('conductores', 'upsert', [
+            {'id': self.pedro.pk, 'nombre': 'PEDRO DIAZ ROJAS'},
+            {'nombre': 'OTRA', 'base': 'calle_larga'},
+        ])
+        self.assertEqual(self.resultados(datos), ['error', 'error'])
+        self.assertEqual(Conductor.objects.get(pk=self.pedro.pk).nombre, 'PEDRO DIAZ')
+
+    @override_settings(METRICAS_UMBRAL_LENTO_MS=60000)
+    def test_limite_del_lote(self):
+        items = [{'nombre': f'CONDUCTOR {i}'} for i in range(MAXIMO_LOTE + 1)]
+        self.lote('conductores', 'crear', items, codigo=400)
+        datos = self.lote('conductores', 'crear', items[:MAXIMO_LOTE])
+        self.assertEqual(datos['resumen']['creado'], MAXIMO_LOTE)
+        self.assertEqual(Conductor.objects.filter(base='lampa').count(), MAXIMO_LOTE + 2)
+
+
+class LecturaApiTests(TestCase):
+    """Endpoints de lectura: alcance por base, filtros como el dashboard y recorrido por cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        sembrar(conductores_por_base=6, supervisores_por_base=2, periodos=4, entregas=48, lote=50)
+        cls.anio = Periodo.objects.order_by('-año').values_list('año', flat=True).first()
+        cls.usuario = User.objects.create_user('lectura')
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def recorrer(self, recurso, parametros=None, tamano=5):
+        """Ids de todas las páginas con "siguiente"; "anterior" vuelve por las mismas filas."""
+        paginas = [self.client.get(reverse(f'api-{recurso}-list'), {**(parametros or {}), 'tamano': tamano}).json()]
+        while paginas[-1]['siguiente']:
+            paginas.append(self.client.get(paginas[-1]['siguiente']).json())
+        ids = [fila['id'] for pagina in paginas for fila in pagina['resultados']]
+        atras = [paginas[-1]]
+        while atras[-1]['anterior']:
+            atras.append(self.client.get(atras[-1]['anterior']).json())
+        self.assertEqual([fila['id'] for pagina in reversed(atras) for fila in pagina['resultados']], ids)
+        return ids
+
+    def entregas(self, queryset=None):
+        queryset = Entrega.objects.filter(base='lampa') if queryset is None else queryset
+        return list(queryset.order_by(*Entrega.ORDEN_RECIENTES).values_list('pk', flat=True))
+
+    def test_usuario_con_perfil_solo_ve_su_base(self):
+        self.assertEqual(self.recorrer('entregas'), self.entregas())
+        for recurso, modelo in [('conductores', Conductor), ('supervisores', Supervisor)]:
+            with self.subTest(recurso=recurso):
+                ids = self.recorrer(recurso)
+                self.assertEqual(set(ids), set(modelo.objects.filter(base='lampa').values_list('pk', flat=True)))
+        self.assertEqual(len(self.recorrer('periodos')), Periodo.objects.count())
+        ajena = Entrega.objects.filter(base='calle_larga').first()
+        self.assertEqual(self.client.get(reverse('api-entregas-detail', args=[ajena.pk])).status_code, 404)
+        # Filtrar por otra base no la muestra
+        self.assertEqual(self.recorrer('entregas', {'base': 'calle_larga'}), [])
+
+        Perfil.objects.filter(user=self.usuario).delete()
+        self.assertEqual(self.recorrer('entregas', tamano=50), self.entregas(Entrega.objects.all()))
+
+    def test_filtros_como_el_dashboard(self):
+        for parametros in [
+            {'estado': 'entregada'},
+            {'fase': 'en_firma'},
+            {'periodo': f'Q1 {self.anio}'},
+            {'periodo': str(self.anio)},
+            {'conductor': 'lampa 00003'},
+            {'supervisor': 'lampa 001'},
+            {'estado': 'pendiente', 'periodo': str(self.anio)},
+        ]:
+            with self.subTest(parametros=parametros):
+                esperado = self.entregas(filtrar_entregas(Entrega.objects.filter(base='lampa'), parametros)[0])
+                self.assertTrue(esperado)
+                self.assertEqual(self.recorrer('entregas', parametros), esperado)
+
+    def test_filtros_propios_de_la_api(self):
+        entrega = Entrega.objects.filter(base='lampa', fecha_entrega__isnull=False).first()
+        lampa = Entrega.objects.filter(base='lampa')
+        for parametros, queryset in [
+            ({'conductor_id': entrega.conductor_id}, lampa.filter(conductor_id=entrega.conductor_id)),
+            ({'periodo_id': entrega.periodo_id}, lampa.filter(periodo_id=entrega.periodo_id)),
+            ({'fecha_desde': entrega.fecha_entrega}, lampa.filter(fecha_entrega__gte=entrega.fecha_entrega)),
+            ({'fecha_hasta': entrega.fecha_entrega}, lampa.filter(fecha_entrega__lte=entrega.fecha_entrega)),
+        ]:
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.recorrer('entregas', parametros), self.entregas(queryset))
+        self.assertEqual(
+            self.recorrer('conductores', {'nombre': '00002'}),
+            list(Conductor.objects.filter(base='lampa', nombre__icontains='00002').values_list('pk', flat=True)),
+        )
+        self.assertEqual(
+            self.recorrer('periodos', {'trimestre': 'Q1'}),
+            list(Periodo.objects.filter(trimestre='Q1').order_by('-año', 'id').values_list('pk', flat=True)),
+        )
+
+    def test_cursor_recorre_toda_la_lista(self):
+        for tamano in [1, 7, 500]:
+            with self.subTest(tamano=tamano):
+                self.assertEqual(self.recorrer('entregas', tamano=tamano), self.entregas())
+        self.assertEqual(
+            self.recorrer('conductores', tamano=4),
+            list(Conductor.objects.filter(base='lampa').order_by('nombre', 'id').values_list('pk', flat=True)),
+        )
+
+
+class ReferenciasTests(TestCase):
+    """Conductores creados por otro proceso (escrituras en bloque, sin invalidar esta caché)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = Periodo.objects.create(trimestre='Q1', año=2025)
+        cls.supervisor = Supervisor.objects.create(nombre='SUPERVISOR', base='lampa')
+        Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        cls.perfil = User.objects.create_user('lampa').perfil
+        cls.perfil.base = 'lampa'
+        cls.perfil.save()
+
+    def setUp(self):
+        caches['default'].clear()
+        CONDUCTORES.filas('lampa')
+
+    def form(self, conductor):
+        return EntregaForm({
+            'conductor': conductor.pk, 'periodo': self.periodo.pk, 'supervisor': self.supervisor.pk,
+            'estado': 'pendiente', 'fase': 'no_entregada',
+        }, user_profile=self.perfil)
+
+    def test_la_version_nueva_cambia_la_lista(self):
+        nuevo, = Conductor.objects.bulk_create([Conductor(nombre='LUIS ROJAS', base='lampa')])
+        incrementar_version('lampa')
+        self.assertIn(nuevo.pk, [valores[0] for valores, _ in CONDUCTORES.filas('lampa')])
+        self.assertIn((nuevo.pk, 'LUIS ROJAS (lampa)'), list(self.form(nuevo).fields['conductor'].choices))
+
+    def test_id_fuera_de_la_lista_se_busca_en_la_bd(self):
+        nuevo, = Conductor.objects.bulk_create([Conductor(nombre='LUIS ROJAS', base='lampa')])
+        form = self.form(nuevo)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['conductor'].pk, nuevo.pk)
+
+    def test_id_de_otra_base_sigue_siendo_invalido(self):
+        ajeno, = Conductor.objects.bulk_create([Conductor(nombre='LUIS ROJAS', base='calle_larga')])
+        form = self.form(ajeno)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['conductor'][0].code, 'invalid_choice')
+
+
+@override_settings(DEBUG=True)
+class InformePresupuestoTests(TestCase):
+
+    def setUp(self):
+        self.periodo = Periodo.objects.create(trimestre='Q1', año=2025)
+        self.usuario = User.objects.create_user('lampa', is_staff=True)
+        self.client.force_login(self.usuario)
+        self.url = reverse('editar_periodo', kwargs={'pk': self.periodo.pk})
+
+    def test_get_contra_el_presupuesto(self):
+        respuesta = self.client.get(self.url)
+        self.assertRegex(respuesta['X-Consultas-SQL'], rf'^\d+/{PRESUPUESTOS_CONSULTAS["editar_periodo"]}$')
+
+    def test_post_sin_presupuesto(self):
+        with self.assertNoLogs('core.middleware', level='WARNING'):
+            respuesta = self.client.post(self.url, {'trimestre': 'Q2', 'año': 2025})
+        self.assertRegex(respuesta['X-Consultas-SQL'], r'^\d+$')
+
+
+class MetricasTests(TestCase):
+
+    def ejecutar(self, medicion, sql, veces=1):
+        for _ in range(veces):
+            medicion.envoltura_sql(lambda *args: None, sql, [], False, {})
+
+    def test_huella_ignora_valores_y_largo_de_listas(self):
+        consultas = [
+            'SELECT "id" FROM "core_entrega" WHERE "conductor_id" IN (%s) AND "estado" = %s',
+            'SELECT "id" FROM "core_entrega" WHERE "conductor_id" IN (%s, %s, %s)  AND "estado" = %s',
+            'SELECT "id" FROM "core_entrega" WHERE "conductor_id" IN (%s,%s) AND "estado" = %s',
+        ]
+        self.assertEqual(len({huella(sql) for sql in consultas}), 1)
+        self.assertEqual(
+            huella('INSERT INTO "t" ("a") VALUES (%s), (%s), (%s)'), huella('INSERT INTO "t" ("a") VALUES (%s)')
+        )
+        self.assertEqual(huella("SELECT 1 WHERE a = 'x' LIMIT 21"), huella("SELECT 7 WHERE a = 'y''z' LIMIT 3"))
+        self.assertNotEqual(
+            huella('SELECT "id" FROM "core_entrega" WHERE "periodo_id" IN (%s)'),
+            huella('SELECT "id" FROM "core_conductor" WHERE "id" IN (%s)'),
+        )
+
+    @override_settings(METRICAS_N_MAS_1_MINIMO=3)
+    def test_n_mas_1_desde_el_minimo(self):
+        registro = RegistroMetricas()
+        repetida = 'SELECT * FROM "core_conductor" WHERE "id" = %s'
+        for veces, vista in [(2, 'bajo_minimo'), (3, 'en_minimo')]:
+            medicion = Medicion()
+            self.ejecutar(medicion, repetida.replace('%s', '1'))
+            self.ejecutar(medicion, repetida.replace('%s', '2'), veces - 1)
+            self.ejecutar(medicion, 'SELECT COUNT(*) FROM "core_entrega"')
+            registro.registrar(vista, 200, medicion, 0.01, medicion.repetidas())
+
+        self.assertEqual(dict(registro.n_mas_1), {('en_minimo', 'SELECT * FROM "core_conductor" WHERE "id" = ?'): 1})
+        self.assertEqual(registro.vistas['en_minimo'].consultas, 4)
+        exposicion = registro.exposicion()
+        self.assertIn('libretas_n_mas_1_total{vista="en_minimo",consulta=', exposicion)
+        self.assertNotIn('vista="bajo_minimo",consulta=', exposicion)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_metrics_solo_con_token_o_staff(self):
+        url = reverse('metricas')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.client.force_login(User.objects.create_user('externo'))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        respuesta = self.client.get(url, HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('# TYPE libretas_solicitudes_total counter', respuesta.content.decode())
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_metrics_sin_token_configurado(self):
+        # Con METRICAS_TOKEN vacío un "Bearer " vacío no autoriza
+        self.assertEqual(self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+
+class ParticionesTests(TestCase):
+    """Archivar y descartar por periodo; en SQLite copian y borran filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viejo = Periodo.objects.create(trimestre='Q1', año=2020)
+        cls.actual = Periodo.objects.create(trimestre='Q1', año=2025)
+        cls.conductores = [Conductor.objects.create(nombre=f'CONDUCTOR {i}', base='lampa') for i in range(3)]
+        for periodo in [cls.viejo, cls.actual]:
+            for conductor in cls.conductores:
+                crear_entrega(conductor=conductor, periodo=periodo)
+
+    def test_archivar_periodos(self):
+        numeros = set(Entrega.objects.filter(periodo=self.viejo).values_list('numero_registro', flat=True))
+        self.assertEqual(archivar_periodos([self.viejo]), 3)
+        self.assertFalse(Entrega.objects.filter(periodo=self.viejo).exists())
+        self.assertEqual(set(EntregaArchivada.objects.values_list('numero_registro', flat=True)), numeros)
+        self.assertFalse(ResumenEntregas.objects.filter(periodo=self.viejo, total__gt=0).exists())
+        self.assertEqual(Entrega.objects.filter(periodo=self.actual).count(), 3)
+
+    def test_descartar_entregas(self):
+        archivar_periodos([self.viejo])
+        descartar_entregas([self.viejo.pk])
+        self.assertFalse(EntregaArchivada.objects.exists())
+        self.assertEqual(Entrega.objects.count(), 3)
+
+    def test_ids_periodos_consulta_la_bd(self):
+        # bulk_create no invalida nada: un periodo de otro proceso
+        nuevo, = Periodo.objects.bulk_create([Periodo(trimestre='Q2', año=2025)])
+        self.assertEqual(ids_periodos('2025'), [self.actual.pk, nuevo.pk])
+        self.assertEqual(ids_periodos('Q2 2025'), [nuevo.pk])
+        self.assertEqual(ids_periodos('Enero 2020'), [self.viejo.pk])
+
+
+class ArchivoEntregasTests(TestCase):
+    """Archivo frío: ida y vuelta por el CSV, sin perder entregas que llegan mientras."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media = tempfile.mkdtemp()
+        cls.ajustes = override_settings(MEDIA_ROOT=cls.media)
+        cls.ajustes.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.ajustes.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = Periodo.objects.create(trimestre='Q1', año=2020)
+        for _ in range(3):
+            crear_entrega(periodo=cls.periodo)
+
+    def numeros_archivados(self):
+        return [fila[0] for fila in archivo.entregas_archivadas({'periodo': 'Q1 2020'})]
+
+    def archivar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archivo.archivar_periodo(self.periodo)
+
+    def test_archivar_y_volver_a_archivar(self):
+        numeros = list(Entrega.objects.filter(periodo=self.periodo).order_by('numero_registro')
+                       .values_list('numero_registro', flat=True))
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(archivo.archivar_periodo(self.periodo), 3)
+        # El archivo queda en su lugar recién al confirmar
+        ruta = archivo.ruta_archivo(ArchivoEntregas.objects.get(periodo=self.periodo))
+        self.assertFalse(os.path.exists(ruta))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(Entrega.objects.filter(periodo=self.periodo).exists())
+        self.assertEqual(self.numeros_archivados(), numeros)
+
+        nuevas = [crear_entrega(periodo=self.periodo) for _ in range(2)]
+        self.assertEqual(self.archivar(), 5)
+        self.assertEqual(self.numeros_archivados(), numeros + [entrega.numero_registro for entrega in nuevas])
+        self.assertEqual(ArchivoEntregas.objects.get(periodo=self.periodo).filas, 5)
+
+    def test_conserva_las_entregas_que_llegan_al_archivar(self):
+        descartar = archivo.descartar_entregas
+        llegadas = []
+
+        def llega_una_y_descarta(*args, **kwargs):
+            llegadas.append(crear_entrega(periodo=self.periodo))
+            descartar(*args, **kwargs)
+
+        with mock.patch.object(archivo, 'descartar_entregas', llega_una_y_descarta):
+            self.assertEqual(self.archivar(), 3)
+        self.assertEqual(list(Entrega.objects.filter(periodo=self.periodo)), llegadas)
+        self.assertNotIn(llegadas[0].numero_registro, self.numeros_archivados())
+
+        self.assertEqual(self.archivar(), 4)
+        self.assertIn(llegadas[0].numero_registro, self.numeros_archivados())
+
+    def test_sin_confirmar_no_toca_el_archivo(self):
+        self.archivar()
+        ruta = archivo.ruta_archivo(ArchivoEntregas.objects.get(periodo=self.periodo))
+        with open(ruta, 'rb') as anterior:
+            contenido = anterior.read()
+        crear_entrega(periodo=self.periodo)
+
+        with mock.patch.object(archivo, 'descartar_entregas', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.archivar()
+        with open(ruta, 'rb') as actual:
+            self.assertEqual(actual.read(), contenido)
+        self.assertFalse(os.path.exists(f'{ruta}.tmp'))
+        self.assertEqual(ArchivoEntregas.objects.get(periodo=self.periodo).filas, 3)
+        self.assertEqual(Entrega.objects.filter(periodo=self.periodo).count(), 1)
+
+
+class ExportacionesTests(TestCase):
+    """Exportaciones de entregas leídas de vuelta: filtros, columnas y entregas archivadas."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media = tempfile.mkdtemp()
+        cls.ajustes = override_settings(MEDIA_ROOT=cls.media)
+        cls.ajustes.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.ajustes.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.viejo = Periodo.objects.create(trimestre='Q1', año=2020)
+        cls.actual = Periodo.objects.create(trimestre='Q1', año=2025)
+        ana = Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        luis = Conductor.objects.create(nombre='LUIS ROJAS', base='lampa')
+        pedro = Conductor.objects.create(nombre='PEDRO DIAZ', base='calle_larga')
+        supervisora = Supervisor.objects.create(nombre='MARTA PAZ', base='lampa')
+        crear_entrega(
+            conductor=ana, periodo=cls.viejo, supervisor=supervisora, estado='entregada', fase='entregada',
+            fecha_entrega=datetime.date(2020, 2, 3), notas='firmó tarde',
+        )
+        crear_entrega(conductor=luis, periodo=cls.viejo)
+        crear_entrega(conductor=pedro, periodo=cls.viejo, base='calle_larga', estado='entregada')
+        with cls.captureOnCommitCallbacks(execute=True):
+            archivo.archivar_periodo(cls.viejo)
+        # Una entrega vigente del periodo archivado: se intercala con las del archivo
+        cls.tardia = crear_entrega(conductor=Conductor.objects.create(nombre='EVA RUIZ', base='lampa'), periodo=cls.viejo)
+        cls.en_curso = crear_entrega(conductor=ana, periodo=cls.actual, estado='en_curso', supervisor=supervisora)
+        crear_entrega(conductor=luis, periodo=cls.actual)
+        crear_entrega(conductor=pedro, periodo=cls.actual, base='calle_larga', estado='en_curso')
+        cls.usuario = User.objects.create_user('exportador')
+        cls.usuario.perfil.base = 'lampa'
+        cls.usuario.perfil.save()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def csv(self, **parametros):
+        respuesta = self.client.get(reverse('exportar_entregas_csv'), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        filas = list(csv.reader(io.StringIO(b''.join(respuesta.streaming_content).decode())))
+        self.assertEqual(filas[0], ENCABEZADOS_ENTREGAS)
+        return filas[1:]
+
+    def xlsx(self, **parametros):
+        respuesta = self.client.get(reverse('exportar_entregas_xls'), parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        libro = load_workbook(io.BytesIO(b''.join(respuesta.streaming_content)), read_only=True)
+        filas = [list(fila) for fila in libro['Entregas'].iter_rows(values_only=True)]
+        self.assertEqual(filas[0], ENCABEZADOS_ENTREGAS)
+        return filas[1:]
+
+    def test_csv_con_filtros_y_columnas(self):
+        lampa = etiquetas_base()['lampa']
+        self.assertEqual(self.csv(estado='en_curso'), [[
+            str(self.en_curso.numero_registro), 'Enero-Marzo 2025', '2025', 'Q1', lampa,
+            'ANA SOTO', 'MARTA PAZ', 'En curso', 'No entregada por el conductor', '', '',
+        ]])
+        # Sin filtro de periodo solo lo vigente de la base, por número de registro
+        self.assertEqual(
+            [fila[0] for fila in self.csv()],
+            [str(numero) for numero in Entrega.objects.filter(base='lampa').order_by('numero_registro')
+             .values_list('numero_registro', flat=True)],
+        )
+
+    def test_csv_intercala_las_archivadas(self):
+        filas = self.csv(periodo='Q1 2020')
+        self.assertEqual([fila[5] for fila in filas], ['ANA SOTO', 'LUIS ROJAS', 'EVA RUIZ'])
+        self.assertEqual([int(fila[0]) for fila in filas], sorted(int(fila[0]) for fila in filas))
+        self.assertEqual(filas[0][1:], [
+            'Enero-Marzo 2020', '2020', 'Q1', etiquetas_base()['lampa'], 'ANA SOTO', 'MARTA PAZ',
+            'Entregada', 'Entregada', '2020-02-03', 'firmó tarde',
+        ])
+        self.assertEqual(filas[1][6:10], ['N/A', 'Pendiente', 'No entregada por el conductor', ''])
+        # Los filtros también se aplican a las archivadas
+        self.assertEqual([fila[5] for fila in self.csv(periodo='2020', estado='entregada')], ['ANA SOTO'])
+
+    def test_xlsx_con_filtros_y_archivadas(self):
+        filas = self.xlsx(periodo='Q1 2020')
+        self.assertEqual([fila[5] for fila in filas], ['ANA SOTO', 'LUIS ROJAS', 'EVA RUIZ'])
+        self.assertEqual(filas[0][:3], [filas[0][0], 'Enero-Marzo 2020', 2020])
+        self.assertEqual(filas[0][7:], ['Entregada', 'Entregada', '2020-02-03', 'firmó tarde'])
+        self.assertEqual(filas[2][0], self.tardia.numero_registro)
+        self.assertEqual([fila[5] for fila in self.xlsx(conductor='ana')], ['ANA SOTO'])
+        self.assertEqual([fila[5] for fila in self.xlsx(periodo='2020', conductor='pedro')], [])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Particiones: solo PostgreSQL')
+class ParticionesPostgresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.periodo = Periodo.objects.create(trimestre='Q1', año=2020)
+        cls.conductor = Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+
+    def tabla_de(self, entrega):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT tableoid::regclass::text FROM {TABLA} WHERE id = %s', [entrega.pk])
+            return cursor.fetchone()[0]
+
+    def test_la_tabla_esta_particionada(self):
+        self.assertTrue(particionada())
+
+    def test_crear_periodo_crea_su_particion(self):
+        entrega = crear_entrega(conductor=self.conductor, periodo=self.periodo)
+        self.assertEqual(self.tabla_de(entrega), nombre_particion(self.periodo.pk))
+
+    def test_crear_particion_saca_las_filas_de_la_defecto(self):
+        # bulk_create no emite la señal que crea la partición
+        periodo, = Periodo.objects.bulk_create([Periodo(trimestre='Q2', año=2020)])
+        entrega = crear_entrega(conductor=self.conductor, periodo=periodo)
+        self.assertEqual(self.tabla_de(entrega), PARTICION_DEFECTO)
+
+        self.assertTrue(crear_particion(periodo.pk))
+        self.assertFalse(crear_particion(periodo.pk))
+        self.assertEqual(self.tabla_de(entrega), nombre_particion(periodo.pk))
+        self.assertEqual(Entrega.objects.get(pk=entrega.pk).numero_registro, entrega.numero_registro)
+
+    def test_archivar_mueve_la_particion_sin_fk(self):
+        entrega = crear_entrega(conductor=self.conductor, periodo=self.periodo)
+        archivar_periodos([self.periodo])
+        nombre = nombre_particion(self.periodo.pk)
+        self.assertNotIn(nombre, particiones(TABLA))
+        self.assertIn(nombre, particiones(TABLA_ARCHIVO))
+        self.assertEqual(EntregaArchivada.objects.get().numero_registro, entrega.numero_registro)
+        # El archivo no impide borrar el conductor
+        self.conductor.delete()
+        self.assertTrue(EntregaArchivada.objects.exists())
+
+    def test_descartar_borra_la_particion(self):
+        crear_entrega(conductor=self.conductor, periodo=self.periodo)
+        archivar_periodos([self.periodo])
+        descartar_entregas([self.periodo.pk])
+        nombre = nombre_particion(self.periodo.pk)
+        self.assertNotIn(nombre, particiones(TABLA))
+        self.assertNotIn(nombre, particiones(TABLA_ARCHIVO))
+        self.assertFalse(EntregaArchivada.objects.exists())
+
+    def test_numero_registro_unico_entre_particiones(self):
+        entrega = crear_entrega(conductor=self.conductor, periodo=self.periodo)
+        otro = Periodo.objects.create(trimestre='Q2', año=2020)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            crear_entrega(conductor=self.conductor, periodo=otro, numero_registro=entrega.numero_registro)
+        segunda = crear_entrega(conductor=self.conductor, periodo=otro)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Entrega.objects.filter(pk=segunda.pk).update(numero_registro=entrega.numero_registro)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Particiones: solo PostgreSQL')
+class MigracionParticionadaTests(TransactionTestCase):
+    """0013 ida y vuelta con datos: sin perder entregas vigentes ni archivadas."""
+
+    ANTERIOR = ('core', '0012_codigos_base_estado_fase')
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(destino or executor.loader.graph.leaf_nodes())
+
+    def test_revertir_y_volver_a_aplicar(self):
+        conductor = Conductor.objects.create(nombre='ANA SOTO', base='lampa')
+        viejo = Periodo.objects.create(trimestre='Q1', año=2020)
+        actual = Periodo.objects.create(trimestre='Q1', año=2025)
+        numeros = {
+            crear_entrega(conductor=conductor, periodo=periodo).numero_registro for periodo in [viejo, actual]
+        }
+        archivar_periodos([viejo])
+
+        self.migrar([self.ANTERIOR])
+        self.assertFalse(particionada())
+        self.assertEqual(set(Entrega.objects.values_list('numero_registro', flat=True)), numeros)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u')", [TABLA]
+            )
+            restricciones = {definicion for (definicion,) in cursor.fetchall()}
+        self.assertIn('UNIQUE (numero_registro)', restricciones)
+        self.assertIn('PRIMARY KEY (id)', restricciones)
+
+        self.migrar(None)
+        self.assertTrue(particionada())
+        self.assertEqual(set(Entrega.objects.values_list('numero_registro', flat=True)), numeros)
+        # La secuencia de ids sigue por delante de los existentes
+        crear_entrega(conductor=conductor, periodo=Periodo.objects.create(trimestre='Q2', año=2025))
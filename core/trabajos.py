@@ -0,0 +1,242 @@
+import csv
+import datetime
+import hashlib
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .archivo import entregas_archivadas
+from .exportaciones import ENCABEZADOS_ENTREGAS, escribir_xlsx, filas_entregas
+from .filtros import filtrar_entregas, normalizar_filtros
+from .importacion import ImportadorConductores, ImportadorEntregas
+from .lectores import contar_filas, leer_bloques, leer_filas
+from .models import Entrega, TrabajoExportacion, TrabajoImportacion
+from .versiones import obtener_version
+
+
+DIRECTORIO_EXPORTACIONES = 'exportaciones'
+DIRECTORIO_IMPORTACIONES = 'importaciones'
+
+# Un trabajo 'procesando' más antiguo que esto se considera abandonado (worker caído)
+TIEMPO_MAXIMO_PROCESANDO = datetime.timedelta(hours=1)
+
+# Filas por bloque: acota la memoria y define cada cuánto se informa el progreso
+TAMANO_BLOQUE_IMPORTACION = 5000
+
+IMPORTADORES = {
+    'conductores': ImportadorConductores,
+    'entregas': ImportadorEntregas,
+}
+
+
+def hash_parametros(base, formato, filtros):
+    datos = json.dumps({'base': base or '', 'formato': formato, 'filtros': filtros}, sort_keys=True)
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def solicitar_exportacion(usuario, base, formato, parametros):
+    """
+    Devuelve el trabajo que atiende la exportación pedida. Si ya existe un
+    archivo generado con los mismos parámetros y la misma versión de datos
+    se reutiliza tal cual; si hay uno en cola, se comparte; si no, se encola.
+    """
+    filtros = normalizar_filtros(parametros)
+    clave = hash_parametros(base, formato, filtros)
+    version = obtener_version(base)
+
+    # Un trabajo 'procesando' abandonado no se comparte: quedaría esperando para siempre
+    vigentes = Q(estado__in=['pendiente', 'terminado']) | Q(
+        estado='procesando', iniciado__gte=timezone.now() - TIEMPO_MAXIMO_PROCESANDO,
+    )
+    existentes = TrabajoExportacion.objects.filter(
+        vigentes, parametros=clave, version=version,
+    ).order_by('-creado')
+    for trabajo in existentes:
+        if trabajo.estado != 'terminado' or os.path.exists(ruta_absoluta(trabajo)):
+            return trabajo
+
+    return TrabajoExportacion.objects.create(
+        usuario=usuario,
+        base=base or '',
+        formato=formato,
+        filtros=filtros,
+        parametros=clave,
+        version=version,
+    )
+
+
+def ruta_absoluta(trabajo):
+    return os.path.join(settings.MEDIA_ROOT, trabajo.archivo)
+
+
+def generar_exportacion(trabajo):
+    """Genera el archivo del trabajo en MEDIA_ROOT con las mismas filas que la exportación directa."""
+    entregas = Entrega.objects.all()
+    if trabajo.base:
+        entregas = entregas.filter(base=trabajo.base)
+    entregas, _ = filtrar_entregas(entregas, trabajo.filtros)
+    archivadas = entregas_archivadas(trabajo.filtros, base=trabajo.base or None)
+
+    relativa = os.path.join(DIRECTORIO_EXPORTACIONES, f'{trabajo.parametros}-v{trabajo.version}.{trabajo.formato}')
+    destino = os.path.join(settings.MEDIA_ROOT, relativa)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+
+    contador = {'filas': 0}
+
+    def filas():
+        for fila in filas_entregas(entregas, archivadas=archivadas):
+            contador['filas'] += 1
+            yield fila
+
+    # Se escribe a un temporal y se renombra: nunca se sirve un archivo a medias
+    temporal = f'{destino}.{trabajo.pk}.tmp'
+    try:
+        if trabajo.formato == 'csv':
+            with open(temporal, 'w', newline='', encoding='utf-8') as archivo:
+                writer = csv.writer(archivo)
+                writer.writerow(ENCABEZADOS_ENTREGAS)
+                writer.writerows(filas())
+        else:
+            with open(temporal, 'wb') as archivo:
+                escribir_xlsx(archivo, "Entregas", ENCABEZADOS_ENTREGAS, filas())
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    trabajo.archivo = relativa
+    trabajo.filas = contador['filas']
+    trabajo.estado = 'terminado'
+    trabajo.terminado = timezone.now()
+    trabajo.save(update_fields=['archivo', 'filas', 'estado', 'terminado'])
+
+
+def vencer_abandonados(modelo, tiempo_maximo=TIEMPO_MAXIMO_PROCESANDO):
+    """
+    Marca con error los trabajos que llevan en 'procesando' más de
+    `tiempo_maximo` (el worker murió a mitad). No se reintentan: una
+    importación pudo quedar aplicada en parte, y una exportación que tumba
+    al worker lo volvería a tumbar. Devuelve cuántos marcó.
+    """
+    return modelo.objects.filter(
+        estado='procesando', iniciado__lt=timezone.now() - tiempo_maximo,
+    ).update(
+        estado='error',
+        error='El trabajo se interrumpió (superó el tiempo máximo de procesamiento).',
+        terminado=timezone.now(),
+    )
+
+
+def tomar_siguiente_trabajo(modelo=TrabajoExportacion):
+    """
+    Reserva el trabajo pendiente más antiguo del modelo indicado. El UPDATE
+    condicionado al estado garantiza que dos workers no tomen el mismo.
+    Antes libera los que quedaron abandonados en 'procesando'.
+    """
+    vencer_abandonados(modelo)
+    while True:
+        pk = (
+            modelo.objects.filter(estado='pendiente')
+            .order_by('creado')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        if modelo.objects.filter(pk=pk, estado='pendiente').update(estado='procesando', iniciado=timezone.now()):
+            return modelo.objects.get(pk=pk)
+
+
+def procesar_trabajo(trabajo):
+    try:
+        if isinstance(trabajo, TrabajoImportacion):
+            procesar_importacion(trabajo)
+        else:
+            generar_exportacion(trabajo)
+    except Exception as e:
+        trabajo.estado = 'error'
+        trabajo.error = str(e)
+        trabajo.terminado = timezone.now()
+        trabajo.save(update_fields=['estado', 'error', 'terminado'])
+
+
+# --- IMPORTACIONES ---
+def encolar_importacion(usuario, base, tipo, archivo_subido):
+    """Guarda el archivo subido en MEDIA_ROOT y crea el trabajo de importación."""
+    extension = os.path.splitext(archivo_subido.name)[1].lower()
+    relativa = os.path.join(DIRECTORIO_IMPORTACIONES, f'{uuid.uuid4().hex}{extension}')
+    destino = os.path.join(settings.MEDIA_ROOT, relativa)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, 'wb') as archivo:
+        for bloque in archivo_subido.chunks():
+            archivo.write(bloque)
+
+    return TrabajoImportacion.objects.create(
+        usuario=usuario,
+        base=base,
+        tipo=tipo,
+        archivo=relativa,
+        nombre_original=archivo_subido.name[:255],
+    )
+
+
+def procesar_importacion(trabajo, tamano_bloque=TAMANO_BLOQUE_IMPORTACION):
+    """
+    Lee el archivo por bloques (sin cargarlo completo) y aplica cada bloque
+    con el importador del tipo. Tras cada bloque se guarda el progreso.
+    """
+    ruta = os.path.join(settings.MEDIA_ROOT, trabajo.archivo)
+    importador_clase = IMPORTADORES[trabajo.tipo]
+    try:
+        encabezados, _ = leer_filas(ruta)
+        for columna in importador_clase.COLUMNAS_REQUERIDAS:
+            if columna not in encabezados:
+                raise ValueError(f'La columna "{columna}" es requerida en el archivo.')
+
+        trabajo.total_filas = contar_filas(ruta)
+        trabajo.save(update_fields=['total_filas'])
+
+        importador = importador_clase(trabajo.base)
+        for bloque in leer_bloques(ruta, tamano_bloque):
+            # El índice del bloque ya es el número de fila del archivo
+            importador.procesar(bloque, desplazamiento=0)
+            trabajo.filas_procesadas += len(bloque)
+            trabajo.creados = importador.creados
+            trabajo.actualizados = importador.actualizados
+            trabajo.total_errores = len(importador.errores)
+            trabajo.errores = importador.errores[:TrabajoImportacion.MAXIMO_ERRORES]
+            trabajo.save(update_fields=[
+                'filas_procesadas', 'creados', 'actualizados', 'total_errores', 'errores',
+            ])
+
+        trabajo.estado = 'terminado'
+        trabajo.terminado = timezone.now()
+        trabajo.save(update_fields=['estado', 'terminado'])
+    finally:
+        if os.path.exists(ruta):
+            os.remove(ruta)
+
+
+def purgar_obsoletos(gracia=datetime.timedelta(hours=1)):
+    """
+    Elimina archivos y trabajos terminados cuya versión de datos ya no es la
+    actual (nunca volverán a servirse desde caché). Devuelve cuántos borró.
+    """
+    limite = timezone.now() - gracia
+    versiones = {}
+    borrados = 0
+    candidatos = TrabajoExportacion.objects.filter(estado__in=['terminado', 'error'], terminado__lt=limite)
+    for trabajo in candidatos.iterator():
+        if trabajo.base not in versiones:
+            versiones[trabajo.base] = obtener_version(trabajo.base)
+        if trabajo.estado == 'terminado' and trabajo.version == versiones[trabajo.base]:
+            continue
+        if trabajo.archivo and os.path.exists(ruta_absoluta(trabajo)):
+            os.remove(ruta_absoluta(trabajo))
+        trabajo.delete()
+        borrados += 1
+    return borrados
@@ -8,6 +8,8 @@ urlpatterns = [
      #ENTREGAS
     path('crear/', crear_entrega, name='crear_entrega'),
     path('entregas/<int:pk>/editar/', editar_entrega, name='editar_entrega'),
+    path('entregas/edicion-masiva/', edicion_masiva_entregas, name='edicion_masiva_entregas'),
+    path('entregas/grilla/', editar_entregas_grilla, name='editar_entregas_grilla'),
     #CONDUCTORES
     path('conductores/', listar_conductores, name='listar_conductores'),
     path('conductores/nuevo/', crear_conductor, name='crear_conductor'),
@@ -23,12 +25,21 @@ urlpatterns = [
     path('periodos/nuevo/', crear_periodo, name='crear_periodo'),
     path('periodos/<int:pk>/editar/', editar_periodo, name='editar_periodo'),
     path('periodos/<int:pk>/eliminar/', eliminar_periodo, name='eliminar_periodo'),
+    path('periodos/<int:pk>/abrir/', abrir_periodo, name='abrir_periodo'),
     #EXPORTAR PERIODOS
     path('periodos/exportar/csv/', exportar_periodos_csv, name='exportar_periodos_csv'),
     path('periodos/exportar/excel/', exportar_periodos_xls, name='exportar_periodos_xls'),
     #EXPORTAR ENTREGAS
     path('entregas/exportar/csv/', exportar_entregas_csv, name='exportar_entregas_csv'),
     path('entregas/exportar/excel/', exportar_entregas_xls, name='exportar_entregas_xls'),
+    #ANALÍTICA
+    path('analitica/', analitica, name='analitica'),
+    #MÉTRICAS (Prometheus)
+    path('metrics/', metricas, name='metricas'),
+    #EXPORTACIONES EN SEGUNDO PLANO
+    path('entregas/exportar/segundo-plano/', solicitar_exportacion, name='solicitar_exportacion'),
+    path('exportaciones/<int:pk>/estado/', estado_exportacion, name='estado_exportacion'),
+    path('exportaciones/<int:pk>/descargar/', descargar_exportacion, name='descargar_exportacion'),
 
     #entregas edicion y eliminacion
     path('entregas/editar/<int:pk>/', editar_entrega, name='editar_entrega'),
@@ -36,6 +47,11 @@ urlpatterns = [
 
     #CONDUCTORES carga masiva
     path('conductores/carga-masiva/', carga_masiva_conductores, name='carga_masiva_conductores'),
+    path('conductores/carga-masiva/<int:pk>/estado/', estado_importacion, name='estado_importacion'),
     path('conductores/descargar-plantilla/', descargar_plantilla_conductores, name='descargar_plantilla_conductores'),
 
+    #ENTREGAS carga masiva
+    path('entregas/carga-masiva/', carga_masiva_entregas, name='carga_masiva_entregas'),
+    path('entregas/descargar-plantilla/', descargar_plantilla_entregas, name='descargar_plantilla_entregas'),
+
 ]
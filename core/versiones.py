@@ -0,0 +1,42 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from accounts.bases import codigos_base
+from .models import VersionDatos
+
+
+def obtener_version(base=None):
+    """
+    Versión actual de los datos de una base. Sin base (usuarios sin perfil,
+    que ven todas las bases) devuelve la suma de todas las versiones, que
+    también cambia cada vez que cambia cualquiera de ellas.
+    """
+    if base:
+        return VersionDatos.objects.filter(base=base).values_list('version', flat=True).first() or 0
+    return VersionDatos.objects.aggregate(total=Sum('version'))['total'] or 0
+
+
+def incrementar_version(*bases):
+    """Marca como modificados los datos de las bases indicadas."""
+    for base in set(filter(None, bases)):
+        if VersionDatos.objects.filter(base=base).update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                VersionDatos.objects.create(base=base, version=1)
+        except IntegrityError:
+            # Otro proceso creó la fila entre el UPDATE y el INSERT
+            VersionDatos.objects.filter(base=base).update(version=F('version') + 1)
+
+
+def incrementar_todas():
+    """Para cambios globales (periodos), que se ven en todas las bases."""
+    incrementar_version(*codigos_base())
+
+
+def bases_afectadas(objetos):
+    """Bases actuales y originales de instancias guardadas en bloque."""
+    bases = set()
+    for objeto in objetos:
+        bases |= objeto.bases_afectadas
+    return bases
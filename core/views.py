@@ -1,27 +1,65 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, FileResponse, Http404
+from django.urls import reverse
 from django.core.paginator import Paginator
+from django.db import transaction
 from django.db.models import Q
+from django.utils.crypto import constant_time_compare
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
 import pandas as pd
-import csv
+import os
 from io import BytesIO
-from openpyxl import Workbook
-
-from .models import Entrega, Conductor, Supervisor, Periodo
+from itertools import zip_longest
+from openpyxl.worksheet.datavalidation import DataValidation
+
+from .models import Entrega, Conductor, Supervisor, Periodo, TrabajoExportacion, TrabajoImportacion
+from .estadisticas import calcular_estadisticas, PaginadorConTotal
+from .paginacion import PaginadorKeyset, usa_keyset, enlaces_keyset
+from .filtros import filtrar_entregas, normalizar_filtros
+from .archivo import entregas_archivadas
+from .exportaciones import (
+    ENCABEZADOS_ENTREGAS,
+    ENCABEZADOS_PERIODOS,
+    filas_entregas,
+    filas_periodos,
+    respuesta_csv_streaming,
+    respuesta_xlsx,
+)
+from .trabajos import (
+    solicitar_exportacion as solicitar_exportacion_trabajo,
+    ruta_absoluta as ruta_exportacion,
+    encolar_importacion,
+)
+from .periodos import abrir_periodo as abrir_periodo_entregas
+from .analitica import (
+    PERIODOS_POR_DEFECTO,
+    MINIMO_INCUMPLIDAS,
+    analitica_cumplimiento as calcular_analitica,
+)
+from .resumen import actualizar_entregas, aplicar_deltas, deltas_modificadas, estadisticas_desde_resumen
+from .versiones import incrementar_version, obtener_version
+from .referencias import CONDUCTORES, SUPERVISORES
+from .metricas import registro as registro_metricas
+from .condicional import condicional_por_version, todas_las_bases
 from .forms import (
     EntregaForm,
     EntregaEstadoForm,
     ConductorForm,
     SupervisorForm,
     PeriodoForm,
-    CargaMasivaConductoresForm
+    CargaMasivaConductoresForm,
+    CargaMasivaEntregasForm,
+    AbrirPeriodoForm,
+    EdicionMasivaEntregasForm,
+    EntregaGrillaFormSet,
 )
 
 def inicio(request):
     if request.user.is_authenticated:
-        perfil = getattr(request.user, 'perfil', None)
+        perfil = request.perfil
         if perfil:
             return redirect('dashboard')
         else:
@@ -30,79 +68,178 @@ def inicio(request):
 
     
 @login_required
+@condicional_por_version()
 def dashboard(request):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     # Obtener todas las entregas filtradas por base del usuario
-    entregas = Entrega.objects.select_related('conductor', 'supervisor').order_by('-fecha_entrega')
+    entregas = Entrega.objects.select_related('conductor', 'supervisor', 'periodo').order_by(*Entrega.ORDEN_RECIENTES)
     
     if perfil:
-        entregas = entregas.filter(conductor__base=perfil.base)
+        # Misma columna que las exportaciones: permite usar los índices (base, ...)
+        entregas = entregas.filter(base=perfil.base)
     
     # --- FILTROS ---
-    filtro_estado = request.GET.get('estado')
-    filtro_fase = request.GET.get('fase')
-    filtro_periodo = request.GET.get('periodo')
-    filtro_conductor = request.GET.get('conductor')
-    filtro_supervisor = request.GET.get('supervisor')
+    entregas, filtros_aplicados = filtrar_entregas(entregas, request.GET)
     
-    # Aplicar filtros si existen
-    if filtro_estado:
-        entregas = entregas.filter(estado=filtro_estado)
-    
-    if filtro_fase:
-        entregas = entregas.filter(fase=filtro_fase)
-    
-    if filtro_periodo:
-        entregas = entregas.filter(periodo__icontains=filtro_periodo)
-    
-    if filtro_conductor:
-        entregas = entregas.filter(conductor__nombre__icontains=filtro_conductor)
-    
-    if filtro_supervisor:
-        entregas = entregas.filter(supervisor__nombre__icontains=filtro_supervisor)
+    # --- ESTADÍSTICAS ---
+    # Desde la tabla de resumen si los filtros lo permiten; si no, una consulta agregada
+    estadisticas = estadisticas_desde_resumen(perfil.base if perfil else None, request.GET)
+    if estadisticas is None:
+        estadisticas = calcular_estadisticas(entregas)
+    total_entregas = estadisticas['total']
+    entregas_pendientes = estadisticas['por_estado']['pendiente']
+    entregas_entregadas = estadisticas['por_estado']['entregada']
     
     # --- PAGINACIÓN ---
-    paginator = Paginator(entregas, 10)  # 10 entregas por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # --- ESTADÍSTICAS ---
-    total_entregas = entregas.count()
-    entregas_pendientes = entregas.filter(estado='pendiente').count()
-    entregas_entregadas = entregas.filter(estado='entregada').count()
+    enlaces_cursor = None
+    if usa_keyset(request):
+        # Modo cursor: orden estable (fecha_entrega, numero_registro), sin COUNT ni OFFSET
+        paginador = PaginadorKeyset(entregas, ['-fecha_entrega', '-numero_registro'], 10)
+        page_obj = paginador.get_page(request.GET.get('cursor'))
+        enlaces_cursor = enlaces_keyset(request, page_obj)
+    else:
+        # Reutiliza el total de las estadísticas, sin COUNT adicional
+        paginator = PaginadorConTotal(entregas, 10, total_entregas)  # 10 entregas por página
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     
     # Obtener opciones para los filtros
     estados = Entrega._meta.get_field('estado').choices
     fases = Entrega._meta.get_field('fase').choices
     
-    # Obtener conductores y supervisores únicos para filtros
-    conductores = Conductor.objects.filter(base=perfil.base).order_by('nombre') if perfil else Conductor.objects.none()
-    supervisores = Supervisor.objects.filter(base=perfil.base).order_by('nombre') if perfil else Supervisor.objects.none()
+    # Nombres de conductores y supervisores de la base para los filtros (caché de referencias)
+    conductores, supervisores = [], []
+    if perfil:
+        version = obtener_version(perfil.base)
+        conductores = [valores[1] for valores, _ in CONDUCTORES.filas(perfil.base, version)]
+        supervisores = [valores[1] for valores, _ in SUPERVISORES.filas(perfil.base, version)]
     
     context = {
         'perfil': perfil,
         'total_entregas': total_entregas,
         'entregas_pendientes': entregas_pendientes,
         'entregas_entregadas': entregas_entregadas,
+        'estadisticas_estado': [
+            (etiqueta, estadisticas['por_estado'][clave]) for clave, etiqueta in Entrega.ESTADO_CHOICES
+        ],
+        'estadisticas_fase': [
+            (etiqueta, estadisticas['por_fase'][clave]) for clave, etiqueta in Entrega.FASE_CHOICES
+        ],
         'page_obj': page_obj,
+        'enlaces_cursor': enlaces_cursor,
         'estados': estados,
         'fases': fases,
         'conductores': conductores,
         'supervisores': supervisores,
-        'filtros_aplicados': any([filtro_estado, filtro_fase, filtro_periodo, filtro_conductor, filtro_supervisor]),
+        'filtros_aplicados': filtros_aplicados,
+        'filtros_exportacion': normalizar_filtros(request.GET),
+        'consulta_filtros': urlencode(normalizar_filtros(request.GET)),
+        'formatos_exportacion': TrabajoExportacion.FORMATO_CHOICES,
     }
     
     return render(request, 'core/dashboard.html', context)
 
 
+def _entregas_permitidas(request):
+    """
+    Entregas que el usuario puede modificar: las de su base, las mismas que
+    le lista el dashboard (Entrega.base, no la base actual del conductor).
+    """
+    perfil = request.perfil
+    entregas = Entrega.objects.all()
+    if perfil:
+        entregas = entregas.filter(base=perfil.base)
+    return entregas
+
+
+def _volver_a(request, por_defecto='dashboard'):
+    """Redirige a `siguiente` (la vista de origen con sus filtros) si es una URL local."""
+    siguiente = request.POST.get('siguiente') or request.GET.get('siguiente')
+    if siguiente and url_has_allowed_host_and_scheme(siguiente, allowed_hosts={request.get_host()}):
+        return redirect(siguiente)
+    return redirect(por_defecto)
+
+
+@login_required
+def edicion_masiva_entregas(request):
+    if request.method != 'POST':
+        return redirect('dashboard')
+
+    form = EdicionMasivaEntregasForm(request.POST, queryset=_entregas_permitidas(request))
+    if not form.is_valid():
+        for errores in form.errors.values():
+            for error in errores:
+                messages.error(request, error)
+        return _volver_a(request)
+
+    entregas = form.cleaned_data['entregas']
+    cambios = form.cambios()
+    with transaction.atomic():
+        bases = set(entregas.values_list('base', flat=True).distinct())
+        # Un solo UPDATE para toda la selección (y el resumen por grupos)
+        actualizadas = actualizar_entregas(entregas, **cambios)
+        # update() no emite señales: se invalida la caché a mano
+        incrementar_version(*bases)
+
+    messages.success(request, f'{actualizadas} entregas actualizadas correctamente.')
+    return _volver_a(request)
+
+
+@login_required
+def editar_entregas_grilla(request):
+    permitidas = _entregas_permitidas(request).select_related('conductor', 'periodo')
+    page_obj = None
+
+    if request.method == 'POST':
+        # Solo se cargan las filas enviadas; un id ajeno a la base no valida
+        ids = [
+            valor for clave, valor in request.POST.items()
+            if clave.startswith('form-') and clave.endswith('-id') and valor.isdigit()
+        ]
+        with transaction.atomic():
+            # Filas bloqueadas desde la lectura: los cambios y el resumen parten de lo que hay en la BD
+            formset = EntregaGrillaFormSet(
+                request.POST, queryset=permitidas.filter(pk__in=ids).select_for_update(of=('self',)),
+            )
+            valido = formset.is_valid()
+            if valido:
+                formularios = [form for form in formset.forms if form.has_changed()]
+                modificadas = [form.save(commit=False) for form in formularios]
+                for entrega in modificadas:
+                    entrega.sellar_fase()
+                campos = sorted({campo for form in formularios for campo in form.changed_data}) + ['fase_actualizada']
+                # bulk_update por lotes: un UPDATE por cada 500 filas en lugar de un save() por fila
+                Entrega.objects.bulk_update(modificadas, campos, batch_size=500)
+                aplicar_deltas(deltas_modificadas(modificadas))
+                if modificadas:
+                    incrementar_version(*{entrega.base for entrega in modificadas})
+        if valido:
+            messages.success(request, f'{len(modificadas)} entregas actualizadas correctamente.')
+            return _volver_a(request)
+        messages.error(request, 'Revisa los errores marcados en la grilla.')
+    else:
+        entregas, _ = filtrar_entregas(
+            permitidas.order_by(*Entrega.ORDEN_RECIENTES),
+            request.GET,
+        )
+        page_obj = Paginator(entregas, 25).get_page(request.GET.get('page'))
+        formset = EntregaGrillaFormSet(queryset=entregas.filter(pk__in=[entrega.pk for entrega in page_obj]))
+
+    return render(request, 'core/editar_entregas_grilla.html', {
+        'formset': formset,
+        'page_obj': page_obj,
+        'siguiente': request.POST.get('siguiente') or request.get_full_path(),
+    })
+
+
 @login_required
 def crear_entrega(request):
     if request.method == 'POST':
-        form = EntregaForm(request.POST)
+        form = EntregaForm(request.POST, user_profile=request.perfil)
         if form.is_valid():
             entrega = form.save(commit=False)
-            perfil = getattr(request.user, 'perfil', None)
+            perfil = request.perfil
             if perfil:
                 entrega.base = perfil.base
             elif entrega.conductor_id:
@@ -110,7 +247,7 @@ def crear_entrega(request):
             entrega.save()
             return redirect('dashboard')
     else:
-        form = EntregaForm()
+        form = EntregaForm(user_profile=request.perfil)
     return render(
         request,
         'core/crear_entrega.html',
@@ -147,8 +284,8 @@ def eliminar_entrega(request, pk):
             entrega = get_object_or_404(Entrega, pk=pk)
             
             # Verificar permisos
-            perfil = getattr(request.user, 'perfil', None)
-            if perfil and entrega.conductor.base != perfil.base:
+            perfil = request.perfil
+            if perfil and entrega.base != perfil.base:
                 messages.error(request, 'No tienes permisos para eliminar esta entrega.')
                 return redirect('dashboard')
             
@@ -168,8 +305,8 @@ def eliminar_entrega(request, pk):
             entrega = get_object_or_404(Entrega, pk=pk)
             
             # Verificar permisos
-            perfil = getattr(request.user, 'perfil', None)
-            if perfil and entrega.conductor.base != perfil.base:
+            perfil = request.perfil
+            if perfil and entrega.base != perfil.base:
                 messages.error(request, 'No tienes permisos para eliminar esta entrega.')
                 return redirect('dashboard')
             
@@ -194,7 +331,7 @@ def eliminar_entrega(request, pk):
 @login_required
 def crear_conductor(request):
     # Obtener el perfil del usuario logueado
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     # 1. Crear la instancia del formulario, enviando el perfil si es necesario
     if request.method == 'POST':
@@ -227,11 +364,17 @@ def crear_conductor(request):
         'core/crear_conductor.html',
         {'form': form},
     )
+def _base_filtrada(request):
+    # El listado de conductores muestra todas las bases salvo que se filtre por una
+    return request.GET.get('base') or None
+
+
 @login_required
+@condicional_por_version(alcance=_base_filtrada)
 def listar_conductores(request):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
-    conductores = Conductor.objects.select_related('perfil').order_by('nombre')
+    conductores = Conductor.objects.select_related('perfil__user').order_by('nombre')
     
     # APLICAR FILTRO POR BASE
     #if perfil:
@@ -243,10 +386,15 @@ def listar_conductores(request):
         conductores = conductores.filter(base=base_filter)
         
     # Agregar paginación si no la tienes
-    from django.core.paginator import Paginator
-    paginator = Paginator(conductores, 15)  # 15 items por página
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    enlaces_cursor = None
+    if usa_keyset(request):
+        paginador = PaginadorKeyset(conductores, ['nombre', 'id'], 15)
+        page_obj = paginador.get_page(request.GET.get('cursor'))
+        enlaces_cursor = enlaces_keyset(request, page_obj)
+    else:
+        paginator = Paginator(conductores, 15)  # 15 items por página
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
     
     # Obtener las opciones de base para el filtro
     from django.db.models import TextChoices
@@ -259,13 +407,14 @@ def listar_conductores(request):
         {
             #'conductores': conductores,
             'page_obj': page_obj,
+            'enlaces_cursor': enlaces_cursor,
             'base_choices': base_choices,  # ← Agregar esto
         },
     )
 
 @login_required
 def editar_conductor(request, pk):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     conductor = get_object_or_404(Conductor, pk=pk)
     
@@ -293,7 +442,7 @@ def editar_conductor(request, pk):
     )
 @login_required
 def eliminar_conductor(request, pk):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     conductor = get_object_or_404(Conductor, pk=pk)
     
     # VERIFICAR QUE EL CONDUCTOR PERTENECE A LA BASE DEL USUARIO
@@ -315,7 +464,7 @@ def eliminar_conductor(request, pk):
     
 @login_required
 def crear_supervisor(request):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     if request.method == 'POST':
         form = SupervisorForm(request.POST)
@@ -334,26 +483,32 @@ def crear_supervisor(request):
     )
 
 @login_required
+@condicional_por_version(alcance=todas_las_bases)
 def listar_supervisores(request):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     supervisores = Supervisor.objects.order_by('nombre')
     
     # Paginación
-    from django.core.paginator import Paginator
-    paginator = Paginator(supervisores, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)  # ← page_obj correcto
+    enlaces_cursor = None
+    if usa_keyset(request):
+        paginador = PaginadorKeyset(supervisores, ['nombre', 'id'], 15)
+        page_obj = paginador.get_page(request.GET.get('cursor'))
+        enlaces_cursor = enlaces_keyset(request, page_obj)
+    else:
+        paginator = Paginator(supervisores, 15)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)  # ← page_obj correcto
         
     return render(
         request,
         'core/gestionar_supervisores.html',
-        {'page_obj': page_obj},  # ← page_obj correcto
+        {'page_obj': page_obj, 'enlaces_cursor': enlaces_cursor},  # ← page_obj correcto
     )
 
 @login_required
 def editar_supervisor(request, pk):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     supervisor = get_object_or_404(Supervisor, pk=pk)
     
     # VERIFICAR QUE EL SUPERVISOR PERTENECE A LA BASE DEL USUARIO
@@ -375,7 +530,7 @@ def editar_supervisor(request, pk):
 
 @login_required
 def eliminar_supervisor(request, pk):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     supervisor = get_object_or_404(Supervisor, pk=pk)
     
     # VERIFICAR QUE EL SUPERVISOR PERTENECE A LA BASE DEL USUARIO
@@ -397,8 +552,9 @@ def crear_periodo(request):
     if request.method == 'POST':
         form = PeriodoForm(request.POST)
         if form.is_valid():
-            form.save()
-            return redirect('listar_periodos')
+            periodo = form.save()
+            # Siguiente paso habitual: generar las entregas pendientes del periodo
+            return redirect('abrir_periodo', pk=periodo.pk)
     else:
         form = PeriodoForm()
     return render(
@@ -409,9 +565,10 @@ def crear_periodo(request):
 
 
 @login_required
+@condicional_por_version(alcance=todas_las_bases)
 def listar_periodos(request):
     # Si Periodo tiene campo 'base' y debe filtrarse:
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     periodos = Periodo.objects.order_by('-año', 'trimestre')
     
     # APLICAR FILTRO POR BASE (Si Periodo tiene una relación 'base')
@@ -445,6 +602,35 @@ def editar_periodo(request, pk):
     )
 
 
+@login_required
+def abrir_periodo(request, pk):
+    periodo = get_object_or_404(Periodo, pk=pk)
+    perfil = request.perfil
+    if request.method == 'POST':
+        form = AbrirPeriodoForm(request.POST, user_profile=perfil)
+        if form.is_valid():
+            supervisor = form.cleaned_data['supervisor_defecto']
+            # Con perfil, siempre la base propia: nunca todas las bases
+            base = perfil.base if perfil else form.cleaned_data['base'] or None
+            creadas, existentes = abrir_periodo_entregas(
+                periodo,
+                base=base,
+                supervisores_por_defecto={supervisor.base: supervisor.pk} if supervisor else None,
+            )
+            messages.success(
+                request,
+                f'Periodo {periodo} abierto: {creadas} entregas pendientes creadas, {existentes} ya existían.'
+            )
+            return redirect('listar_periodos')
+    else:
+        form = AbrirPeriodoForm(user_profile=perfil)
+    return render(
+        request,
+        'core/abrir_periodo.html',
+        {'form': form, 'periodo': periodo},
+    )
+
+
 @login_required
 def eliminar_periodo(request, pk):
     periodo = get_object_or_404(Periodo, pk=pk)
@@ -458,157 +644,167 @@ def eliminar_periodo(request, pk):
     )
 
 @login_required
+@condicional_por_version(alcance=todas_las_bases)
 def exportar_periodos_csv(request):
     # 1. Aplicar la misma lógica de filtro por base
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     periodos = Periodo.objects.all().order_by('-año', 'trimestre')
     
     # Si el Periodo tiene campo 'base' y quieres filtrar (Opción 1 que discutimos)
     if perfil and hasattr(Periodo, 'base'):
         periodos = periodos.filter(base=perfil.base)
 
-    # 2. Configurar la respuesta HTTP para un archivo CSV
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="periodos.csv"'
-
-    writer = csv.writer(response)
-    
-    # 3. Escribir la cabecera (encabezados de las columnas)
-    writer.writerow(['ID', 'Año', 'Trimestre', 'Nombre del Trimestre'])
-
-    # 4. Escribir los datos
-    for periodo in periodos:
-        writer.writerow([
-            periodo.id, 
-            periodo.año, 
-            periodo.trimestre, 
-            periodo.get_trimestre_display()
-        ])
-
-    return response
+    # 2. Cabecera y datos en streaming
+    return respuesta_csv_streaming(ENCABEZADOS_PERIODOS, filas_periodos(periodos), 'periodos.csv')
 
 @login_required
+@condicional_por_version(alcance=todas_las_bases)
 def exportar_periodos_xls(request):
     # 1. Aplicar la misma lógica de filtro por base
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     periodos = Periodo.objects.all().order_by('-año', 'trimestre')
     
     # Si el Periodo tiene campo 'base' y quieres filtrar (Opción 1 que discutimos)
     if perfil and hasattr(Periodo, 'base'):
         periodos = periodos.filter(base=perfil.base)
 
-    # 2. Crear el libro de trabajo de Excel
-    wb = Workbook()
-    ws = wb.active # Obtener la hoja activa (WorkSheet)
-    ws.title = "Periodos"
-
-    # 3. Escribir la cabecera (encabezados de las columnas)
-    headers = ['ID', 'Año', 'Trimestre', 'Nombre del Trimestre']
-    ws.append(headers)
-
-    # 4. Escribir los datos
-    for periodo in periodos:
-        ws.append([
-            periodo.id,
-            periodo.año,
-            periodo.trimestre,
-            periodo.get_trimestre_display()
-        ])
-
-    # 5. Configurar la respuesta HTTP para un archivo Excel
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="periodos.xlsx"'
-    
-    # 6. Guardar el libro de trabajo en la respuesta
-    wb.save(response)
-
-    return response
+    # 2. Libro write-only volcado a un archivo temporal
+    return respuesta_xlsx("Periodos", ENCABEZADOS_PERIODOS, filas_periodos(periodos), 'periodos.xlsx')
 
 @login_required
+@condicional_por_version()
 def exportar_entregas_csv(request):
-# Obtener el queryset inicial
-    perfil = getattr(request.user, 'perfil', None)
-    entregas = Entrega.objects.select_related('conductor', 'supervisor', 'periodo').all()
+    # Obtener el queryset inicial
+    perfil = request.perfil
+    entregas = Entrega.objects.all()
     
     if perfil:
         entregas = entregas.filter(base=perfil.base)
 
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="entregas.csv"'
-    writer = csv.writer(response)
-    writer.writerow([
-        'Registro', 'Periodo', 'Año', 'Trimestre', 'Base', 
-        'Conductor', 'Supervisor', 'Estado', 'Fase', 'Fecha de Entrega', 'Notas'
-    ])
-
-    # 4. Escribir los datos
-    for entrega in entregas:
-        writer.writerow([
-            entrega.numero_registro,
-            str(entrega.periodo), # Formato: Enero-Marzo 2024
-            entrega.periodo.año,
-            entrega.periodo.trimestre,
-            entrega.get_base_display(), # Usa get_base_display() para el nombre legible
-            entrega.conductor.nombre,
-            entrega.supervisor.nombre if entrega.supervisor else 'N/A',
-            entrega.get_estado_display(),
-            entrega.get_fase_display(),
-            entrega.fecha_entrega.strftime('%Y-%m-%d') if entrega.fecha_entrega else '',
-            entrega.notas
-        ])
+    # Mismos filtros que el dashboard (estado, fase, periodo, conductor, supervisor)
+    entregas, _ = filtrar_entregas(entregas, request.GET)
 
-    return response
+    # Periodos archivados: sus filas se leen del archivo frío
+    archivadas = entregas_archivadas(request.GET, base=perfil.base if perfil else None)
+
+    # Respuesta en streaming: las filas se generan por lotes mientras se envían
+    return respuesta_csv_streaming(
+        ENCABEZADOS_ENTREGAS, filas_entregas(entregas, archivadas=archivadas), 'entregas.csv'
+    )
 
 # --- EXPORTAR ENTREGAS A EXCEL (XLSX) ---
 @login_required
+@condicional_por_version()
 def exportar_entregas_xls(request):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     # Obtener el queryset inicial
-    entregas = Entrega.objects.select_related('conductor', 'supervisor', 'periodo').all()
+    entregas = Entrega.objects.all()
     
     # 1. Aplicar el filtro de seguridad por base
     if perfil:
         entregas = entregas.filter(base=perfil.base)
 
-    # 2. Crear el libro de trabajo de Excel
-    wb = Workbook()
-    ws = wb.active 
-    ws.title = "Entregas"
-
-    # 3. Escribir la cabecera
-    headers = [
-        'Registro', 'Periodo', 'Año', 'Trimestre', 'Base', 
-        'Conductor', 'Supervisor', 'Estado', 'Fase', 'Fecha de Entrega', 'Notas'
-    ]
-    ws.append(headers)
-
-    # 4. Escribir los datos
-    for entrega in entregas:
-        ws.append([
-            entrega.numero_registro,
-            str(entrega.periodo),
-            entrega.periodo.año,
-            entrega.periodo.trimestre,
-            entrega.get_base_display(),
-            entrega.conductor.nombre,
-            entrega.supervisor.nombre if entrega.supervisor else 'N/A',
-            entrega.get_estado_display(),
-            entrega.get_fase_display(),
-            entrega.fecha_entrega.strftime('%Y-%m-%d') if entrega.fecha_entrega else '',
-            entrega.notas
-        ])
-
-    # 5. Configurar la respuesta HTTP y guardar
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="entregas.xlsx"'
-    wb.save(response)
+    # 2. Mismos filtros que el dashboard
+    entregas, _ = filtrar_entregas(entregas, request.GET)
+
+    # 3. Periodos archivados: sus filas se leen del archivo frío
+    archivadas = entregas_archivadas(request.GET, base=perfil.base if perfil else None)
+
+    # 4. Libro write-only alimentado por lotes y volcado a un archivo temporal
+    return respuesta_xlsx(
+        "Entregas", ENCABEZADOS_ENTREGAS, filas_entregas(entregas, archivadas=archivadas), 'entregas.xlsx'
+    )
+
+# --- ANALÍTICA DE CUMPLIMIENTO ---
+def _entero_acotado(valor, por_defecto, minimo, maximo):
+    try:
+        return min(max(int(valor), minimo), maximo)
+    except (TypeError, ValueError):
+        return por_defecto
 
-    return response
+
+@login_required
+def analitica(request):
+    perfil = request.perfil
+    cantidad = _entero_acotado(request.GET.get('periodos'), PERIODOS_POR_DEFECTO, 1, 12)
+    minimo = _entero_acotado(request.GET.get('minimo'), MINIMO_INCUMPLIDAS, 1, cantidad)
+    # En caché por base y versión de datos: repetir la vista no recalcula nada
+    datos = calcular_analitica(perfil.base if perfil else None, cantidad, minimo)
+    return render(request, 'core/analitica.html', {
+        'datos': datos,
+        'cantidad': cantidad,
+        'minimo': minimo,
+    })
+
+# --- EXPORTACIONES EN SEGUNDO PLANO ---
+@login_required
+def solicitar_exportacion(request):
+    """
+    Encola la exportación de entregas con los filtros actuales del dashboard
+    (o reutiliza un archivo ya generado si los datos no cambiaron).
+    """
+    if request.method != 'POST':
+        return redirect('dashboard')
+
+    formato = request.POST.get('formato')
+    if formato not in dict(TrabajoExportacion.FORMATO_CHOICES):
+        return JsonResponse({'error': 'Formato no válido.'}, status=400)
+
+    perfil = request.perfil
+    trabajo = solicitar_exportacion_trabajo(
+        request.user,
+        perfil.base if perfil else '',
+        formato,
+        request.POST,
+    )
+    return JsonResponse(_estado_trabajo_json(trabajo))
+
+
+def _estado_trabajo_json(trabajo):
+    datos = {
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'url_estado': reverse('estado_exportacion', args=[trabajo.pk]),
+        'url_descarga': None,
+        'filas': trabajo.filas,
+    }
+    if trabajo.estado == 'terminado':
+        datos['url_descarga'] = reverse('descargar_exportacion', args=[trabajo.pk])
+    if trabajo.estado == 'error':
+        datos['error'] = trabajo.error
+    return datos
+
+
+def _obtener_trabajo_permitido(request, pk):
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk)
+    perfil = request.perfil
+    if perfil and trabajo.base != perfil.base:
+        raise Http404('Exportación no encontrada')
+    return trabajo
+
+
+@login_required
+def estado_exportacion(request, pk):
+    trabajo = _obtener_trabajo_permitido(request, pk)
+    return JsonResponse(_estado_trabajo_json(trabajo))
+
+
+@login_required
+def descargar_exportacion(request, pk):
+    trabajo = _obtener_trabajo_permitido(request, pk)
+    if trabajo.estado != 'terminado' or not os.path.exists(ruta_exportacion(trabajo)):
+        raise Http404('La exportación aún no está disponible')
+    return FileResponse(
+        open(ruta_exportacion(trabajo), 'rb'),
+        as_attachment=True,
+        filename=trabajo.nombre_descarga,
+    )
 
 @login_required
 def carga_masiva_conductores(request):
-    perfil = getattr(request.user, 'perfil', None)
+    perfil = request.perfil
     
     if not perfil:
         messages.error(request, 'No tienes un perfil asignado.')
@@ -618,81 +814,12 @@ def carga_masiva_conductores(request):
         form = CargaMasivaConductoresForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                archivo = request.FILES['archivo_excel']
-                
-                # Leer el archivo Excel
-                df = pd.read_excel(archivo)
-                
-                # Validar columnas requeridas
-                columnas_requeridas = ['nombre']
-                for columna in columnas_requeridas:
-                    if columna not in df.columns:
-                        messages.error(request, f'La columna "{columna}" es requerida en el archivo Excel.')
-                        return render(request, 'core/carga_masiva_conductores.html', {'form': form})
-                
-                conductores_creados = 0
-                conductores_actualizados = 0
-                errores = []
-                
-                # Obtener las bases válidas del modelo
-                bases_validas = dict(Perfil.BASE_CHOICES).keys()
-                
-                for index, fila in df.iterrows():
-                    try:
-                        nombre = str(fila['nombre']).strip()
-                        
-                        if not nombre:
-                            errores.append(f"Fila {index + 2}: El nombre no puede estar vacío")
-                            continue
-                        
-                        # Obtener la base del Excel o usar la del usuario por defecto
-                        if 'base' in df.columns:
-                            base_excel = str(fila['base']).strip().lower()
-                            # Validar que la base sea válida
-                            if base_excel in bases_validas:
-                                base_a_usar = base_excel
-                            else:
-                                base_a_usar = perfil.base  # Usar base del usuario si no es válida
-                                if base_excel:  # Solo mostrar advertencia si hay valor
-                                    errores.append(f"Fila {index + 2}: Base '{fila['base']}' no válida. Se usó '{perfil.base}'")
-                        else:
-                            base_a_usar = perfil.base  # Usar base del usuario si no hay columna base
-                        
-                        # Verificar si el conductor ya existe (mismo nombre)
-                        conductor_existente = Conductor.objects.filter(
-                            nombre__iexact=nombre
-                        ).first()
-                        
-                        if conductor_existente:
-                            # Actualizar conductor existente (incluyendo base si se especificó)
-                            conductor_existente.nombre = nombre
-                            if 'base' in df.columns and str(fila['base']).strip() in bases_validas:
-                                conductor_existente.base = str(fila['base']).strip().lower()
-                            conductor_existente.save()
-                            conductores_actualizados += 1
-                        else:
-                            # Crear nuevo conductor
-                            Conductor.objects.create(
-                                nombre=nombre,
-                                base=base_a_usar
-                            )
-                            conductores_creados += 1
-                            
-                    except Exception as e:
-                        errores.append(f"Fila {index + 2}: Error - {str(e)}")
-                        continue
-                
-                # Mostrar resultados
-                if conductores_creados > 0 or conductores_actualizados > 0:
-                    mensaje = f"Carga completada: {conductores_creados} nuevos, {conductores_actualizados} actualizados"
-                    if errores:
-                        mensaje += f". Errores: {len(errores)}"
-                    messages.success(request, mensaje)
-                
-                if errores:
-                    request.session['errores_carga'] = errores[:10]
-                
-                return redirect('listar_conductores')
+                # El archivo se guarda y lo procesa el worker por bloques;
+                # la página consulta el avance del trabajo
+                trabajo = encolar_importacion(
+                    request.user, perfil.base, 'conductores', request.FILES['archivo_excel']
+                )
+                return redirect(f"{reverse('carga_masiva_conductores')}?trabajo={trabajo.pk}")
                 
             except Exception as e:
                 messages.error(request, f'Error al procesar el archivo: {str(e)}')
@@ -700,13 +827,42 @@ def carga_masiva_conductores(request):
     else:
         form = CargaMasivaConductoresForm()
     
-    errores = request.session.pop('errores_carga', [])
+    trabajo = None
+    if request.GET.get('trabajo', '').isdigit():
+        trabajo = _obtener_importacion_permitida(request, int(request.GET['trabajo']))
     
     return render(request, 'core/carga_masiva_conductores.html', {
         'form': form,
-        'errores': errores
+        'trabajo': trabajo,
     }) 
 
+
+def _obtener_importacion_permitida(request, pk):
+    trabajo = get_object_or_404(TrabajoImportacion, pk=pk)
+    perfil = request.perfil
+    if perfil and trabajo.base != perfil.base:
+        raise Http404('Carga masiva no encontrada')
+    return trabajo
+
+
+@login_required
+def estado_importacion(request, pk):
+    trabajo = _obtener_importacion_permitida(request, pk)
+    return JsonResponse({
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'url_estado': reverse('estado_importacion', args=[trabajo.pk]),
+        'total_filas': trabajo.total_filas,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'porcentaje': trabajo.porcentaje,
+        'creados': trabajo.creados,
+        'actualizados': trabajo.actualizados,
+        'total_errores': trabajo.total_errores,
+        'errores': trabajo.errores,
+        'error': trabajo.error,
+    })
+
 @login_required
 def descargar_plantilla_conductores(request):
     # Crear un DataFrame de ejemplo con columna base
@@ -750,4 +906,114 @@ def descargar_plantilla_conductores(request):
     )
     response['Content-Disposition'] = 'attachment; filename="plantilla_conductores.xlsx"'
     
-    return response
\ No newline at end of file
+    return response
+
+@login_required
+def carga_masiva_entregas(request):
+    perfil = request.perfil
+    
+    if not perfil:
+        messages.error(request, 'No tienes un perfil asignado.')
+        return redirect('dashboard')
+    
+    if request.method == 'POST':
+        form = CargaMasivaEntregasForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                trabajo = encolar_importacion(
+                    request.user, perfil.base, 'entregas', request.FILES['archivo_excel']
+                )
+                return redirect(f"{reverse('carga_masiva_entregas')}?trabajo={trabajo.pk}")
+                
+            except Exception as e:
+                messages.error(request, f'Error al procesar el archivo: {str(e)}')
+    
+    else:
+        form = CargaMasivaEntregasForm()
+    
+    trabajo = None
+    if request.GET.get('trabajo', '').isdigit():
+        trabajo = _obtener_importacion_permitida(request, int(request.GET['trabajo']))
+    
+    return render(request, 'core/carga_masiva_entregas.html', {
+        'form': form,
+        'trabajo': trabajo,
+        'estados': Entrega.ESTADO_CHOICES,
+        'fases': Entrega.FASE_CHOICES,
+    })
+
+@login_required
+def descargar_plantilla_entregas(request):
+    perfil = request.perfil
+    conductores = Conductor.objects.order_by('nombre')
+    if perfil:
+        conductores = conductores.filter(base=perfil.base)
+    periodo = Periodo.objects.order_by('-año', '-trimestre').first()
+
+    # Ejemplo con conductores reales para que la plantilla se pueda cargar tal cual
+    nombres = list(conductores.values_list('nombre', flat=True)[:3]) or ['JUAN PEREZ GARCIA']
+    data = {
+        'conductor': nombres,
+        'periodo': [f'{periodo.trimestre} {periodo.año}' if periodo else 'Q1 2025'] * len(nombres),
+        'supervisor': [''] * len(nombres),
+        'estado': ['pendiente'] * len(nombres),
+        'fase': ['no_entregada'] * len(nombres),
+        'fecha_entrega': [''] * len(nombres),
+        'notas': [''] * len(nombres),
+    }
+    
+    df = pd.DataFrame(data)
+    
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, sheet_name='Entregas', index=False)
+        
+        worksheet = writer.sheets['Entregas']
+        worksheet.column_dimensions['A'].width = 30  # conductor
+        worksheet.column_dimensions['B'].width = 12  # periodo
+        worksheet.column_dimensions['C'].width = 30  # supervisor
+        worksheet.column_dimensions['D'].width = 15  # estado
+        worksheet.column_dimensions['E'].width = 15  # fase
+        worksheet.column_dimensions['F'].width = 15  # fecha_entrega
+        worksheet.column_dimensions['G'].width = 30  # notas
+        
+        # Valores válidos de estado y fase en su propia hoja: en la de datos
+        # agregarían filas sin conductor al volver a cargar la plantilla
+        valores = writer.book.create_sheet('Valores válidos')
+        valores.append(['Estados válidos:', 'Fases válidas:'])
+        estados = [clave for clave, _ in Entrega.ESTADO_CHOICES]
+        fases = [clave for clave, _ in Entrega.FASE_CHOICES]
+        for fila in zip_longest(estados, fases):
+            valores.append(fila)
+        valores.column_dimensions['A'].width = 18
+        valores.column_dimensions['B'].width = 18
+
+        # Lista desplegable en las columnas estado (D) y fase (E) de la hoja de datos
+        for columna, origen, cantidad in [('D', 'A', len(estados)), ('E', 'B', len(fases))]:
+            validacion = DataValidation(
+                type='list', formula1=f"='Valores válidos'!${origen}$2:${origen}${cantidad + 1}", allow_blank=True,
+            )
+            worksheet.add_data_validation(validacion)
+            validacion.add(f'{columna}2:{columna}1048576')
+    
+    output.seek(0)
+    
+    response = HttpResponse(
+        output.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = 'attachment; filename="plantilla_entregas.xlsx"'
+    
+    return response
+
+
+def metricas(request):
+    """
+    Métricas por vista en formato de texto de Prometheus. Para el scraper,
+    con el token METRICAS_TOKEN como Bearer; si no, solo usuarios staff.
+    """
+    token = settings.METRICAS_TOKEN
+    autorizacion = request.headers.get('Authorization', '')
+    if not (token and constant_time_compare(autorizacion, f'Bearer {token}')) and not request.user.is_staff:
+        return HttpResponseForbidden('No autorizado.')
+    return HttpResponse(registro_metricas.exposicion(), content_type='text/plain; version=0.0.4; charset=utf-8')
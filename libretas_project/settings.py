@@ -51,12 +51,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también sesión y autenticación (ver /metrics/)
+    'core.middleware.MedicionVistasMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # AuthenticationMiddleware + Perfil en una consulta, cacheado por proceso
+    'accounts.middleware.AutenticacionConPerfilMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,7 +68,8 @@ ROOT_URLCONF = 'libretas_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render por solicitud
+        'BACKEND': 'core.plantillas.DjangoTemplatesMedidas',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -155,10 +159,64 @@ CORS_ALLOW_ALL_ORIGINS = config('CORS_ALLOW_ALL_ORIGINS', cast=bool)
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = 'inicio'
+# Carga el usuario junto con su Perfil (y conductor/supervisor relacionado) en una consulta
+AUTHENTICATION_BACKENDS = ['accounts.backends.BackendConPerfil']
+
+#cache
+# 'usuarios' es local a cada proceso y solo guarda la verificación del hash de
+# sesión: el usuario y su Perfil se leen de la BD en cada solicitud.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'usuarios': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'usuarios',
+        'TIMEOUT': config('CACHE_USUARIOS_TIMEOUT', default=60, cast=int),
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+
 
 
 
 
 
 
+#métricas por vista
+# /metrics/ acepta "Authorization: Bearer <METRICAS_TOKEN>" o un usuario staff
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+# Solicitudes más lentas que esto se registran en el log 'core.middleware'
+METRICAS_UMBRAL_LENTO_MS = config('METRICAS_UMBRAL_LENTO_MS', default=500, cast=int)
+# Veces que debe repetirse una misma consulta en una solicitud para contarla como N+1
+METRICAS_N_MAS_1_MINIMO = config('METRICAS_N_MAS_1_MINIMO', default=5, cast=int)
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+#api rest
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticated',
+    ],
+    'DEFAULT_FILTER_BACKENDS': [
+        'django_filters.rest_framework.DjangoFilterBackend',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
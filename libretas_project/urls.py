@@ -23,5 +23,7 @@ urlpatterns = [
     path('', include('core.urls')),
     path('contacto/', include('contacto.urls')),
     path('acoounts/', include('accounts.urls')),
+    #API de lectura versionada
+    path('api/v1/', include('core.api.urls')),
 
 ]
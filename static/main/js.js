@@ -51,4 +51,76 @@ function confirmarEliminacionSweetAlert(pk, nombre) {
 }
 
 
-d
\ No newline at end of file
+// Exportaciones en segundo plano: encola el trabajo y consulta su estado
+function solicitarExportacion(form) {
+    const estado = document.getElementById('estado-exportacion');
+    estado.textContent = 'Preparando exportación...';
+
+    fetch(form.action, { method: 'POST', body: new FormData(form) })
+        .then((respuesta) => respuesta.json())
+        .then((datos) => consultarExportacion(datos, estado))
+        .catch(() => { estado.textContent = 'No se pudo solicitar la exportación.'; });
+    return false;
+}
+
+function consultarExportacion(datos, estado) {
+    if (datos.estado === 'terminado') {
+        estado.innerHTML = `Exportación lista (${datos.filas} filas): <a href="${datos.url_descarga}">Descargar</a>`;
+        return;
+    }
+    if (datos.estado === 'error' || datos.error) {
+        estado.textContent = `Error en la exportación: ${datos.error || ''}`;
+        return;
+    }
+    estado.textContent = `Exportación ${datos.estado_display.toLowerCase()}...`;
+    setTimeout(() => {
+        fetch(datos.url_estado)
+            .then((respuesta) => respuesta.json())
+            .then((nuevos) => consultarExportacion(nuevos, estado));
+    }, 2000);
+}
+
+function consultarImportacion(contenedor) {
+    fetch(contenedor.dataset.urlEstado)
+        .then((respuesta) => respuesta.json())
+        .then((datos) => {
+            const progreso = document.getElementById('progreso-importacion');
+            const resumen = document.getElementById('resumen-importacion');
+            const titulo = contenedor.querySelector('h5');
+
+            if (datos.porcentaje !== null) {
+                progreso.value = datos.porcentaje;
+            }
+            const total = datos.total_filas !== null ? ` de ${datos.total_filas}` : '';
+            resumen.textContent = `Filas procesadas: ${datos.filas_procesadas}${total}. `
+                + `Nuevos: ${datos.creados}, actualizados: ${datos.actualizados}, errores: ${datos.total_errores}`;
+
+            const lista = document.getElementById('errores-importacion');
+            lista.innerHTML = '';
+            datos.errores.forEach((error) => {
+                const item = document.createElement('li');
+                item.textContent = error;
+                lista.appendChild(item);
+            });
+
+            if (datos.estado === 'terminado') {
+                progreso.value = 100;
+                titulo.textContent = 'Carga completada';
+                contenedor.className = datos.total_errores ? 'alert alert-warning mt-4' : 'alert alert-success mt-4';
+                return;
+            }
+            if (datos.estado === 'error') {
+                titulo.textContent = `Error al procesar el archivo: ${datos.error}`;
+                contenedor.className = 'alert alert-danger mt-4';
+                return;
+            }
+            setTimeout(() => consultarImportacion(contenedor), 2000);
+        })
+        .catch(() => { contenedor.querySelector('h5').textContent = 'No se pudo consultar el avance de la carga.'; });
+}
+
+function seleccionarTodas(casilla, nombre) {
+    document.querySelectorAll(`input[type="checkbox"][name="${nombre}"]`).forEach((item) => {
+        item.checked = casilla.checked;
+    });
+}